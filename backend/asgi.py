@@ -0,0 +1,5 @@
+# Uso: uvicorn asgi:app --workers 4  (o gunicorn asgi:app -k uvicorn.workers.UvicornWorker)
+from src.asgi import create_asgi_app
+
+
+app = create_asgi_app()
@@ -0,0 +1,168 @@
+"""Servidor local que imita la API de autenticación de Roble para pruebas de carga.
+
+Uso (desde backend/):
+
+    python -m benchmarks.fake_roble --port 8001 --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+    ROBLE_BASE_URL=http://127.0.0.1:8001/auth gunicorn app:app
+
+Implementa login, refresh-token, verify-token, logout, signup y signup-direct
+bajo ``/auth/<dbName>/``. Cualquier correo puede iniciar sesión (salvo con la
+contraseña ``invalid``) y los tokens son JWT sin firma con ``exp``, así la
+caché de tokens del backend se comporta como con Roble. La latencia se simula
+con ``sleep`` por petición y una fracción ``error_rate`` responde
+``error_status`` (503 por defecto, que el cliente reintenta en GET).
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from flask import Flask, abort, jsonify, request
+
+
+@dataclass
+class FakeRobleConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    token_ttl: float = 900.0
+
+
+def _b64(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def make_token(email: str, kind: str, ttl: float) -> str:
+    payload = {"sub": email, "email": email, "typ": kind, "jti": uuid.uuid4().hex, "exp": int(time.time() + ttl)}
+    return f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64(payload)}.fake"
+
+
+def read_token(token: str) -> Optional[Dict[str, Any]]:
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except Exception:
+        return None
+
+
+def create_fake_roble(config: FakeRobleConfig | None = None) -> Flask:
+    config = config or FakeRobleConfig()
+    app = Flask(__name__)
+    app.config["FAKE_ROBLE"] = config
+    revoked: Set[str] = set()
+    users: Dict[str, str] = {}
+    lock = threading.Lock()
+    stats = {"requests": 0, "errors": 0}
+
+    @app.before_request
+    def _simulate():
+        with lock:
+            stats["requests"] += 1
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            with lock:
+                stats["errors"] += 1
+            abort(config.error_status)
+
+    def _claims(kind: str) -> Dict[str, Any]:
+        header = request.headers.get("Authorization", "")
+        token = header.split(" ", 1)[1] if header.startswith("Bearer ") else ""
+        claims = read_token(token)
+        if claims is None or claims.get("typ") != kind or claims["exp"] < time.time() or claims["jti"] in revoked:
+            abort(401)
+        return claims
+
+    def _tokens(email: str) -> Dict[str, str]:
+        return {
+            "accessToken": make_token(email, "access", config.token_ttl),
+            "refreshToken": make_token(email, "refresh", config.token_ttl * 8),
+        }
+
+    @app.post("/auth/<db>/login")
+    def login(db: str):
+        data = request.get_json(force=True) or {}
+        email, password = data.get("email"), data.get("password")
+        if not email or not password or password == "invalid" or users.get(email, password) != password:
+            return jsonify({"message": "Credenciales inválidas"}), 401
+        return jsonify(_tokens(email)), 201
+
+    @app.post("/auth/<db>/refresh-token")
+    def refresh_token(db: str):
+        claims = read_token(str((request.get_json(force=True) or {}).get("refreshToken", "")))
+        if claims is None or claims.get("typ") != "refresh" or claims["exp"] < time.time() or claims["jti"] in revoked:
+            return jsonify({"message": "Refresh token inválido"}), 401
+        return jsonify({"accessToken": make_token(claims["email"], "access", config.token_ttl)}), 201
+
+    @app.get("/auth/<db>/verify-token")
+    def verify_token(db: str):
+        claims = _claims("access")
+        return jsonify({"valid": True, "user": {"sub": claims["sub"], "email": claims["email"], "dbName": db}})
+
+    @app.post("/auth/<db>/logout")
+    def logout(db: str):
+        claims = _claims("access")
+        with lock:
+            revoked.add(claims["jti"])
+        return "", 201
+
+    @app.post("/auth/<db>/signup")
+    @app.post("/auth/<db>/signup-direct")
+    def signup(db: str):
+        data = request.get_json(force=True) or {}
+        if not data.get("email") or not data.get("password") or not data.get("name"):
+            return jsonify({"message": "email, password y name son requeridos"}), 400
+        with lock:
+            if data["email"] in users:
+                return jsonify({"message": "El usuario ya existe"}), 409
+            users[data["email"]] = data["password"]
+        return jsonify({"message": "Usuario registrado"}), 201
+
+    @app.get("/stats")
+    def fake_stats():
+        with lock:
+            return jsonify(dict(stats))
+
+    return app
+
+
+def serve_in_thread(config: FakeRobleConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+    """Levanta el servidor en un hilo daemon; devuelve (servidor, base_url para ROBLE_BASE_URL)."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_fake_roble(config), threaded=True)
+    threading.Thread(target=server.serve_forever, name="fake-roble", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/auth"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latencia media por petición")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="variación uniforme ± sobre la latencia")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de peticiones que fallan (0-1)")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--token-ttl", type=float, default=900.0, help="vigencia del access token en segundos")
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import run_simple
+
+    config = FakeRobleConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.token_ttl)
+    print(f"ROBLE_BASE_URL=http://{args.host}:{args.port}/auth")
+    run_simple(args.host, args.port, create_fake_roble(config), threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
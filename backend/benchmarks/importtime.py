@@ -0,0 +1,134 @@
+"""Arranque en frío: tiempo de importación (``-X importtime``) y de ``create_app`` en procesos nuevos.
+
+Uso (desde backend/):
+
+    python -m benchmarks.importtime              # informe JSON en benchmarks/results/
+    python -m benchmarks.importtime --top 30 --runs 9
+
+Cada medición corre en un intérprete limpio, como un worker de gunicorn recién
+creado sin ``preload_app``. ``python -m benchmarks.run --only startup`` guarda
+las mismas cifras junto al resto de benchmarks para compararlas entre corridas.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+TARGETS = {
+    "import src": "import src",
+    "create_app": "from src import create_app; create_app()",
+    "create_app+warm_up": "from src import create_app, warm_up; warm_up(create_app())",
+}
+# Dependencias que deberían cargarse solo al primer uso (o en warm_up)
+HEAVY_MODULES = ("openpyxl", "requests", "urllib3", "dateutil", "numpy")
+
+MARKER = "--- benchmark start"
+CHILD = f"""
+import json, sys, time
+sys.stderr.write({MARKER!r} + "\\n")
+t0 = time.perf_counter()
+exec(sys.argv[1])
+wall_ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"wall_ms": wall_ms, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Filas (módulo, nivel, self_us, cumulative_us) posteriores al marcador."""
+    rows = []
+    started = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2]
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), level, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def run_once(code: str) -> Dict[str, Any]:
+    env = {**os.environ, "FLASK_DEBUG": "false", "WARM_UP": "false", "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} falló:\n{proc.stderr[-2000:]}")
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    return {
+        "wall_ms": child["wall_ms"],
+        "import_ms": sum(cum for _, level, _, cum in rows if level == 0) / 1000,
+        "heavy": child["heavy"],
+        "rows": rows,
+    }
+
+
+def measure(code: str, runs: int = 5, top: int = 0) -> Dict[str, Any]:
+    """Mediana de ``runs`` procesos nuevos; ``top`` > 0 agrega los módulos más costosos (acumulado)."""
+    samples = [run_once(code) for _ in range(runs)]
+    wall = [s["wall_ms"] for s in samples]
+    stats: Dict[str, Any] = {
+        "min_ms": min(wall),
+        "median_ms": statistics.median(wall),
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "runs": runs,
+        "heavy_modules": samples[-1]["heavy"],
+    }
+    if top > 0:
+        rows = sorted(samples[-1]["rows"], key=lambda r: r[3], reverse=True)[:top]
+        stats["top_modules"] = [{"module": m, "self_ms": s / 1000, "cumulative_ms": c / 1000} for m, _, s, c in rows]
+    return stats
+
+
+def bench_startup(repeat: int) -> Dict[str, Any]:
+    return {f"startup/{name}": measure(code, runs=repeat) for name, code in TARGETS.items()}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="procesos por objetivo")
+    parser.add_argument("--top", type=int, default=20, help="módulos más costosos a listar")
+    parser.add_argument("--output", help="archivo JSON de salida")
+    args = parser.parse_args(argv)
+
+    targets = {}
+    for name, code in TARGETS.items():
+        stats = targets[name] = measure(code, runs=args.runs, top=args.top)
+        heavy = ", ".join(stats["heavy_modules"]) or "-"
+        print(f"{name:24} {stats['median_ms']:8.1f} ms  (imports {stats['import_ms']:.1f} ms)  pesados: {heavy}", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "targets": targets,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"importtime_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados en {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
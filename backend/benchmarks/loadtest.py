@@ -0,0 +1,316 @@
+"""Prueba de carga de punta a punta contra gunicorn con un Roble local.
+
+Uso (desde backend/):
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 30 --workers 4 --threads 4
+    python -m benchmarks.loadtest --app asgi --workers 2 --roble-latency-ms 80
+    python -m benchmarks.loadtest --target http://127.0.0.1:5000 --concurrency 16
+
+Sin ``--target`` levanta ``benchmarks.fake_roble`` y gunicorn (``gunicorn.conf.py``)
+en subprocesos, con ``ROBLE_BASE_URL`` apuntando al falso, y los detiene al
+final. Cada usuario virtual inicia sesión una vez y repite operaciones según
+``--mix`` (pesos de calculate, export y auth) hasta agotar ``--duration``;
+"auth" es un ciclo login + logout con un token nuevo, así que cada logout
+verifica contra Roble. El informe (rps y percentiles de latencia por operación)
+se imprime y se guarda como JSON en benchmarks/results/.
+
+El generador corre en hilos de este proceso: con concurrencias altas conviene
+comparar el uso de CPU del cliente para no medir su propio límite.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .run import batch_cases, to_request
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+OPERATIONS = ("calculate", "export", "auth")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0, proc: Optional[subprocess.Popen] = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{proc.args!r} terminó con código {proc.returncode}")
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} no respondió en {timeout:.0f} s")
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"operación desconocida: {name} (use {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    """Latencias por etiqueta; solo cuenta lo que termina dentro de la ventana medida."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.measuring = False
+
+    def add(self, label: str, seconds: float, ok: bool) -> None:
+        if not self.measuring:
+            return
+        with self._lock:
+            if ok:
+                self.latencies[label].append(seconds)
+            else:
+                self.errors[label] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        rows = {}
+        all_latencies: List[float] = []
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            ordered = sorted(self.latencies[label])
+            all_latencies.extend(ordered)
+            rows[label] = _summary(ordered, self.errors[label], elapsed)
+        rows["total"] = _summary(sorted(all_latencies), sum(self.errors.values()), elapsed)
+        return rows
+
+
+def _summary(ordered: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p90_ms": percentile(ordered, 90) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index: int, base_url: str, mix: Dict[str, float], bodies: List[Dict[str, Any]],
+                 recorder: Recorder, stop: threading.Event):
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.email = f"loadtest-{index}@example.com"
+        self.operations, self.weights = zip(*mix.items())
+        self.bodies = bodies
+        self.recorder = recorder
+        self.stop = stop
+        self.random = random.Random(index)
+        self.session = requests.Session()
+        self.token: Optional[str] = None
+
+    def call(self, label: str, method: str, path: str, expected: Tuple[int, ...] = (200,), **kwargs) -> Optional[requests.Response]:
+        t0 = time.perf_counter()
+        try:
+            res = self.session.request(method, self.base_url + path, timeout=60, **kwargs)
+            res.content  # el tiempo incluye el cuerpo completo
+        except requests.RequestException:
+            self.recorder.add(label, time.perf_counter() - t0, False)
+            return None
+        ok = res.status_code in expected
+        self.recorder.add(label, time.perf_counter() - t0, ok)
+        return res if ok else None
+
+    def login(self, label: str = "auth/login") -> Optional[str]:
+        res = self.call(label, "POST", "/api/auth/login", json={"email": self.email, "password": "loadtest"})
+        return res.json()["accessToken"] if res is not None else None
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            if self.token is None:
+                self.token = self.login()
+                if self.token is None:
+                    time.sleep(0.1)
+                    continue
+            op = self.random.choices(self.operations, self.weights)[0]
+            headers = {"Authorization": f"Bearer {self.token}"}
+            if op == "calculate":
+                self.call("calculate", "POST", "/api/calculate", json=self.random.choice(self.bodies), headers=headers)
+            elif op == "export":
+                self.call("export", "POST", "/api/export", json=self.random.choice(self.bodies), headers=headers)
+            else:
+                token = self.login()
+                if token is not None:
+                    self.call("auth/logout", "POST", "/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+
+
+def run_load(base_url: str, concurrency: int, duration: float, warmup: float, mix: Dict[str, float],
+             distinct: int) -> Dict[str, Any]:
+    bodies = [to_request(c) for c in batch_cases(distinct)]
+    recorder = Recorder()
+    stop = threading.Event()
+    users = [VirtualUser(i, base_url, mix, bodies, recorder, stop) for i in range(concurrency)]
+    for user in users:
+        user.start()
+    time.sleep(warmup)
+    recorder.measuring = True
+    t0 = time.perf_counter()
+    cpu0 = time.process_time()
+    time.sleep(duration)
+    recorder.measuring = False
+    elapsed = time.perf_counter() - t0
+    client_cpu = (time.process_time() - cpu0) / elapsed
+    stop.set()
+    for user in users:
+        user.join(timeout=65)
+    return {"elapsed_s": elapsed, "client_cpu_ratio": client_cpu, "operations": recorder.report(elapsed)}
+
+
+def start_stack(args) -> Tuple[str, List[subprocess.Popen], Dict[str, Any]]:
+    """Roble falso + gunicorn en subprocesos; devuelve la URL base del backend."""
+    procs: List[subprocess.Popen] = []
+    roble_port = free_port()
+    roble = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_roble", "--port", str(roble_port),
+         "--latency-ms", str(args.roble_latency_ms), "--jitter-ms", str(args.roble_jitter_ms),
+         "--error-rate", str(args.roble_error_rate)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    procs.append(roble)
+    wait_until_up(f"http://127.0.0.1:{roble_port}/stats", proc=roble)
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "ROBLE_BASE_URL": f"http://127.0.0.1:{roble_port}/auth",
+        "FLASK_DEBUG": "false",
+    }
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    cmd += ["-k", "uvicorn.workers.UvicornWorker", "asgi:app"] if args.app == "asgi" else ["app:app"]
+    log_path = os.path.join(tempfile.gettempdir(), f"loadtest_gunicorn_{port}.log")
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    procs.append(server)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(f"{base_url}/api/health", timeout=60, proc=server)
+    except RuntimeError as exc:
+        stop_stack(procs)
+        raise RuntimeError(f"{exc}; log de gunicorn en {log_path}") from exc
+    info = {
+        "app": args.app,
+        "workers": args.workers,
+        "threads": args.threads,
+        "roble_url": env["ROBLE_BASE_URL"],
+        "server_log": log_path,
+    }
+    return base_url, procs, info
+
+
+def stop_stack(procs: List[subprocess.Popen]) -> None:
+    for proc in reversed(procs):
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL de un backend ya levantado (no se inicia gunicorn ni Roble falso)")
+    parser.add_argument("--concurrency", type=int, default=16, help="usuarios virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos previos sin medir")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("calculate=6,export=2,auth=2"),
+                        help="pesos por operación, p. ej. calculate=6,export=2,auth=2")
+    parser.add_argument("--distinct", type=int, default=50, help="liquidaciones distintas en el pool de peticiones")
+    parser.add_argument("--app", choices=("wsgi", "asgi"), default="wsgi", help="app:app o asgi:app con UvicornWorker")
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY")
+    parser.add_argument("--threads", type=int, default=4, help="GUNICORN_THREADS")
+    parser.add_argument("--roble-latency-ms", type=float, default=30.0)
+    parser.add_argument("--roble-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--roble-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="archivo JSON de salida")
+    args = parser.parse_args(argv)
+
+    procs: List[subprocess.Popen] = []
+    stack: Dict[str, Any] = {"target": args.target}
+    if args.target:
+        base_url = args.target
+    else:
+        base_url, procs, stack = start_stack(args)
+        stack.update(
+            roble_latency_ms=args.roble_latency_ms, roble_jitter_ms=args.roble_jitter_ms, roble_error_rate=args.roble_error_rate
+        )
+    try:
+        result = run_load(base_url, args.concurrency, args.duration, args.warmup, args.mix, args.distinct)
+        if procs:
+            stack["roble_stats"] = requests.get(stack["roble_url"].rsplit("/auth", 1)[0] + "/stats", timeout=5).json()
+    finally:
+        stop_stack(procs)
+
+    print(f"{'operación':16} {'req':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}", file=sys.stderr)
+    for label, row in result["operations"].items():
+        print(
+            f"{label:16} {row['requests']:7d} {row['errors']:5d} {row['rps']:8.1f} {row['p50_ms']:8.1f}"
+            f" {row['p90_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}",
+            file=sys.stderr,
+        )
+    print(f"CPU del generador: {result['client_cpu_ratio']:.2f} núcleos", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": args.mix,
+        "distinct": args.distinct,
+        "stack": stack,
+        **result,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados en {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Benchmarks reproducibles del motor de liquidación, el generador de Excel y las rutas HTTP.
+
+Uso (desde backend/):
+
+    python -m benchmarks.run                       # todo, guarda JSON en benchmarks/results/
+    python -m benchmarks.run --only domain excel   # solo algunos grupos
+    python -m benchmarks.run --only startup        # arranque en frío (ver benchmarks.importtime)
+    python -m benchmarks.run --compare antes.json despues.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from src.domain import ENGINES, generate_tramos
+from src import excel
+from src.xlsx_writer import build_xlsx_direct
+
+from .importtime import bench_startup
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Escenarios parametrizados: rango corto/largo, con y sin fechaVencimiento
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "short": {"start": date(2024, 1, 15), "end": date(2024, 4, 10), "base": 25_000_000.0, "tasa": 2.1, "vencimiento": None},
+    "short_venc": {
+        "start": date(2024, 1, 15),
+        "end": date(2024, 4, 10),
+        "base": 25_000_000.0,
+        "tasa": 2.1,
+        "vencimiento": date(2024, 3, 1),
+    },
+    "30y": {"start": date(1995, 3, 17), "end": date(2025, 3, 16), "base": 180_000_000.0, "tasa": 2.13, "vencimiento": None},
+    "30y_venc": {
+        "start": date(1995, 3, 17),
+        "end": date(2025, 3, 16),
+        "base": 180_000_000.0,
+        "tasa": 2.13,
+        "vencimiento": date(2010, 3, 17),
+    },
+}
+
+BATCH_SIZE = 100
+
+
+def batch_cases(n: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+    # Cartera determinista de n créditos con rangos y vencimientos variados
+    cases = []
+    for i in range(n):
+        start = date(2000, 1, 1) + timedelta(days=37 * i)
+        end = start + timedelta(days=200 + 97 * (i % 90))
+        vencimiento = start + timedelta(days=90 + 13 * i) if i % 2 else None
+        if vencimiento is not None and vencimiento > end:
+            vencimiento = None
+        cases.append({"start": start, "end": end, "base": 1_000_000.0 + 5_000 * i, "tasa": 1.5 + (i % 10) / 10, "vencimiento": vencimiento})
+    return cases
+
+
+def to_request(case: Dict[str, Any]) -> Dict[str, Any]:
+    body = {
+        "fechaInicial": case["start"].strftime("%d/%m/%Y"),
+        "fechaCorte": case["end"].strftime("%d/%m/%Y"),
+        "capitalBase": case["base"],
+        "tasaMensual": case["tasa"],
+    }
+    if case["vencimiento"] is not None:
+        body["fechaVencimiento"] = case["vencimiento"].strftime("%d/%m/%Y")
+    return body
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float = 0.2) -> Dict[str, float]:
+    """Calibra el número de llamadas por muestra y devuelve estadísticas en ms por llamada."""
+    fn()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 2
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number * 1000)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "calls_per_sample": number,
+    }
+
+
+def bench_domain(repeat: int) -> Dict[str, Any]:
+    results = {}
+    for engine in ENGINES:
+        for name, sc in SCENARIOS.items():
+            results[f"generate_tramos[{engine}]/{name}"] = measure(
+                lambda sc=sc: generate_tramos(sc["start"], sc["end"], sc["base"], sc["tasa"], sc["vencimiento"], engine=engine),
+                repeat,
+            )
+        cases = batch_cases()
+        results[f"generate_tramos[{engine}]/batch{BATCH_SIZE}"] = measure(
+            lambda: [
+                generate_tramos(c["start"], c["end"], c["base"], c["tasa"], c["vencimiento"], engine=engine) for c in cases
+            ],
+            repeat,
+        )
+    from src.vectorized import scenario_grid
+
+    sc = SCENARIOS["30y_venc"]
+    rates = [1.5 + 0.02 * i for i in range(50)]
+    cutoffs = [sc["end"] + timedelta(days=30 * k) for k in range(24)]
+    results["scenario_grid/50x24/30y_venc"] = measure(
+        lambda: scenario_grid(sc["start"], sc["base"], rates, cutoffs, sc["vencimiento"]), repeat
+    )
+    return results
+
+
+def bench_excel(repeat: int) -> Dict[str, Any]:
+    results = {}
+    for builder in (excel.build_excel, excel.build_excel_stream, build_xlsx_direct):
+        for name in ("short", "30y_venc"):
+            sc = SCENARIOS[name]
+            result = generate_tramos(sc["start"], sc["end"], sc["base"], sc["tasa"], sc["vencimiento"])
+            stats = measure(lambda: builder(result).close(), repeat)
+            stats.update(excel.export_peak_memory(result, builder))
+            results[f"{builder.__name__}/{name}"] = stats
+    return results
+
+
+def bench_http(repeat: int) -> Dict[str, Any]:
+    from src import auth, create_app
+    from src.config import Settings
+
+    # Sin red: la verificación remota se reemplaza por un stub local
+    auth.roble_verify = lambda token: {"user": {"id": "bench"}}
+    results = {}
+    for cached in (False, True):
+        settings = Settings.from_env()
+        settings.debug = False
+        if not cached:
+            settings.result_cache_size = 0
+        client = create_app(settings).test_client()
+        headers = {"Authorization": "Bearer bench"}
+        label = "cached" if cached else "uncached"
+
+        def post(path: str, body: Dict[str, Any]) -> None:
+            res = client.post(path, json=body, headers=headers)
+            res.get_data()  # consume respuestas en streaming
+            if res.status_code != 200:
+                raise RuntimeError(f"{path} respondió {res.status_code}: {res.data[:200]!r}")
+
+        for name, sc in SCENARIOS.items():
+            body = to_request(sc)
+            results[f"POST /api/calculate[{label}]/{name}"] = measure(lambda: post("/api/calculate", body), repeat)
+            results[f"POST /api/export[{label}]/{name}"] = measure(lambda: post("/api/export", body), repeat)
+        bodies = [to_request(c) for c in batch_cases()]
+        results[f"POST /api/calculate[{label}]/batch{BATCH_SIZE}"] = measure(
+            lambda: [post("/api/calculate", b) for b in bodies], repeat
+        )
+        results[f"POST /api/calculate/batch[{label}]/batch{BATCH_SIZE}"] = measure(
+            lambda: post("/api/calculate/batch", bodies), repeat
+        )
+    return results
+
+
+GROUPS = {"domain": bench_domain, "excel": bench_excel, "http": bench_http, "startup": bench_startup}
+
+
+def compare(old_path: str, new_path: str) -> None:
+    old = json.loads(Path(old_path).read_text())["benchmarks"]
+    new = json.loads(Path(new_path).read_text())["benchmarks"]
+    print(f"{'benchmark':60} {'antes ms':>10} {'después ms':>11} {'cambio':>8}")
+    for name in sorted(set(old) | set(new)):
+        a = old.get(name, {}).get("median_ms")
+        b = new.get(name, {}).get("median_ms")
+        if a is None or b is None:
+            print(f"{name:60} {a if a is not None else '-':>10} {b if b is not None else '-':>11}")
+            continue
+        print(f"{name:60} {a:10.3f} {b:11.3f} {(b - a) / a * 100:+7.1f}%")
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="grupos a ejecutar")
+    parser.add_argument("--repeat", type=int, default=7, help="muestras por benchmark")
+    parser.add_argument("--output", help="archivo JSON de salida")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="compara dos corridas")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    benchmarks: Dict[str, Any] = {}
+    for group in args.only or list(GROUPS):
+        print(f"== {group}", file=sys.stderr)
+        for name, stats in GROUPS[group](args.repeat).items():
+            print(f"{name:60} {stats['median_ms']:10.3f} ms", file=sys.stderr)
+            benchmarks[name] = stats
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "benchmarks": benchmarks,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados en {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
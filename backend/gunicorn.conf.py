@@ -0,0 +1,24 @@
+"""Configuración de gunicorn (desde backend/): ``gunicorn app:app``.
+
+Con ``preload_app`` la aplicación se crea una sola vez en el proceso maestro y
+``WARM_UP`` hace que ``create_app`` cargue ahí openpyxl, requests, dateutil y
+las plantillas; los workers nacen por fork con todo eso ya en memoria.
+"""
+import gc
+import multiprocessing
+import os
+
+os.environ.setdefault("WARM_UP", "true")
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    # Congela los objetos ya creados para que el GC de los workers no toque
+    # sus páginas (evita copiar memoria compartida tras el fork)
+    if preload_app:
+        gc.freeze()
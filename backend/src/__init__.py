@@ -1,16 +1,23 @@
 from __future__ import annotations
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 
+from .auth import TokenCache, build_roble_client
+from .cache import TTLCache
+from . import compression, metrics
 from .config import Settings
-from .routes import api_bp
+from .history import HistoryStore
+from .jobs import ExportJobs
+from .routes import api_bp, excel_builder
+from .serialization import LiquidationJSONProvider
 
 
 def create_app(settings: Settings | None = None) -> Flask:
     settings = settings or Settings.from_env()
 
     app = Flask(__name__)
+    app.json = LiquidationJSONProvider(app, serializer=settings.json_serializer)
 
     # CORS
     cors_kwargs = {}
@@ -18,13 +25,62 @@ def create_app(settings: Settings | None = None) -> Flask:
         cors_kwargs["origins"] = settings.allowed_origins
     CORS(app, **cors_kwargs)
 
+    # Medición por petición (Server-Timing, histogramas) y perfilado opcional
+    metrics.init_app(
+        app,
+        profile_slow_ms=settings.profile_slow_ms,
+        profile_dir=settings.profile_dir,
+        profile_interval_ms=settings.profile_interval_ms,
+    )
+
+    # Compresión gzip/brotli de respuestas JSON grandes (se registra después de metrics para entrar en Server-Timing)
+    compression.init_app(
+        app,
+        min_bytes=settings.compress_min_bytes,
+        gzip_level=settings.compress_level,
+        brotli_quality=settings.brotli_quality,
+    )
+
+    # Límite del cuerpo de las peticiones (werkzeug lo aplica también a cuerpos sin Content-Length)
+    app.config["MAX_CONTENT_LENGTH"] = settings.max_content_length or None
+
     # Registrar blueprints
     app.register_blueprint(api_bp, url_prefix="/api")
 
+    # Cliente HTTP compartido hacia Roble
+    app.config["ROBLE_CLIENT"] = build_roble_client(settings)
+
+    # Caché de verificación de tokens
+    app.config["TOKEN_CACHE"] = TokenCache(
+        ttl=settings.token_cache_ttl,
+        maxsize=settings.token_cache_size,
+        negative_ttl=settings.token_cache_negative_ttl,
+    )
+
+    # Caché de resultados de liquidación (tramos y XLSX generado)
+    app.config["RESULT_CACHE"] = TTLCache(maxsize=settings.result_cache_size, ttl=settings.result_cache_ttl)
+
+    # Historial de cálculos guardados (la conexión se abre por hilo al primer uso)
+    app.config["HISTORY_STORE"] = HistoryStore(settings.history_db_path, count_cap=settings.history_count_cap)
+
+    # Exportaciones en segundo plano (el pool se crea en cada worker al primer envío)
+    app.config["EXPORT_JOBS"] = ExportJobs(
+        settings.export_jobs_dir,
+        workers=settings.export_jobs_workers,
+        max_queue=settings.export_jobs_max_queue,
+        ttl=settings.export_jobs_ttl,
+        timeout=settings.export_jobs_timeout,
+        executor=settings.export_jobs_executor,
+    )
+
     # Healthcheck
     @app.get("/api/health")
     def health():
-        return {"status": "ok"}
+        return {"status": "ok", "tokenCache": app.config["TOKEN_CACHE"].stats()}
+
+    @app.get("/api/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
     # Errores estándar
     @app.errorhandler(400)
@@ -35,12 +91,61 @@ def create_app(settings: Settings | None = None) -> Flask:
     def handle_401(err):
         return jsonify({"error": "Unauthorized", "detail": getattr(err, "description", None)}), 401
 
+    @app.errorhandler(404)
+    def handle_404(err):
+        return jsonify({"error": "Not Found", "detail": getattr(err, "description", None)}), 404
+
+    @app.errorhandler(409)
+    def handle_409(err):
+        return jsonify({"error": "Conflict", "detail": getattr(err, "description", None)}), 409
+
+    @app.errorhandler(413)
+    def handle_413(err):
+        return jsonify({"error": "Content Too Large", "detail": getattr(err, "description", None)}), 413
+
+    @app.errorhandler(502)
+    def handle_502(err):
+        return jsonify({"error": "Bad Gateway", "detail": getattr(err, "description", None)}), 502
+
+    @app.errorhandler(503)
+    def handle_503(err):
+        response = jsonify({"error": "Service Unavailable", "detail": getattr(err, "description", None)})
+        if getattr(err, "retry_after", None) is not None:
+            response.headers["Retry-After"] = str(err.retry_after)
+        return response, 503
+
     @app.errorhandler(500)
     def handle_500(err):
         return jsonify({"error": "Internal Server Error"}), 500
 
     # Guardar settings en app
     app.config["SETTINGS"] = settings
+    if settings.warm_up:
+        warm_up(app)
     return app
 
 
+def warm_up(app: Flask) -> None:
+    """Carga una vez lo que los workers usarían en su primera petición.
+
+    Pensado para el proceso maestro de gunicorn con ``preload_app``: los módulos
+    y tablas quedan en memoria compartida (copy-on-write) y cada worker nuevo
+    arranca listo. No abre sockets; las sesiones HTTP se crean por proceso.
+    """
+    from datetime import date
+
+    from .domain import generate_tramos, rows_engine
+
+    settings: Settings = app.config["SETTINGS"]
+
+    # Tablas de localización, motor de cálculo y dateutil (cálculo con vencimiento)
+    rows_engine(settings.calc_engine)
+    sample = generate_tramos(date(2024, 1, 15), date(2024, 3, 10), 1_000_000.0, 2.0, date(2024, 2, 1))
+
+    # Plantillas de estilo y el generador de XLSX configurado (openpyxl y sus submódulos)
+    excel_builder(settings.excel_writer)(sample).close()
+
+    # Configuración del pool hacia Roble: requests/urllib3 y la política de reintentos
+    app.config["ROBLE_CLIENT"].preload()
+
+
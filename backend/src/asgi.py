@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, abort, jsonify, request
+from werkzeug.exceptions import ClientDisconnected, HTTPException, RequestEntityTooLarge, ServiceUnavailable
+from werkzeug.routing import Rule
+
+from . import create_app
+from .auth import (
+    PREVERIFIED_ENVIRON_KEY,
+    Preverified,
+    bearer_token,
+    build_async_roble_client,
+    require_auth_async,
+    roble_forgot_password_async,
+    roble_login_async,
+    roble_logout_async,
+    roble_reset_password_async,
+    roble_signup_async,
+    roble_signup_direct_async,
+    roble_verify_email_async,
+    verify_token_async,
+)
+from .config import Settings
+from .metrics import STARTED_ENVIRON_KEY
+
+
+# Vistas asíncronas (Roble vía httpx, sin ocupar un hilo): mismas validaciones y respuestas que en routes.py
+async def auth_login():
+    data = request.get_json(force=True) or {}
+    email = str(data.get("email", "")).strip()
+    password = str(data.get("password", ""))
+    if not email or not password:
+        abort(400, description="email y password son requeridos")
+    tokens = await roble_login_async(email, password)
+    return jsonify({"accessToken": tokens.access_token, "refreshToken": tokens.refresh_token})
+
+
+async def auth_signup():
+    data = request.get_json(force=True) or {}
+    email = str(data.get("email", "")).strip()
+    password = str(data.get("password", ""))
+    name = str(data.get("name", "")).strip()
+    if not email or not password or not name:
+        abort(400, description="email, password y name son requeridos")
+    return jsonify(await roble_signup_async(email, password, name))
+
+
+async def auth_signup_direct():
+    data = request.get_json(force=True) or {}
+    email = str(data.get("email", "")).strip()
+    password = str(data.get("password", ""))
+    name = str(data.get("name", "")).strip()
+    if not email or not password or not name:
+        abort(400, description="email, password y name son requeridos")
+    return jsonify(await roble_signup_direct_async(email, password, name))
+
+
+async def auth_verify_email():
+    data = request.get_json(force=True) or {}
+    email = str(data.get("email", "")).strip()
+    code = str(data.get("code", "")).strip()
+    if not email or not code:
+        abort(400, description="email y code son requeridos")
+    return jsonify(await roble_verify_email_async(email, code))
+
+
+async def auth_forgot_password():
+    data = request.get_json(force=True) or {}
+    email = str(data.get("email", "")).strip()
+    if not email:
+        abort(400, description="email es requerido")
+    return jsonify(await roble_forgot_password_async(email))
+
+
+async def auth_reset_password():
+    data = request.get_json(force=True) or {}
+    token = str(data.get("token", "")).strip()
+    new_password = str(data.get("newPassword", ""))
+    if not token or not new_password:
+        abort(400, description="token y newPassword son requeridos")
+    return jsonify(await roble_reset_password_async(token, new_password))
+
+
+async def auth_logout():
+    await require_auth_async()
+    return jsonify(await roble_logout_async(bearer_token()))
+
+
+async def _too_large(**_):
+    abort(413)
+
+
+async def _busy(**_):
+    raise ServiceUnavailable("Servidor ocupado; intente de nuevo en unos segundos", retry_after=2)
+
+
+ASYNC_VIEWS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "api.auth_login": auth_login,
+    "api.auth_signup": auth_signup,
+    "api.auth_signup_direct": auth_signup_direct,
+    "api.auth_verify_email": auth_verify_email,
+    "api.auth_forgot_password": auth_forgot_password,
+    "api.auth_reset_password": auth_reset_password,
+    "api.auth_logout": auth_logout,
+}
+
+
+async def _read_body(receive, limit: Optional[int]) -> bytes:
+    # Con límite se deja de leer en cuanto se supera
+    chunks: List[bytes] = []
+    size = 0
+    while limit is None or size <= limit:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class _BodyReader(io.RawIOBase):
+    """``wsgi.input`` que pide el cuerpo a ``receive()`` a medida que la vista lo lee."""
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop, limit: Optional[int]):
+        self._receive = receive
+        self._loop = loop
+        self._limit = limit
+        self._received = 0
+        self._chunk = b""
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._done = True
+                raise ClientDisconnected()
+            self._chunk = message.get("body", b"")
+            self._done = not message.get("more_body", False)
+            self._received += len(self._chunk)
+            # Sin Content-Length werkzeug solo cortaría el cuerpo en el límite: aquí se responde 413
+            if self._limit is not None and self._received > self._limit:
+                self._chunk, self._done = b"", True
+                raise RequestEntityTooLarge()
+        n = min(len(buffer), len(self._chunk))
+        buffer[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+
+def _environ(scope: Dict[str, Any]) -> Dict[str, Any]:
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 0),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        # El cuerpo termina con el último mensaje de receive(), haya o no Content-Length
+        "wsgi.input_terminated": True,
+    }
+    client = scope.get("client")
+    if client:
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = client[0], str(client[1])
+    for raw_name, raw_value in scope.get("headers", []):
+        key = raw_name.decode("latin-1").upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        value = raw_value.decode("latin-1")
+        if key in environ:
+            value = f"{environ[key]},{value}"
+        environ[key] = value
+    return environ
+
+
+class AsgiApp:
+    """Adaptador ASGI sobre la app Flask de ``create_app``."""
+
+    def __init__(self, flask_app: Flask, workers: int = 8, max_queue: int = 64):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi-cpu")
+        # La cola del executor no tiene tope: se limita aquí cuántas peticiones esperan o corren en el pool
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        environ = _environ(scope)
+        environ[STARTED_ENVIRON_KEY] = time.perf_counter()
+        rule = self._match(environ)
+        endpoint = rule.endpoint if rule is not None else None
+        limit = self.flask_app.config["MAX_CONTENT_LENGTH"]
+        if endpoint in ASYNC_VIEWS:
+            # Cuerpos pequeños: se leen completos en el loop hasta MAX_CONTENT_LENGTH
+            body = await _read_body(receive, limit)
+            environ["wsgi.input"] = io.BytesIO(body)
+            view = ASYNC_VIEWS[endpoint] if limit is None or len(body) <= limit else _too_large
+            await self._dispatch_async(environ, view, send)
+            return
+        if not self._slots.acquire(blocking=False):
+            environ["wsgi.input"] = io.BytesIO()
+            await self._dispatch_async(environ, _busy, send)
+            return
+        environ["wsgi.input"] = io.BufferedReader(_BodyReader(receive, asyncio.get_running_loop(), limit))
+        # El resto corre en el pool como en un worker WSGI; con require_auth el token se verifica antes en el loop
+        try:
+            view = self.flask_app.view_functions.get(endpoint)
+            if getattr(view, "requires_auth", False) and not (
+                environ["REQUEST_METHOD"] == "OPTIONS" and rule.provide_automatic_options
+            ):
+                environ[PREVERIFIED_ENVIRON_KEY] = await self._verify(environ)
+        except BaseException:
+            self._slots.release()
+            raise
+        # El lugar se libera en el hilo al terminar: cancelar esta tarea no detiene la vista
+        await self._run_wsgi(environ, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                client = self.flask_app.config.get("ROBLE_ASYNC_CLIENT")
+                if client is not None:
+                    await client.aclose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _match(self, environ: Dict[str, Any]) -> Optional[Rule]:
+        try:
+            rule, _ = self.flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None
+        return rule
+
+    async def _verify(self, environ: Dict[str, Any]) -> Preverified:
+        t0 = time.perf_counter()
+        with self.flask_app.request_context(environ):
+            try:
+                claims = await verify_token_async(bearer_token())
+            except Exception as err:
+                return Preverified(None, err, time.perf_counter() - t0)
+        return Preverified(claims, None, time.perf_counter() - t0)
+
+    async def _dispatch_async(self, environ: Dict[str, Any], view: Callable[..., Awaitable[Any]], send) -> None:
+        # Equivalente a Flask.wsgi_app/full_dispatch_request con una vista corrutina
+        app = self.flask_app
+        ctx = app.request_context(environ)
+        error: Optional[BaseException] = None
+        try:
+            try:
+                ctx.push()
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**request.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            body, _, headers = response.get_wsgi_response(environ)
+            await send({"type": "http.response.start", "status": response.status_code, "headers": _asgi_headers(headers)})
+            await send({"type": "http.response.body", "body": b"".join(body), "more_body": False})
+        finally:
+            if error is not None and app.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+
+    async def _run_wsgi(self, environ: Dict[str, Any], send) -> None:
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message: Dict[str, Any]) -> None:
+            # Espera a que el loop entregue el mensaje: contrapresión para respuestas en streaming
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run() -> None:
+            # Vista e iteración del cuerpo en el mismo hilo, igual que un worker WSGI
+            def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None) -> None:
+                send_from_thread(
+                    {"type": "http.response.start", "status": int(status.split(" ", 1)[0]), "headers": _asgi_headers(headers)}
+                )
+
+            body = self.flask_app(environ, start_response)
+            try:
+                for chunk in body:
+                    if chunk:
+                        send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                close = getattr(body, "close", None)
+                if close is not None:
+                    close()
+            send_from_thread({"type": "http.response.body", "body": b"", "more_body": False})
+
+        def run_and_release() -> None:
+            try:
+                run()
+            finally:
+                self._slots.release()
+
+        await loop.run_in_executor(self.executor, run_and_release)
+
+
+def _asgi_headers(headers: Iterable[Tuple[str, str]]) -> List[Tuple[bytes, bytes]]:
+    return [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+
+def create_asgi_app(settings: Settings | None = None) -> AsgiApp:
+    settings = settings or Settings.from_env()
+    flask_app = create_app(settings)
+    flask_app.config["ROBLE_ASYNC_CLIENT"] = build_async_roble_client(settings)
+    return AsgiApp(flask_app, workers=settings.asgi_workers, max_queue=settings.asgi_max_queue)
@@ -1,14 +1,73 @@
 from __future__ import annotations
 
+import base64
 import functools
+import hashlib
+import json
+import threading
+import time
 from dataclasses import dataclass
-from typing import Callable, Dict
+from typing import Awaitable, Callable, Dict, Optional
 
-import requests
-from flask import current_app, request, abort
+from flask import current_app, g, request, abort
+from werkzeug.exceptions import HTTPException, ServiceUnavailable
 
+from .cache import AsyncSingleFlight, SingleFlight, TTLCache
+from .metrics import phase, record_phase
+from .roble_client import AsyncRobleClient, RobleClient
 
-ROBLES_BASE = "https://roble-api.openlab.uninorte.edu.co/auth"
+
+def build_roble_client(settings) -> RobleClient:
+    return RobleClient(
+        base_url=settings.roble_base_url,
+        db_name=settings.roble_db_name,
+        pool_size=settings.roble_pool_size,
+        connect_timeout=settings.roble_connect_timeout,
+        read_timeout=settings.roble_read_timeout,
+        slow_read_timeout=settings.roble_slow_read_timeout,
+        max_retries=settings.roble_max_retries,
+        backoff_factor=settings.roble_backoff_factor,
+    )
+
+
+def build_async_roble_client(settings) -> AsyncRobleClient:
+    return AsyncRobleClient(
+        base_url=settings.roble_base_url,
+        db_name=settings.roble_db_name,
+        pool_size=settings.roble_async_pool_size,
+        connect_timeout=settings.roble_connect_timeout,
+        read_timeout=settings.roble_read_timeout,
+        slow_read_timeout=settings.roble_slow_read_timeout,
+        max_retries=settings.roble_max_retries,
+        backoff_factor=settings.roble_backoff_factor,
+    )
+
+
+def _roble_client() -> RobleClient:
+    client = current_app.config.get("ROBLE_CLIENT")
+    if client is None:
+        client = current_app.config["ROBLE_CLIENT"] = build_roble_client(current_app.config["SETTINGS"])
+    return client
+
+
+def _roble_async_client() -> AsyncRobleClient:
+    client = current_app.config.get("ROBLE_ASYNC_CLIENT")
+    if client is None:
+        client = current_app.config["ROBLE_ASYNC_CLIENT"] = build_async_roble_client(current_app.config["SETTINGS"])
+    return client
+
+
+# Las respuestas de requests y httpx exponen status_code/text/json(): la
+# interpretación es la misma para los helpers síncronos y los asíncronos
+def _ensure_ok(res, description: str, code: Optional[int] = None) -> None:
+    if not (200 <= res.status_code < 300):
+        if code is not None:
+            abort(code, description=description)
+        abort(res.status_code, description=res.text or description)
+
+
+def _json_or_ok(res) -> Dict:
+    return res.json() if res.text else {"ok": True}
 
 
 @dataclass
@@ -17,99 +76,345 @@ class RobleTokens:
     refresh_token: str
 
 
-def roble_login(email: str, password: str) -> RobleTokens:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/login"
-    res = requests.post(url, json={"email": email, "password": password}, timeout=15)
-    if not (200 <= res.status_code < 300):
-        abort(401, description="Credenciales inválidas")
+def _login_tokens(res) -> RobleTokens:
+    _ensure_ok(res, "Credenciales inválidas", 401)
     data = res.json()
     return RobleTokens(access_token=data.get("accessToken", ""), refresh_token=data.get("refreshToken", ""))
 
 
+ROBLE_UNAVAILABLE = "Roble no está disponible; intente de nuevo en unos segundos"
+
+
+def _roble_call(method: str, path: str, **kwargs):
+    import requests
+
+    try:
+        return getattr(_roble_client(), method)(path, **kwargs)
+    except requests.RequestException:
+        # Timeout o conexión fallida tras los reintentos: Roble no está disponible
+        raise ServiceUnavailable(ROBLE_UNAVAILABLE, retry_after=5)
+
+
+async def _roble_call_async(method: str, path: str, **kwargs):
+    import httpx
+
+    try:
+        return await getattr(_roble_async_client(), method)(path, **kwargs)
+    except httpx.HTTPError:
+        raise ServiceUnavailable(ROBLE_UNAVAILABLE, retry_after=5)
+
+
+def roble_login(email: str, password: str) -> RobleTokens:
+    res = _roble_call("post", "login", json={"email": email, "password": password})
+    return _login_tokens(res)
+
+
 def roble_refresh(refresh_token: str) -> str:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/refresh-token"
-    res = requests.post(url, json={"refreshToken": refresh_token}, timeout=15)
-    if not (200 <= res.status_code < 300):
-        abort(401, description="Refresh token inválido")
+    res = _roble_call("post", "refresh-token", json={"refreshToken": refresh_token})
+    _ensure_ok(res, "Refresh token inválido", 401)
     return res.json().get("accessToken", "")
 
 
-def roble_verify(access_token: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/verify-token"
-    res = requests.get(url, headers={"Authorization": f"Bearer {access_token}"}, timeout=15)
-    if not (200 <= res.status_code < 300):
+def _verified_claims(res) -> Dict:
+    # Solo 401/403 rechazan el token (y van a la caché negativa); otra respuesta es una falla de Roble
+    if res.status_code in (401, 403):
         abort(401, description="Token inválido")
+    if not (200 <= res.status_code < 300):
+        abort(502, description=f"Roble respondió {res.status_code} al verificar el token")
     return res.json()
 
 
+def roble_verify(access_token: str) -> Dict:
+    # Una caída de Roble (503) no dice nada sobre el token: no va a la caché negativa
+    res = _roble_call("get", "verify-token", headers={"Authorization": f"Bearer {access_token}"})
+    return _verified_claims(res)
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    # Lee el claim "exp" del JWT sin validar la firma; solo sirve para no cachear más allá del vencimiento
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+class TokenCache:
+    """Caché en proceso de tokens verificados contra Roble.
+
+    Guarda los tokens válidos (LRU con TTL, nunca más allá del ``exp`` del JWT) y,
+    por poco tiempo, los rechazados. Las verificaciones concurrentes del mismo
+    token comparten una única llamada remota.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, negative_ttl: float):
+        self._valid = TTLCache(maxsize, ttl)
+        self._rejected = TTLCache(maxsize, negative_ttl)
+        # Tokens cerrados con logout: una verificación que ya estaba en curso no los vuelve a guardar
+        self._revoked = TTLCache(maxsize, ttl)
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "negative_hits": 0, "coalesced": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # No se guardan tokens en claro
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        claims = self._valid.get(key)
+        if claims is not None:
+            self._count("hits")
+            return claims
+        rejected = self._rejected.get(key)
+        if rejected is not None:
+            self._count("negative_hits")
+            abort(401, description=rejected)
+        return None
+
+    def _reject(self, key: str, err: HTTPException) -> None:
+        # Solo rechazos de Roble (401); un 502/503 no invalida el token
+        if err.code == 401:
+            self._rejected.set(key, err.description or "Token inválido")
+
+    def _store(self, key: str, token: str, data: Dict) -> None:
+        ttl = self._valid.ttl
+        exp = _token_expiry(token)
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        with self._lock:
+            if self._revoked.get(key) is None:
+                self._valid.set(key, data, ttl=ttl)
+
+    def verify(self, token: str, fetch: Callable[[str], Dict]) -> Dict:
+        key = self._key(token)
+        claims = self._lookup(key)
+        if claims is not None:
+            return claims
+
+        def load() -> Dict:
+            self._count("misses")
+            try:
+                data = fetch(token)
+            except HTTPException as err:
+                self._reject(key, err)
+                raise
+            self._store(key, token, data)
+            return data
+
+        data, shared = self._flight.do(key, load)
+        if shared:
+            self._count("coalesced")
+        return data
+
+    async def verify_async(self, token: str, fetch: Callable[[str], Awaitable[Dict]]) -> Dict:
+        """Como ``verify`` pero sin bloquear el event loop; comparte entradas y estadísticas."""
+        key = self._key(token)
+        claims = self._lookup(key)
+        if claims is not None:
+            return claims
+
+        async def load() -> Dict:
+            self._count("misses")
+            try:
+                data = await fetch(token)
+            except HTTPException as err:
+                self._reject(key, err)
+                raise
+            self._store(key, token, data)
+            return data
+
+        data, shared = await self._async_flight.do(key, load)
+        if shared:
+            self._count("coalesced")
+        return data
+
+    def evict(self, token: str) -> None:
+        """Saca el token de la caché y lo marca para que no vuelva a guardarse mientras dure el TTL."""
+        key = self._key(token)
+        with self._lock:
+            self._revoked.set(key, True)
+            self._valid.pop(key)
+        self._rejected.pop(key)
+        self._count("evictions")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"] + stats["coalesced"]
+        stats["size"] = len(self._valid)
+        stats["hit_ratio"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def verify_token(access_token: str) -> Dict:
+    cache: Optional[TokenCache] = current_app.config.get("TOKEN_CACHE")
+    if cache is None:
+        return roble_verify(access_token)
+    return cache.verify(access_token, roble_verify)
+
+
+# Clave del environ WSGI con la verificación ya resuelta por el modo ASGI (ver asgi.py)
+PREVERIFIED_ENVIRON_KEY = "liquidation.preverified"
+
+
+@dataclass
+class Preverified:
+    claims: Optional[Dict]
+    error: Optional[BaseException]
+    seconds: float
+
+
+def bearer_token() -> str:
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        abort(401, description="Falta token")
+    return auth_header.split(" ", 1)[1]
+
+
 def require_auth(view_func: Callable):
     @functools.wraps(view_func)
     def wrapper(*args, **kwargs):
-        auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
-            abort(401, description="Falta token")
-        token = auth_header.split(" ", 1)[1]
-        roble_verify(token)
+        token = bearer_token()
+        preverified: Optional[Preverified] = request.environ.get(PREVERIFIED_ENVIRON_KEY)
+        if preverified is not None:
+            record_phase("verify", preverified.seconds)
+            if preverified.error is not None:
+                raise preverified.error
+            g.auth_claims = preverified.claims
+        else:
+            with phase("verify"):
+                g.auth_claims = verify_token(token)
         return view_func(*args, **kwargs)
 
+    # El modo ASGI reconoce las vistas protegidas para verificar el token en el event loop
+    wrapper.requires_auth = True
     return wrapper
 
 
+def current_user_id() -> str:
+    """Identificador del usuario autenticado (vistas con ``require_auth``)."""
+    claims = g.get("auth_claims") or {}
+    user = claims.get("user") if isinstance(claims.get("user"), dict) else {}
+    for source in (user, claims):
+        for key in ("id", "sub", "email"):
+            if source.get(key):
+                return str(source[key])
+    abort(401, description="Token sin identificador de usuario")
+
+
 # Signup y manejo de cuentas
 def roble_signup(email: str, password: str, name: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/signup"
-    res = requests.post(url, json={"email": email, "password": password, "name": name}, timeout=20)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error en signup")
+    res = _roble_call("post", "signup", json={"email": email, "password": password, "name": name}, slow=True)
+    _ensure_ok(res, "Error en signup")
     return res.json()
 
 
 def roble_signup_direct(email: str, password: str, name: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/signup-direct"
-    res = requests.post(url, json={"email": email, "password": password, "name": name}, timeout=20)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error en signup-direct")
+    res = _roble_call("post", "signup-direct", json={"email": email, "password": password, "name": name}, slow=True)
+    _ensure_ok(res, "Error en signup-direct")
     return res.json()
 
 
 def roble_verify_email(email: str, code: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/verify-email"
-    res = requests.post(url, json={"email": email, "code": code}, timeout=20)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error al verificar correo")
+    res = _roble_call("post", "verify-email", json={"email": email, "code": code}, slow=True)
+    _ensure_ok(res, "Error al verificar correo")
     return res.json()
 
 
 def roble_forgot_password(email: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/forgot-password"
-    res = requests.post(url, json={"email": email}, timeout=20)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error al solicitar recuperación")
-    return res.json() if res.text else {"ok": True}
+    res = _roble_call("post", "forgot-password", json={"email": email}, slow=True)
+    _ensure_ok(res, "Error al solicitar recuperación")
+    return _json_or_ok(res)
 
 
 def roble_reset_password(token: str, new_password: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/reset-password"
-    res = requests.post(url, json={"token": token, "newPassword": new_password}, timeout=20)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error al restablecer")
-    return res.json() if res.text else {"ok": True}
+    res = _roble_call("post", "reset-password", json={"token": token, "newPassword": new_password}, slow=True)
+    _ensure_ok(res, "Error al restablecer")
+    return _json_or_ok(res)
 
 
 def roble_logout(access_token: str) -> Dict:
-    db_name = current_app.config["SETTINGS"].roble_db_name
-    url = f"{ROBLES_BASE}/{db_name}/logout"
-    res = requests.post(url, headers={"Authorization": f"Bearer {access_token}"}, timeout=15)
-    if not (200 <= res.status_code < 300):
-        abort(res.status_code, description=res.text or "Error al cerrar sesión")
-    return res.json() if res.text else {"ok": True}
+    cache: Optional[TokenCache] = current_app.config.get("TOKEN_CACHE")
+    if cache is not None:
+        cache.evict(access_token)
+    res = _roble_call("post", "logout", headers={"Authorization": f"Bearer {access_token}"})
+    _ensure_ok(res, "Error al cerrar sesión")
+    return _json_or_ok(res)
+
+
+# Versiones asíncronas (modo ASGI): mismas llamadas y mismos errores, sin ocupar un hilo
+async def roble_login_async(email: str, password: str) -> RobleTokens:
+    res = await _roble_call_async("post", "login", json={"email": email, "password": password})
+    return _login_tokens(res)
+
+
+async def roble_verify_async(access_token: str) -> Dict:
+    res = await _roble_call_async("get", "verify-token", headers={"Authorization": f"Bearer {access_token}"})
+    return _verified_claims(res)
+
+
+async def verify_token_async(access_token: str) -> Dict:
+    cache: Optional[TokenCache] = current_app.config.get("TOKEN_CACHE")
+    if cache is None:
+        return await roble_verify_async(access_token)
+    return await cache.verify_async(access_token, roble_verify_async)
+
+
+async def require_auth_async() -> Dict:
+    """Equivalente de ``require_auth`` para el modo ASGI; devuelve los claims verificados."""
+    token = bearer_token()
+    with phase("verify"):
+        return await verify_token_async(token)
+
+
+async def roble_signup_async(email: str, password: str, name: str) -> Dict:
+    res = await _roble_call_async(
+        "post", "signup", json={"email": email, "password": password, "name": name}, slow=True
+    )
+    _ensure_ok(res, "Error en signup")
+    return res.json()
+
+
+async def roble_signup_direct_async(email: str, password: str, name: str) -> Dict:
+    res = await _roble_call_async(
+        "post", "signup-direct", json={"email": email, "password": password, "name": name}, slow=True
+    )
+    _ensure_ok(res, "Error en signup-direct")
+    return res.json()
+
+
+async def roble_verify_email_async(email: str, code: str) -> Dict:
+    res = await _roble_call_async("post", "verify-email", json={"email": email, "code": code}, slow=True)
+    _ensure_ok(res, "Error al verificar correo")
+    return res.json()
+
+
+async def roble_forgot_password_async(email: str) -> Dict:
+    res = await _roble_call_async("post", "forgot-password", json={"email": email}, slow=True)
+    _ensure_ok(res, "Error al solicitar recuperación")
+    return _json_or_ok(res)
+
+
+async def roble_reset_password_async(token: str, new_password: str) -> Dict:
+    res = await _roble_call_async(
+        "post", "reset-password", json={"token": token, "newPassword": new_password}, slow=True
+    )
+    _ensure_ok(res, "Error al restablecer")
+    return _json_or_ok(res)
 
 
+async def roble_logout_async(access_token: str) -> Dict:
+    cache: Optional[TokenCache] = current_app.config.get("TOKEN_CACHE")
+    if cache is not None:
+        cache.evict(access_token)
+    res = await _roble_call_async("post", "logout", headers={"Authorization": f"Bearer {access_token}"})
+    _ensure_ok(res, "Error al cerrar sesión")
+    return _json_or_ok(res)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import re
+import time
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from .domain import generate_tramos
+
+# Descarga de POST /api/export/bulk: un XLSX por cálculo en un ZIP, o un libro con una hoja por cálculo
+BULK_FORMATS = ("zip", "xlsx")
+ERRORS_FILE = "ERRORES.txt"
+ERRORS_SHEET = "Errores"
+
+# Excel limita el nombre de la hoja a 31 caracteres y no admite []:*?/\ (ni caracteres de control, inválidos en XML)
+_SHEET_NAME_MAX = 31
+_SHEET_FORBIDDEN = re.compile(r"[\[\]:*?/\\\x00-\x1f]")
+_FILENAME_FORBIDDEN = re.compile(r"[^\w\-. ]+")
+_COPY_CHUNK = 256 * 1024
+
+
+class _Sink:
+    """Destino de escritura no seekable: acumula lo escrito hasta ``drain``."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        # Se vacía después de cada archivo u hoja: en memoria nunca está el archivo completo
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def _unique(name: str, used: Set[str], max_len: int, suffix: str = "") -> str:
+    # Nombres repetidos: "Caso", "Caso (2)", ... (sin distinguir mayúsculas, como Excel)
+    candidate, n = name[:max_len], 1
+    while f"{candidate}{suffix}".lower() in used:
+        n += 1
+        tail = f" ({n})"
+        candidate = f"{name[: max_len - len(tail)]}{tail}"
+    used.add(f"{candidate}{suffix}".lower())
+    return f"{candidate}{suffix}"
+
+
+def sheet_names(names: Iterable[str]) -> List[str]:
+    used: Set[str] = set()
+    return [
+        _unique(_SHEET_FORBIDDEN.sub("_", name).strip("' ") or "Liquidación", used, _SHEET_NAME_MAX) for name in names
+    ]
+
+
+def file_names(names: Iterable[str]) -> List[str]:
+    used: Set[str] = set()
+    cleaned = (_FILENAME_FORBIDDEN.sub("_", name.removesuffix(".xlsx")).strip(" .") for name in names)
+    return [_unique(name or "liquidacion", used, 120, ".xlsx") for name in cleaned]
+
+
+def error_report(failures: Iterable[Tuple[int, str, BaseException]]) -> str:
+    """Texto con los cálculos omitidos: ``(índice, nombre, excepción)`` por cada uno."""
+    lines = ["No se pudieron generar estos cálculos:"]
+    for index, name, exc in failures:
+        if isinstance(exc, BrokenProcessPool):
+            reason = "el proceso de exportación terminó inesperadamente"
+        else:
+            reason = f"error al generar el archivo ({type(exc).__name__})"
+        lines.append(f"calculos[{index}] {name}: {reason}")
+    return "\n".join(lines) + "\n"
+
+
+def render_item(payload: Dict[str, Any], fmt: str, engine: str) -> Tuple[Any, int]:
+    """Cuerpo de cada elemento (corre en el pool); devuelve también las filas generadas para las métricas."""
+    # Con xlsx la hoja se escribe en el libro compartido: basta con el resultado
+    result = generate_tramos(
+        payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"], engine=engine
+    )
+    rows = sum(len(t["rows"]) for t in result["tramos"])
+    if fmt == "xlsx":
+        return result, rows
+    # Generador directo sin importar EXCEL_WRITER: un libro de openpyxl por cálculo es el costo que se evita aquí
+    from .xlsx_writer import build_xlsx_direct
+
+    stream = build_xlsx_direct(result)
+    try:
+        return stream.read(), rows
+    finally:
+        stream.close()
+
+
+def stream_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """ZIP (sin compresión) de ``(nombre, contenido)`` enviado por fragmentos."""
+    # Sin recomprimir: el XLSX ya es un ZIP
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in files:
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            with zf.open(info, "w") as dst:
+                for start in range(0, len(data), _COPY_CHUNK):
+                    dst.write(data[start : start + _COPY_CHUNK])
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def stream_workbook(sheets: Iterable[Tuple[str, Union[Dict[str, Any], str]]]) -> Iterator[bytes]:
+    """Libro con una hoja por resultado, enviado hoja a hoja."""
+    from .xlsx_writer import iter_workbook
+
+    sink = _Sink()
+    for _ in iter_workbook(sink, sheets):
+        yield from sink.drain()
+    yield from sink.drain()
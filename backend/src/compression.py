@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, request
+
+from .metrics import phase
+
+
+# brotli es opcional (paquete brotli o brotlicffi); sin él solo se ofrece gzip
+def _load_brotli():
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+
+def _compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    # JSON y NDJSON; el XLSX ya es un ZIP y no se toca
+    return mimetype.startswith("text/") or mimetype.endswith(("json", "ndjson"))
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 31: cabecera y cola gzip
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, brotli, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+        # brotli expone process(); brotlicffi, compress()
+        self._process = getattr(self._c, "process", None) or self._c.compress
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+def _compress_stream(body: Iterable[bytes], compressor) -> Iterator[bytes]:
+    try:
+        for data in body:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            if data:
+                yield compressor.chunk(data)
+        yield compressor.finish()
+    finally:
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+
+def init_app(app: Flask, min_bytes: int = 1024, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+    """Registra la compresión de respuestas; ``min_bytes`` < 0 la desactiva."""
+    if min_bytes < 0:
+        return
+    brotli = _load_brotli()
+
+    def choose_encoding() -> Optional[str]:
+        accepted = request.accept_encodings
+        br, gz = accepted["br"], accepted["gzip"]
+        if brotli is not None and br > 0 and br >= gz:
+            return "br"
+        if gz > 0:
+            return "gzip"
+        return None
+
+    def new_compressor(encoding: str):
+        return _Brotli(brotli, brotli_quality) if encoding == "br" else _Gzip(gzip_level)
+
+    @app.after_request
+    def _compress(response):
+        if (
+            request.method == "HEAD"
+            or not 200 <= response.status_code < 300
+            or response.status_code == 204
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not _compressible(response.mimetype)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+
+        # Los lotes NDJSON se comprimen por fragmento con flush: el cliente recibe cada línea en cuanto se calcula
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, new_compressor(encoding))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_bytes:
+                return response
+            with phase("compress"):
+                compressor = new_compressor(encoding)
+                response.set_data(compressor.chunk(data) + compressor.finish())
+        response.headers["Content-Encoding"] = encoding
+        # La representación comprimida es otra secuencia de bytes: la etiqueta pasa a débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
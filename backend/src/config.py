@@ -12,6 +12,46 @@ class Settings:
     debug: bool
     host: str
     port: int
+    roble_base_url: str = "https://roble-api.openlab.uninorte.edu.co/auth"
+    token_cache_ttl: float = 60.0
+    token_cache_size: int = 10_000
+    token_cache_negative_ttl: float = 5.0
+    roble_pool_size: int = 10
+    roble_connect_timeout: float = 5.0
+    roble_read_timeout: float = 15.0
+    roble_slow_read_timeout: float = 20.0
+    roble_max_retries: int = 2
+    roble_backoff_factor: float = 0.2
+    calc_engine: str = "python"
+    excel_writer: str = "stream"
+    result_cache_size: int = 256
+    result_cache_ttl: float = 600.0
+    result_cache_max_xlsx_bytes: int = 2 * 1024 * 1024
+    batch_max_cases: int = 5_000
+    batch_max_line_bytes: int = 64 * 1024
+    max_content_length: int = 64 * 1024 * 1024
+    rows_page_max: int = 1200
+    profile_slow_ms: float = 0.0
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    warm_up: bool = False
+    asgi_workers: int = 8
+    asgi_max_queue: int = 64
+    roble_async_pool_size: int = 100
+    history_db_path: str = "history.db"
+    history_page_max: int = 200
+    history_count_cap: int = 1000
+    json_serializer: str = "stdlib"
+    compress_min_bytes: int = 1024
+    compress_level: int = 6
+    brotli_quality: int = 5
+    export_jobs_dir: str = "export_jobs"
+    export_jobs_executor: str = "process"
+    export_jobs_workers: int = 2
+    export_jobs_max_queue: int = 16
+    export_jobs_ttl: float = 3600.0
+    export_jobs_timeout: float = 600.0
+    bulk_export_max: int = 200
 
     @staticmethod
     def from_env() -> "Settings":
@@ -22,12 +62,109 @@ class Settings:
         debug = os.getenv("FLASK_DEBUG", "true").lower() == "true"
         host = os.getenv("HOST", "0.0.0.0")
         port = int(os.getenv("PORT", "5000"))
+        # API de autenticación de Roble (en pruebas de carga: benchmarks.fake_roble)
+        roble_base_url = os.getenv("ROBLE_BASE_URL", "https://roble-api.openlab.uninorte.edu.co/auth")
+        # Caché de tokens verificados (TTL en segundos; 0 desactiva)
+        token_cache_ttl = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+        token_cache_size = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+        token_cache_negative_ttl = float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "5"))
+        # Cliente HTTP hacia Roble (pool por worker, timeouts en segundos)
+        roble_pool_size = int(os.getenv("ROBLE_POOL_SIZE", "10"))
+        roble_connect_timeout = float(os.getenv("ROBLE_CONNECT_TIMEOUT", "5"))
+        roble_read_timeout = float(os.getenv("ROBLE_READ_TIMEOUT", "15"))
+        roble_slow_read_timeout = float(os.getenv("ROBLE_SLOW_READ_TIMEOUT", "20"))
+        roble_max_retries = int(os.getenv("ROBLE_MAX_RETRIES", "2"))
+        roble_backoff_factor = float(os.getenv("ROBLE_BACKOFF_FACTOR", "0.2"))
+        # Motor de cálculo de tramos: "python" o "numpy"
+        calc_engine = os.getenv("CALC_ENGINE", "python").strip().lower()
+        # Generador de XLSX: "stream" (openpyxl write-only), "direct" (SpreadsheetML sin openpyxl) o "classic"
+        excel_writer = os.getenv("EXCEL_WRITER", "stream").strip().lower()
+        # Caché de resultados compartida por /calculate y /export (0 desactiva)
+        result_cache_size = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+        result_cache_ttl = float(os.getenv("RESULT_CACHE_TTL", "600"))
+        result_cache_max_xlsx_bytes = int(os.getenv("RESULT_CACHE_MAX_XLSX_BYTES", str(2 * 1024 * 1024)))
+        # Lotes: tope de casos para cuerpos JSON (NDJSON no tiene tope) y tamaño máximo por caso
+        batch_max_cases = int(os.getenv("BATCH_MAX_CASES", "5000"))
+        batch_max_line_bytes = int(os.getenv("BATCH_MAX_LINE_BYTES", str(64 * 1024)))
+        # Tamaño máximo del cuerpo de una petición (413 si se supera; 0 lo desactiva)
+        max_content_length = int(os.getenv("MAX_CONTENT_LENGTH", str(64 * 1024 * 1024)))
+        # Filas paginadas (/calculate/rows): máximo de meses por página
+        rows_page_max = int(os.getenv("ROWS_PAGE_MAX", "1200"))
+        # Perfilado por muestreo de peticiones lentas (opt-in: PROFILE_SLOW_MS > 0)
+        profile_slow_ms = float(os.getenv("PROFILE_SLOW_MS", "0"))
+        profile_dir = os.getenv("PROFILE_DIR", "profiles")
+        profile_interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+        # Precarga de módulos pesados y estado compartido en create_app (gunicorn --preload)
+        warm_up = os.getenv("WARM_UP", "false").lower() == "true"
+        # Modo ASGI: hilos para el trabajo de CPU y conexiones simultáneas hacia Roble
+        asgi_workers = int(os.getenv("ASGI_WORKERS", "8"))
+        # Peticiones que pueden esperar un hilo libre; con más se responde 503
+        asgi_max_queue = int(os.getenv("ASGI_MAX_QUEUE", "64"))
+        roble_async_pool_size = int(os.getenv("ROBLE_ASYNC_POOL_SIZE", "100"))
+        # Historial de cálculos (SQLite): tamaño máximo de página y tope del conteo con filtros
+        history_db_path = os.getenv("HISTORY_DB_PATH", "history.db")
+        history_page_max = int(os.getenv("HISTORY_PAGE_MAX", "200"))
+        history_count_cap = int(os.getenv("HISTORY_COUNT_CAP", "1000"))
+        # Serializador JSON ("auto", "orjson" o "stdlib") y compresión gzip/brotli (COMPRESS_MIN_BYTES < 0 la desactiva)
+        json_serializer = os.getenv("JSON_SERIALIZER", "stdlib").strip().lower()
+        compress_min_bytes = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+        compress_level = int(os.getenv("COMPRESS_LEVEL", "6"))
+        brotli_quality = int(os.getenv("BROTLI_QUALITY", "5"))
+        # Exportaciones en segundo plano: pool por worker ("process" o "thread"), cola máxima y vida de los archivos
+        export_jobs_dir = os.getenv("EXPORT_JOBS_DIR", "export_jobs")
+        export_jobs_executor = os.getenv("EXPORT_JOBS_EXECUTOR", "process").strip().lower()
+        export_jobs_workers = int(os.getenv("EXPORT_JOBS_WORKERS", "2"))
+        export_jobs_max_queue = int(os.getenv("EXPORT_JOBS_MAX_QUEUE", "16"))
+        export_jobs_ttl = float(os.getenv("EXPORT_JOBS_TTL", "3600"))
+        export_jobs_timeout = float(os.getenv("EXPORT_JOBS_TIMEOUT", "600"))
+        # Exportación masiva (/export/bulk): máximo de cálculos por descarga
+        bulk_export_max = int(os.getenv("BULK_EXPORT_MAX", "200"))
         return Settings(
             roble_db_name=roble_db_name,
             allowed_origins=allowed_origins,
             debug=debug,
             host=host,
             port=port,
+            roble_base_url=roble_base_url,
+            token_cache_ttl=token_cache_ttl,
+            token_cache_size=token_cache_size,
+            token_cache_negative_ttl=token_cache_negative_ttl,
+            roble_pool_size=roble_pool_size,
+            roble_connect_timeout=roble_connect_timeout,
+            roble_read_timeout=roble_read_timeout,
+            roble_slow_read_timeout=roble_slow_read_timeout,
+            roble_max_retries=roble_max_retries,
+            roble_backoff_factor=roble_backoff_factor,
+            calc_engine=calc_engine,
+            excel_writer=excel_writer,
+            result_cache_size=result_cache_size,
+            result_cache_ttl=result_cache_ttl,
+            result_cache_max_xlsx_bytes=result_cache_max_xlsx_bytes,
+            batch_max_cases=batch_max_cases,
+            batch_max_line_bytes=batch_max_line_bytes,
+            max_content_length=max_content_length,
+            rows_page_max=rows_page_max,
+            profile_slow_ms=profile_slow_ms,
+            profile_dir=profile_dir,
+            profile_interval_ms=profile_interval_ms,
+            warm_up=warm_up,
+            asgi_workers=asgi_workers,
+            asgi_max_queue=asgi_max_queue,
+            roble_async_pool_size=roble_async_pool_size,
+            history_db_path=history_db_path,
+            history_page_max=history_page_max,
+            history_count_cap=history_count_cap,
+            json_serializer=json_serializer,
+            compress_min_bytes=compress_min_bytes,
+            compress_level=compress_level,
+            brotli_quality=brotli_quality,
+            export_jobs_dir=export_jobs_dir,
+            export_jobs_executor=export_jobs_executor,
+            export_jobs_workers=export_jobs_workers,
+            export_jobs_max_queue=export_jobs_max_queue,
+            export_jobs_ttl=export_jobs_ttl,
+            export_jobs_timeout=export_jobs_timeout,
+            bulk_export_max=bulk_export_max,
         )
 
 
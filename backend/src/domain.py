@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import locale
+from calendar import isleap, monthrange
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Generator, List, Tuple
+from typing import Any, Dict, Generator, Iterator, List, Tuple
 
-from dateutil.relativedelta import relativedelta
+from .localization import DATE_FMT, format_date, month_name_es
+from .rates import RateSchedule
 
 
-DATE_FMT = "%d/%m/%Y"
+# Motores de cálculo disponibles; "numpy" requiere numpy instalado
+ENGINES = ("python", "numpy")
 
 
 def parse_date(value: str) -> date:
@@ -16,37 +18,78 @@ def parse_date(value: str) -> date:
 
 
 def last_day_of_month(d: date) -> date:
-    first_next_month = d.replace(day=1) + relativedelta(months=+1)
-    return first_next_month - timedelta(days=1)
-
-
-def month_name_es(d: date) -> str:
-    try:
-        locale.setlocale(locale.LC_TIME, "es_ES.UTF-8")
-    except locale.Error:
-        try:
-            locale.setlocale(locale.LC_TIME, "es_ES")
-        except locale.Error:
-            nombres = [
-                "enero",
-                "febrero",
-                "marzo",
-                "abril",
-                "mayo",
-                "junio",
-                "julio",
-                "agosto",
-                "septiembre",
-                "octubre",
-                "noviembre",
-                "diciembre",
-            ]
-            return nombres[d.month - 1].capitalize()
-    return d.strftime("%B").capitalize()
-
-
-def daterange_monthly(start: date, end: date) -> Generator[Tuple[date, date], None, None]:
+    return d.replace(day=monthrange(d.year, d.month)[1])
+
+
+class Row:
+    """Fila mensual compacta; las fechas se formatean solo al serializar (JSON/Excel)."""
+
+    __slots__ = ("start", "end", "days", "base", "rate", "interest")
+
+    KEYS = ("mes", "del", "hasta", "dias", "base", "tasa", "interes")
+
+    def __init__(self, start: date, end: date, days: int, base: float, rate: float, interest: int):
+        self.start = start
+        self.end = end
+        self.days = days
+        self.base = base
+        self.rate = rate
+        self.interest = interest
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "mes":
+            return month_name_es(self.start)
+        if key == "del":
+            return format_date(self.start)
+        if key == "hasta":
+            return format_date(self.end)
+        if key == "dias":
+            return self.days
+        if key == "base":
+            return self.base
+        if key == "tasa":
+            return self.rate
+        if key == "interes":
+            return self.interest
+        raise KeyError(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mes": month_name_es(self.start),
+            "del": format_date(self.start),
+            "hasta": format_date(self.end),
+            "dias": self.days,
+            "base": self.base,
+            "tasa": self.rate,
+            "interes": self.interest,
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Row):
+            return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Row({self.start}, {self.end}, dias={self.days}, interes={self.interest})"
+
+
+def month_count(start: date, end: date) -> int:
+    """Cantidad de tramos mensuales que produce ``daterange_monthly(start, end)``."""
+    if start > end:
+        return 0
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def daterange_monthly(start: date, end: date, offset: int = 0) -> Generator[Tuple[date, date], None, None]:
     current_start = start
+    if offset > 0:
+        # Salta directo al mes número ``offset`` sin recorrer los anteriores
+        if offset >= month_count(start, end):
+            return
+        index = start.month - 1 + offset
+        current_start = date(start.year + index // 12, index % 12 + 1, 1)
     while current_start <= end:
         month_end = last_day_of_month(current_start)
         current_end = min(month_end, end)
@@ -54,65 +97,206 @@ def daterange_monthly(start: date, end: date) -> Generator[Tuple[date, date], No
         current_start = current_end + timedelta(days=1)
 
 
-def calculate_rows(start: date, end: date, base: float, monthly_rate_pct: float):
-    rows = []
-    total_interest = 0
-    for dt_start, dt_end in daterange_monthly(start, end):
+def iter_rows(
+    start: date, end: date, base: float, monthly_rate_pct: float | RateSchedule, offset: int = 0
+) -> Iterator[Row]:
+    """Filas mensuales bajo demanda, desde el mes ``offset`` (0 = el de ``start``)."""
+    # monthly_rate_pct puede ser una tasa fija o un calendario de tasas (RateSchedule)
+    schedule = monthly_rate_pct if isinstance(monthly_rate_pct, RateSchedule) else None
+    rate = monthly_rate_pct
+    for dt_start, dt_end in daterange_monthly(start, end, offset):
         days = (dt_end - dt_start).days + 1
-        interest = base * (monthly_rate_pct / 100.0) * (days / 30.0)
-        interest_rounded = int(round(interest))
-        total_interest += interest_rounded
-        rows.append(
-            {
-                "mes": month_name_es(dt_start),
-                "del": dt_start.strftime(DATE_FMT),
-                "hasta": dt_end.strftime(DATE_FMT),
-                "dias": days,
-                "base": base,
-                "tasa": monthly_rate_pct,
-                "interes": interest_rounded,
-            }
-        )
-    return rows, int(total_interest)
+        if schedule is None:
+            interest = base * (monthly_rate_pct / 100.0) * (days / 30.0)
+        else:
+            rate, interest = schedule.segment(dt_start, dt_end, base)
+        yield Row(dt_start, dt_end, days, base, rate, int(round(interest)))
+
+
+def calculate_rows(
+    start: date, end: date, base: float, monthly_rate_pct: float | RateSchedule
+) -> Tuple[List[Row], int]:
+    rows = list(iter_rows(start, end, base, monthly_rate_pct))
+    return rows, sum(row.interest for row in rows)
+
+
+def summarize_rows(
+    start: date, end: date, base: float, monthly_rate_pct: float | RateSchedule
+) -> List[Dict[str, int]]:
+    """Meses, días e interés por año calendario, sin crear filas.
+
+    Cada mes se redondea igual que en ``calculate_rows``, así las sumas coinciden
+    con las de la salida completa. Con tasa fija el interés de un mes depende
+    solo de sus días, y el de un año completo solo de si es bisiesto.
+    """
+    schedule = monthly_rate_pct if isinstance(monthly_rate_pct, RateSchedule) else None
+    by_days: Dict[int, int] = {}
+    full_years: Dict[bool, Tuple[int, int]] = {}
 
+    def month_interest(dt_start: date, dt_end: date, days: int) -> int:
+        if schedule is not None:
+            return int(round(schedule.segment(dt_start, dt_end, base)[1]))
+        interest = by_days.get(days)
+        if interest is None:
+            interest = by_days[days] = int(round(base * (monthly_rate_pct / 100.0) * (days / 30.0)))
+        return interest
 
-def generate_tramos(start: date, end: date, base: float, monthly_rate_pct: float, vencimiento: date | None):
+    years = []
+    for year in range(start.year, end.year + 1):
+        year_start = max(start, date(year, 1, 1))
+        year_end = min(end, date(year, 12, 31))
+        full = schedule is None and year_start == date(year, 1, 1) and year_end == date(year, 12, 31)
+        if full and isleap(year) in full_years:
+            days, interest = full_years[isleap(year)]
+        else:
+            days = interest = 0
+            for dt_start, dt_end in daterange_monthly(year_start, year_end):
+                month_days = (dt_end - dt_start).days + 1
+                days += month_days
+                interest += month_interest(dt_start, dt_end, month_days)
+            if full:
+                full_years[isleap(year)] = (days, interest)
+        years.append({"anio": year, "meses": month_count(year_start, year_end), "dias": days, "interes": interest})
+    return years
+
+
+def rows_engine(engine: str):
+    if engine == "python":
+        return calculate_rows
+    if engine == "numpy":
+        from .vectorized import calculate_rows_numpy
+
+        return calculate_rows_numpy
+    raise ValueError(f"Motor de cálculo desconocido: {engine}")
+
+
+def tramo_bounds(start: date, end: date, vencimiento: date | None) -> List[Tuple[str, date, date]]:
+    """Título y fechas de cada tramo de la liquidación (uno, o dos si hay vencimiento en el rango)."""
     if vencimiento is None or not (start < vencimiento <= end):
-        rows, total = calculate_rows(start, end, base, monthly_rate_pct)
-        return {
-            "tramos": [
-                {
-                    "titulo": "TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO",
-                    "rows": rows,
-                    "subtotal": total,
-                }
-            ],
-            "total": total,
-        }
+        return [("TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO", start, end)]
+
+    # dateutil solo hace falta con vencimiento; se importa al primer uso
+    from dateutil.relativedelta import relativedelta
 
-    tramo1_end = vencimiento - timedelta(days=1)
-    rows1, subtotal1 = calculate_rows(start, tramo1_end, base, monthly_rate_pct)
     rd = relativedelta(vencimiento, start)
     meses_credito = rd.years * 12 + rd.months
     if rd.days > 0:
         meses_credito += 1
 
-    rows2, subtotal2 = calculate_rows(vencimiento, end, base, monthly_rate_pct)
+    return [
+        (
+            f"TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO DE HIPOTECA {meses_credito} MESES",
+            start,
+            vencimiento - timedelta(days=1),
+        ),
+        ("TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO DE HIPOTECA DESDE QUE SE VENCE EL PLAZO PACTADO", vencimiento, end),
+    ]
 
-    return {
-        "tramos": [
-            {
-                "titulo": f"TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO DE HIPOTECA {meses_credito} MESES",
-                "rows": rows1,
-                "subtotal": subtotal1,
-            },
+
+def generate_tramos(
+    start: date,
+    end: date,
+    base: float,
+    monthly_rate_pct: float | RateSchedule,
+    vencimiento: date | None,
+    engine: str = "python",
+):
+    calculate_rows = rows_engine(engine)
+    tramos = []
+    for titulo, tramo_start, tramo_end in tramo_bounds(start, end, vencimiento):
+        rows, subtotal = calculate_rows(tramo_start, tramo_end, base, monthly_rate_pct)
+        tramos.append({"titulo": titulo, "rows": rows, "subtotal": subtotal})
+    return {"tramos": tramos, "total": int(sum(t["subtotal"] for t in tramos))}
+
+
+def summarize_tramos(
+    start: date, end: date, base: float, monthly_rate_pct: float | RateSchedule, vencimiento: date | None
+) -> Dict[str, Any]:
+    """Resumen de ``generate_tramos``: por tramo y por año, con los mismos subtotales y total."""
+    tramos = []
+    for titulo, tramo_start, tramo_end in tramo_bounds(start, end, vencimiento):
+        years = summarize_rows(tramo_start, tramo_end, base, monthly_rate_pct)
+        tramos.append(
             {
-                "titulo": "TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO DE HIPOTECA DESDE QUE SE VENCE EL PLAZO PACTADO",
-                "rows": rows2,
-                "subtotal": subtotal2,
-            },
-        ],
-        "total": int(subtotal1 + subtotal2),
-    }
+                "titulo": titulo,
+                "del": format_date(tramo_start),
+                "hasta": format_date(tramo_end),
+                "rowCount": month_count(tramo_start, tramo_end),
+                "dias": sum(y["dias"] for y in years),
+                "subtotal": sum(y["interes"] for y in years),
+                "anios": years,
+            }
+        )
+    return {"format": "summary", "tramos": tramos, "total": sum(t["subtotal"] for t in tramos)}
+
+
+def _row_bounds(row) -> Tuple[date, date]:
+    if isinstance(row, Row):
+        return row.start, row.end
+    return parse_date(str(row["del"])), parse_date(str(row["hasta"]))
+
+
+def matches_tramos(result: Dict[str, Any], start: date, end: date, vencimiento: date | None) -> bool:
+    """True si ``result`` tiene la forma de ``generate_tramos`` para esas fechas.
+
+    Revisa títulos, meses y fechas de cada tramo, y que los subtotales y el total
+    sumen los intereses de las filas. Un resultado que envía el cliente se
+    revisa con esto antes de extenderlo.
+    """
+    tramos = result.get("tramos") if isinstance(result, dict) else None
+    bounds = tramo_bounds(start, end, vencimiento)
+    if not isinstance(tramos, list) or len(tramos) != len(bounds):
+        return False
+    for tramo, (titulo, tramo_start, tramo_end) in zip(tramos, bounds):
+        rows = tramo["rows"]
+        if tramo["titulo"] != titulo or len(rows) != month_count(tramo_start, tramo_end):
+            return False
+        if _row_bounds(rows[0])[0] != tramo_start or _row_bounds(rows[-1])[1] != tramo_end:
+            return False
+        if int(tramo["subtotal"]) != sum(int(r["interes"]) for r in rows):
+            return False
+    return int(result["total"]) == sum(int(t["subtotal"]) for t in tramos)
+
+
+def roll_forward(
+    result: Dict[str, Any],
+    start: date,
+    new_end: date,
+    base: float,
+    monthly_rate_pct: float | RateSchedule,
+    vencimiento: date | None,
+    engine: str = "python",
+):
+    """Extiende un resultado de ``generate_tramos`` hasta una fecha de corte posterior.
+
+    Conserva todos los meses completos ya liquidados y solo recalcula el último
+    mes parcial más los meses nuevos. El resultado coincide con un cálculo completo.
+    """
+    last_tramo = result["tramos"][-1]
+    rows = last_tramo["rows"]
+    if not rows:
+        return generate_tramos(start, new_end, base, monthly_rate_pct, vencimiento, engine=engine)
+
+    last_start, old_end = _row_bounds(rows[-1])
+    if new_end < old_end:
+        raise ValueError("La nueva fecha de corte no puede ser anterior a la ya liquidada")
+    if new_end == old_end:
+        return result
+    # Si el vencimiento cae en el tramo nuevo cambia la estructura de tramos
+    if vencimiento is not None and old_end < vencimiento <= new_end:
+        return generate_tramos(start, new_end, base, monthly_rate_pct, vencimiento, engine=engine)
 
+    kept = list(rows)
+    subtotal = int(last_tramo["subtotal"])
+    if old_end == last_day_of_month(old_end):
+        resume_from = old_end + timedelta(days=1)
+    else:
+        dropped = kept.pop()
+        subtotal -= int(dropped["interes"])
+        resume_from = last_start
 
+    new_rows, new_interest = rows_engine(engine)(resume_from, new_end, base, monthly_rate_pct)
+    kept.extend(new_rows)
+    tramos = list(result["tramos"][:-1])
+    tramos.append({"titulo": last_tramo["titulo"], "rows": kept, "subtotal": subtotal + new_interest})
+    return {"tramos": tramos, "total": int(sum(int(t["subtotal"]) for t in tramos))}
@@ -1,8 +1,17 @@
 from __future__ import annotations
 
 import io
+import tempfile
+import tracemalloc
+from typing import IO, Callable
+
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Border, Side, Font, PatternFill, NamedStyle, numbers
+from openpyxl.worksheet.cell_range import CellRange
+
+from .metrics import phase
+from .sheet_layout import COLUMN_WIDTHS, FIRST_COL, FIRST_ROW, HEADERS, SPOOL_MAX_BYTES
 
 
 def build_excel(payload: dict) -> io.BytesIO:
@@ -22,8 +31,8 @@ def build_excel(payload: dict) -> io.BytesIO:
     header_fill = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
     bold = Font(bold=True)
 
-    row_idx = 10
-    start_col = 2
+    row_idx = FIRST_ROW
+    start_col = FIRST_COL
     for idx, tramo in enumerate(payload["tramos"], start=1):
         title = tramo["titulo"]
         ws.merge_cells(start_row=row_idx, start_column=start_col, end_row=row_idx, end_column=start_col + 6)
@@ -32,16 +41,7 @@ def build_excel(payload: dict) -> io.BytesIO:
         cell.alignment = Alignment(horizontal="center")
         row_idx += 1
 
-        headers = [
-            "Mes causado",
-            "Del",
-            "Hasta",
-            "Días",
-            "Base",
-            "Tasa de interés moratorio",
-            "Interés causado",
-        ]
-        for offset, h in enumerate(headers):
+        for offset, h in enumerate(HEADERS):
             c = ws.cell(row=row_idx, column=start_col + offset, value=h)
             c.font = bold
             c.fill = header_fill
@@ -78,14 +78,141 @@ def build_excel(payload: dict) -> io.BytesIO:
     total_val = ws.cell(row=row_idx, column=start_col + 6, value=float(payload["total"]))
     total_val.style = currency_style
 
-    widths = [18, 12, 12, 8, 14, 26, 16]
-    for i, w in enumerate(widths):
+    for i, w in enumerate(COLUMN_WIDTHS):
         col_idx = start_col + i
         ws.column_dimensions[chr(64 + col_idx)].width = w
 
     stream = io.BytesIO()
-    wb.save(stream)
+    with phase("xlsx_save"):
+        wb.save(stream)
     stream.seek(0)
     return stream
 
 
+def build_excel_stream(payload: dict) -> IO[bytes]:
+    """Misma hoja que ``build_excel`` usando el modo write-only de openpyxl.
+
+    Las filas se escriben a medida que se recorren y los estilos se crean una
+    sola vez por libro. El resultado queda en un archivo temporal (en memoria
+    hasta ``SPOOL_MAX_BYTES``) posicionado al inicio, listo para ``send_file``.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Liquidación")
+
+    thin = Side(border_style="thin", color="000000")
+    border_all = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    currency_style = NamedStyle(name="currency_cop")
+    currency_style.number_format = '"$"#,##0'
+    currency_style.border = border_all
+    wb.add_named_style(currency_style)
+
+    header_fill = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
+    bold = Font(bold=True)
+    title_font = Font(bold=True, size=12)
+    center = Alignment(horizontal="center")
+
+    for i, w in enumerate(COLUMN_WIDTHS):
+        ws.column_dimensions[chr(64 + FIRST_COL + i)].width = w
+
+    def cell(value, font=None, fill=None, border=None, alignment=None, style=None):
+        c = WriteOnlyCell(ws, value=value)
+        if style is not None:
+            c.style = style
+        if font is not None:
+            c.font = font
+        if fill is not None:
+            c.fill = fill
+        if border is not None:
+            c.border = border
+        if alignment is not None:
+            c.alignment = alignment
+        return c
+
+    def merge_row(row_idx: int, last_offset: int) -> None:
+        ws.merged_cells.add(
+            CellRange(min_col=FIRST_COL, min_row=row_idx, max_col=FIRST_COL + last_offset, max_row=row_idx)
+        )
+
+    lead = [None] * (FIRST_COL - 1)
+    for _ in range(FIRST_ROW - 1):
+        ws.append([])
+
+    row_idx = FIRST_ROW
+    for tramo in payload["tramos"]:
+        merge_row(row_idx, 6)
+        ws.append(lead + [cell(tramo["titulo"], font=title_font, alignment=center)])
+        row_idx += 1
+
+        ws.append(lead + [cell(h, font=bold, fill=header_fill, border=border_all, alignment=center) for h in HEADERS])
+        row_idx += 1
+
+        for r in tramo["rows"]:
+            ws.append(
+                lead
+                + [
+                    cell(r["mes"], border=border_all),
+                    cell(r["del"], border=border_all),
+                    cell(r["hasta"], border=border_all),
+                    cell(r["dias"], border=border_all),
+                    cell(float(r["base"]), style="currency_cop"),
+                    cell(f"{r['tasa']:.2f}%", border=border_all, alignment=center),
+                    cell(float(r["interes"]), style="currency_cop"),
+                ]
+            )
+            row_idx += 1
+
+        merge_row(row_idx, 5)
+        ws.append(
+            lead
+            + [cell("Subtotal tramo", font=bold, border=border_all)]
+            + [None] * 5
+            + [cell(float(tramo["subtotal"]), style="currency_cop")]
+        )
+        ws.append([])
+        row_idx += 2
+
+    merge_row(row_idx, 5)
+    ws.append(
+        lead
+        + [cell("Total intereses causados a esta fecha", font=title_font, border=border_all)]
+        + [None] * 5
+        + [cell(float(payload["total"]), style="currency_cop")]
+    )
+
+    stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with phase("xlsx_save"):
+        wb.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def export_peak_memory(payload: dict, builder: Callable[[dict], IO[bytes]] = build_excel_stream) -> dict:
+    """Mide con tracemalloc el pico de memoria Python de una exportación."""
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    stream = builder(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    size = stream.seek(0, io.SEEK_END)
+    stream.close()
+    if not was_tracing:
+        tracemalloc.stop()
+    return {"builder": builder.__name__, "peak_bytes": peak - base, "xlsx_bytes": size}
+
+
+if __name__ == "__main__":
+    # Comparación rápida: python -m src.excel [años]
+    import sys
+    from datetime import date
+
+    from .domain import generate_tramos
+
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    result = generate_tramos(date(2000, 1, 15), date(2000 + years, 1, 14), 100_000_000.0, 2.1, None)
+    from .xlsx_writer import build_xlsx_direct
+
+    for fn in (build_excel, build_excel_stream, build_xlsx_direct):
+        print(export_peak_memory(result, fn))
@@ -0,0 +1,627 @@
+from __future__ import annotations
+
+import base64
+import json
+import math
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Esquema de database_schema_phase5.sql (calculations, tags, folders, calculation_tags) con índices para listar
+SCHEMA = """
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS folders (
+  id TEXT PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  name TEXT NOT NULL,
+  description TEXT,
+  parent_id TEXT REFERENCES folders(id) ON DELETE CASCADE,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  UNIQUE(user_id, name, parent_id)
+);
+CREATE INDEX IF NOT EXISTS idx_folders_user_id ON folders(user_id);
+
+CREATE TABLE IF NOT EXISTS tags (
+  id TEXT PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  name TEXT NOT NULL,
+  color TEXT DEFAULT '#3B82F6',
+  description TEXT,
+  created_at TEXT NOT NULL,
+  UNIQUE(user_id, name)
+);
+
+-- seq es el rowid estable que usa el índice FTS; id es el identificador público
+CREATE TABLE IF NOT EXISTS calculations (
+  seq INTEGER PRIMARY KEY,
+  id TEXT NOT NULL UNIQUE,
+  user_id TEXT NOT NULL,
+  name TEXT NOT NULL,
+  description TEXT,
+  form_data TEXT NOT NULL,
+  result_data TEXT,
+  folder_id TEXT REFERENCES folders(id) ON DELETE SET NULL,
+  template_id TEXT,
+  capital_amount REAL,
+  interest_rate REAL,
+  total_interest REAL,
+  days_calculated INTEGER,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calculations_user_created ON calculations(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_calculations_user_folder_created ON calculations(user_id, folder_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS calculation_tags (
+  calculation_id TEXT NOT NULL REFERENCES calculations(id) ON DELETE CASCADE,
+  tag_id TEXT NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+  created_at TEXT NOT NULL,
+  PRIMARY KEY (calculation_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS idx_calculation_tags_tag ON calculation_tags(tag_id, calculation_id);
+
+-- Conteo por usuario para no hacer COUNT(*) sobre todo el historial
+CREATE TABLE IF NOT EXISTS calculation_counts (
+  user_id TEXT PRIMARY KEY,
+  total INTEGER NOT NULL
+);
+
+-- Búsqueda por subcadena en name/description (tokenizador trigram)
+CREATE VIRTUAL TABLE IF NOT EXISTS calculations_fts USING fts5(
+  name, description, content='calculations', content_rowid='seq', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS calculations_ai AFTER INSERT ON calculations BEGIN
+  INSERT INTO calculations_fts(rowid, name, description) VALUES (new.seq, new.name, new.description);
+  INSERT INTO calculation_counts(user_id, total) VALUES (new.user_id, 1)
+    ON CONFLICT(user_id) DO UPDATE SET total = total + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS calculations_ad AFTER DELETE ON calculations BEGIN
+  INSERT INTO calculations_fts(calculations_fts, rowid, name, description)
+    VALUES ('delete', old.seq, old.name, old.description);
+  UPDATE calculation_counts SET total = total - 1 WHERE user_id = old.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS calculations_au AFTER UPDATE OF name, description ON calculations BEGIN
+  INSERT INTO calculations_fts(calculations_fts, rowid, name, description)
+    VALUES ('delete', old.seq, old.name, old.description);
+  INSERT INTO calculations_fts(rowid, name, description) VALUES (new.seq, new.name, new.description);
+END;
+"""
+
+# Agregados por usuario y periodo (reemplazan a user_statistics y get_calculations_by_period).
+# Los periodos son fechas UTC; "week" usa el lunes de la semana y "folder" agrupa por carpeta ('' = sin carpeta).
+ROLLUP_PERIODS = {
+    "day": "substr({row}.created_at, 1, 10)",
+    "week": "date(substr({row}.created_at, 1, 10), 'weekday 0', '-6 days')",
+    "month": "substr({row}.created_at, 1, 7)",
+    "year": "substr({row}.created_at, 1, 4)",
+    "folder": "COALESCE({row}.folder_id, '')",
+}
+
+
+def _rollup_upsert(row: str, sign: str) -> str:
+    # Suma (sign "+") o resta (sign "-") la fila old/new en cada agregado; los temp_* no cuentan, como en la vista
+    periods = " UNION ALL ".join(
+        f"SELECT '{name}' AS granularity, {expr.format(row=row)} AS period" for name, expr in ROLLUP_PERIODS.items()
+    )
+    return f"""
+  INSERT INTO calculation_rollups
+    (user_id, granularity, period, calculation_count, capital_count, total_capital, interest_count, total_interest)
+  SELECT {row}.user_id, p.granularity, p.period, {sign}1,
+    {sign}({row}.capital_amount IS NOT NULL), {sign}COALESCE({row}.capital_amount, 0),
+    {sign}({row}.total_interest IS NOT NULL), {sign}COALESCE({row}.total_interest, 0)
+  FROM ({periods}) AS p
+  WHERE substr({row}.name, 1, 5) <> 'temp_'
+  ON CONFLICT(user_id, granularity, period) DO UPDATE SET
+    calculation_count = calculation_count + excluded.calculation_count,
+    capital_count = capital_count + excluded.capital_count,
+    total_capital = total_capital + excluded.total_capital,
+    interest_count = interest_count + excluded.interest_count,
+    total_interest = total_interest + excluded.total_interest;"""
+
+
+_ROLLUP_PRUNE = "\n  DELETE FROM calculation_rollups WHERE user_id = old.user_id AND calculation_count <= 0;"
+
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS calculation_rollups (
+  user_id TEXT NOT NULL,
+  granularity TEXT NOT NULL,
+  period TEXT NOT NULL,
+  calculation_count INTEGER NOT NULL,
+  capital_count INTEGER NOT NULL,
+  total_capital REAL NOT NULL,
+  interest_count INTEGER NOT NULL,
+  total_interest REAL NOT NULL,
+  PRIMARY KEY (user_id, granularity, period)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS calculations_rollup_ai AFTER INSERT ON calculations BEGIN{_rollup_upsert("new", "+")}
+END;
+CREATE TRIGGER IF NOT EXISTS calculations_rollup_ad AFTER DELETE ON calculations BEGIN{_rollup_upsert("old", "-")}{_ROLLUP_PRUNE}
+END;
+CREATE TRIGGER IF NOT EXISTS calculations_rollup_au
+AFTER UPDATE OF name, folder_id, capital_amount, total_interest, created_at ON calculations BEGIN{_rollup_upsert("old", "-")}{_rollup_upsert("new", "+")}{_ROLLUP_PRUNE}
+END;
+"""
+
+# Columnas de la lista; result_data (la tabla completa) solo se devuelve al pedir un cálculo
+SUMMARY_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "form_data",
+    "folder_id",
+    "capital_amount",
+    "interest_rate",
+    "total_interest",
+    "days_calculated",
+    "created_at",
+    "updated_at",
+)
+
+# El trigram necesita al menos 3 caracteres; con menos se filtra con LIKE
+MIN_FTS_QUERY = 3
+
+
+def utc_now() -> str:
+    # Texto ISO de ancho fijo: el orden lexicográfico coincide con el cronológico
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def encode_cursor(created_at: str, calc_id: str) -> str:
+    raw = json.dumps([created_at, calc_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Lanza ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, calc_id = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+    if not isinstance(created_at, str) or not isinstance(calc_id, str):
+        raise ValueError("cursor inválido")
+    return created_at, calc_id
+
+
+def _number(value: Any) -> Optional[float]:
+    # Igual que extract_calculation_data(): "1.000.000" y "1,000,000" se leen como 1000000
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(".", "").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _rate(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _days(tramos: Any) -> int:
+    # resultData viene del cliente: se ignoran tramos, filas y días que no tengan la forma esperada
+    total = 0
+    for tramo in tramos if isinstance(tramos, list) else ():
+        rows = tramo.get("rows") if isinstance(tramo, dict) else None
+        for row in rows if isinstance(rows, list) else ():
+            dias = _rate(row.get("dias")) if isinstance(row, dict) else None
+            if dias is not None and math.isfinite(dias):
+                total += int(dias)
+    return total
+
+
+def extract_columns(form_data: Dict[str, Any], result_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Columnas derivadas para filtrar y agregar sin abrir el JSON."""
+    total = None
+    days = None
+    if isinstance(result_data, dict):
+        total = _number(result_data.get("total", result_data.get("totalInteresMora")))
+        days = _days(result_data.get("tramos")) or None
+    return {
+        "capital_amount": _number(form_data.get("capitalBase")),
+        "interest_rate": _rate(form_data.get("tasaMensual")),
+        "total_interest": total,
+        "days_calculated": days,
+    }
+
+
+def _fts_phrase(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _placeholders(values: Sequence[Any]) -> str:
+    return ",".join("?" * len(values))
+
+
+class HistoryStore:
+    """Acceso al historial; una conexión SQLite por hilo (y por proceso tras un fork)."""
+
+    def __init__(self, path: str, count_cap: int = 1000):
+        self.path = path
+        self.count_cap = count_cap
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA + ROLLUP_SCHEMA)
+                # Historial creado antes de existir los agregados: se calculan una vez
+                if conn.execute(
+                    "SELECT EXISTS (SELECT 1 FROM calculations) AND NOT EXISTS (SELECT 1 FROM calculation_rollups)"
+                ).fetchone()[0]:
+                    with _Transaction(conn):
+                        self._rebuild_rollups(conn)
+                self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _rebuild_rollups(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM calculation_rollups")
+        for name, expr in ROLLUP_PERIODS.items():
+            period = expr.format(row="c")
+            conn.execute(
+                f"INSERT INTO calculation_rollups"
+                f" (user_id, granularity, period, calculation_count, capital_count, total_capital,"
+                f" interest_count, total_interest)"
+                f" SELECT c.user_id, ?, {period}, COUNT(*), COUNT(c.capital_amount), COALESCE(SUM(c.capital_amount), 0),"
+                f" COUNT(c.total_interest), COALESCE(SUM(c.total_interest), 0)"
+                f" FROM calculations c WHERE substr(c.name, 1, 5) <> 'temp_' GROUP BY c.user_id, {period}",
+                (name,),
+            )
+
+    def rebuild_rollups(self) -> None:
+        """Recalcula los agregados desde cero (reparación; el uso normal los mantiene con triggers)."""
+        with self._transaction() as conn:
+            self._rebuild_rollups(conn)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = self._local.conn = self._connect()
+            self._local.pid = pid
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # Cálculos
+    def save(
+        self,
+        user_id: str,
+        name: str,
+        form_data: Dict[str, Any],
+        result_data: Optional[Dict[str, Any]] = None,
+        description: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        tag_ids: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        calc_id = str(uuid.uuid4())
+        now = utc_now()
+        columns = extract_columns(form_data, result_data)
+        with self._transaction() as conn:
+            if folder_id is not None:
+                self._require_owned(conn, "folders", user_id, [folder_id])
+            tag_ids = list(dict.fromkeys(tag_ids))
+            if tag_ids:
+                self._require_owned(conn, "tags", user_id, tag_ids)
+            conn.execute(
+                "INSERT INTO calculations (id, user_id, name, description, form_data, result_data, folder_id,"
+                " capital_amount, interest_rate, total_interest, days_calculated, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    calc_id,
+                    user_id,
+                    name,
+                    description,
+                    json.dumps(form_data, ensure_ascii=False),
+                    json.dumps(result_data, ensure_ascii=False) if result_data is not None else None,
+                    folder_id,
+                    columns["capital_amount"],
+                    columns["interest_rate"],
+                    columns["total_interest"],
+                    columns["days_calculated"],
+                    now,
+                    now,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO calculation_tags (calculation_id, tag_id, created_at) VALUES (?, ?, ?)",
+                [(calc_id, tag_id, now) for tag_id in tag_ids],
+            )
+        return self.get(user_id, calc_id)
+
+    def get(self, user_id: str, calc_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)}, result_data FROM calculations WHERE user_id = ? AND id = ?",
+            (user_id, calc_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return self._decorate(user_id, [row], include_result=True)[0]
+
+    def delete_many(self, user_id: str, calc_ids: Sequence[str]) -> int:
+        if not calc_ids:
+            return 0
+        with self._transaction() as conn:
+            cur = conn.execute(
+                f"DELETE FROM calculations WHERE user_id = ? AND id IN ({_placeholders(calc_ids)})",
+                (user_id, *calc_ids),
+            )
+        return cur.rowcount
+
+    def move_many(self, user_id: str, calc_ids: Sequence[str], folder_id: Optional[str]) -> int:
+        if not calc_ids:
+            return 0
+        with self._transaction() as conn:
+            if folder_id is not None:
+                self._require_owned(conn, "folders", user_id, [folder_id])
+            cur = conn.execute(
+                f"UPDATE calculations SET folder_id = ?, updated_at = ?"
+                f" WHERE user_id = ? AND id IN ({_placeholders(calc_ids)})",
+                (folder_id, utc_now(), user_id, *calc_ids),
+            )
+        return cur.rowcount
+
+    def list(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        descending: bool = True,
+        query: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        no_folder: bool = False,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        capital_min: Optional[float] = None,
+        capital_max: Optional[float] = None,
+        rate_min: Optional[float] = None,
+        rate_max: Optional[float] = None,
+        tag_ids: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """Una página del historial ordenada por (created_at, id), sin OFFSET."""
+        # Sin filtros el conteo sale de calculation_counts; con filtros se cuenta hasta count_cap
+        where = ["c.user_id = ?"]
+        params: List[Any] = [user_id]
+        if query:
+            if len(query) >= MIN_FTS_QUERY:
+                where.append("c.seq IN (SELECT rowid FROM calculations_fts WHERE calculations_fts MATCH ?)")
+                params.append(_fts_phrase(query))
+            else:
+                where.append("(c.name LIKE ? ESCAPE '\\' OR c.description LIKE ? ESCAPE '\\')")
+                like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                params.extend([like, like])
+        if no_folder:
+            where.append("c.folder_id IS NULL")
+        elif folder_id is not None:
+            where.append("c.folder_id = ?")
+            params.append(folder_id)
+        for column, op, value in (
+            ("created_at", ">=", date_from),
+            ("created_at", "<=", date_to),
+            ("capital_amount", ">=", capital_min),
+            ("capital_amount", "<=", capital_max),
+            ("interest_rate", ">=", rate_min),
+            ("interest_rate", "<=", rate_max),
+        ):
+            if value is not None:
+                where.append(f"c.{column} {op} ?")
+                params.append(value)
+        if tag_ids:
+            where.append(
+                f"EXISTS (SELECT 1 FROM calculation_tags ct WHERE ct.calculation_id = c.id"
+                f" AND ct.tag_id IN ({_placeholders(tag_ids)}))"
+            )
+            params.extend(tag_ids)
+        filtered = len(where) > 1
+
+        page_where = list(where)
+        page_params = list(params)
+        if cursor is not None:
+            page_where.append("(c.created_at, c.id) < (?, ?)" if descending else "(c.created_at, c.id) > (?, ?)")
+            page_params.extend(decode_cursor(cursor))
+        direction = "DESC" if descending else "ASC"
+        rows = self.conn.execute(
+            f"SELECT {', '.join('c.' + col for col in SUMMARY_COLUMNS)} FROM calculations c"
+            f" WHERE {' AND '.join(page_where)}"
+            f" ORDER BY c.created_at {direction}, c.id {direction} LIMIT ?",
+            (*page_params, limit + 1),
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+
+        if filtered:
+            count = self.conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM calculations c WHERE {' AND '.join(where)} LIMIT ?)",
+                (*params, self.count_cap + 1),
+            ).fetchone()[0]
+            exact = count <= self.count_cap
+            count = min(count, self.count_cap)
+        else:
+            row = self.conn.execute("SELECT total FROM calculation_counts WHERE user_id = ?", (user_id,)).fetchone()
+            count, exact = (row["total"] if row else 0), True
+
+        return {
+            "data": self._decorate(user_id, rows),
+            "nextCursor": next_cursor,
+            "estimatedCount": count,
+            "countIsExact": exact,
+        }
+
+    def _decorate(self, user_id: str, rows: Sequence[sqlite3.Row], include_result: bool = False) -> List[Dict[str, Any]]:
+        # Etiquetas y carpetas de toda la página en una consulta cada una
+        ids = [row["id"] for row in rows]
+        tags: Dict[str, List[Dict[str, Any]]] = {calc_id: [] for calc_id in ids}
+        folders: Dict[str, Dict[str, Any]] = {}
+        if ids:
+            for t in self.conn.execute(
+                f"SELECT ct.calculation_id, t.id, t.name, t.color FROM calculation_tags ct"
+                f" JOIN tags t ON t.id = ct.tag_id WHERE ct.calculation_id IN ({_placeholders(ids)})"
+                f" ORDER BY t.name",
+                ids,
+            ):
+                tags[t["calculation_id"]].append({"id": t["id"], "name": t["name"], "color": t["color"]})
+            folder_ids = sorted({row["folder_id"] for row in rows if row["folder_id"]})
+            if folder_ids:
+                for f in self.conn.execute(
+                    f"SELECT id, name FROM folders WHERE user_id = ? AND id IN ({_placeholders(folder_ids)})",
+                    (user_id, *folder_ids),
+                ):
+                    folders[f["id"]] = {"id": f["id"], "name": f["name"]}
+
+        items = []
+        for row in rows:
+            item = {col: row[col] for col in SUMMARY_COLUMNS}
+            item["form_data"] = json.loads(row["form_data"])
+            if include_result:
+                item["result_data"] = json.loads(row["result_data"]) if row["result_data"] else None
+            item["folder"] = folders.get(row["folder_id"])
+            item["tags"] = tags[row["id"]]
+            items.append(item)
+        return items
+
+    @staticmethod
+    def _require_owned(conn: sqlite3.Connection, table: str, user_id: str, ids: Sequence[str]) -> None:
+        found = conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE user_id = ? AND id IN ({_placeholders(ids)})", (user_id, *ids)
+        ).fetchone()[0]
+        if found != len(ids):
+            raise LookupError(f"{table}: identificador inexistente")
+
+    # Estadísticas
+    def stats(self, user_id: str, granularity: str = "month", limit: Optional[int] = None) -> Dict[str, Any]:
+        """Agregados por periodo (más reciente primero) y totales del usuario."""
+        # Solo lee calculation_rollups: el costo depende de los periodos, no del tamaño del historial
+        if granularity not in ROLLUP_PERIODS:
+            raise ValueError(f"granularidad desconocida: {granularity}")
+        rows = self.conn.execute(
+            "SELECT granularity, period, calculation_count, capital_count, total_capital, interest_count, total_interest"
+            " FROM calculation_rollups WHERE user_id = ? AND granularity IN (?, 'year', 'month')"
+            " ORDER BY granularity, period DESC",
+            (user_id, granularity),
+        ).fetchall()
+        periods = [_rollup_item(row) for row in rows if row["granularity"] == granularity]
+        if limit is not None:
+            periods = periods[:limit]
+        if granularity == "folder":
+            for item in periods:
+                item["period"] = item["period"] or None
+
+        years = [row for row in rows if row["granularity"] == "year"]
+        last = self.conn.execute(
+            "SELECT created_at FROM calculations WHERE user_id = ? AND substr(name, 1, 5) <> 'temp_'"
+            " ORDER BY created_at DESC LIMIT 1",
+            (user_id,),
+        ).fetchone()
+        totals = _rollup_item(
+            {
+                "period": None,
+                "calculation_count": sum(r["calculation_count"] for r in years),
+                "capital_count": sum(r["capital_count"] for r in years),
+                "total_capital": sum(r["total_capital"] for r in years),
+                "interest_count": sum(r["interest_count"] for r in years),
+                "total_interest": sum(r["total_interest"] for r in years),
+            }
+        )
+        del totals["period"]
+        totals["active_months"] = sum(1 for row in rows if row["granularity"] == "month")
+        totals["last_calculation_date"] = last["created_at"] if last else None
+        return {"granularity": granularity, "periods": periods, "totals": totals}
+
+    # Etiquetas y carpetas
+    def create_tag(self, user_id: str, name: str, color: Optional[str] = None, description: Optional[str] = None) -> Dict:
+        tag = {"id": str(uuid.uuid4()), "name": name, "color": color or "#3B82F6", "description": description}
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO tags (id, user_id, name, color, description, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (tag["id"], user_id, name, tag["color"], description, utc_now()),
+            )
+        return tag
+
+    def list_tags(self, user_id: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT id, name, color, description FROM tags WHERE user_id = ? ORDER BY name", (user_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def tag_many(self, user_id: str, tag_id: str, calc_ids: Sequence[str]) -> int:
+        if not calc_ids:
+            return 0
+        now = utc_now()
+        with self._transaction() as conn:
+            self._require_owned(conn, "tags", user_id, [tag_id])
+            cur = conn.execute(
+                f"INSERT OR IGNORE INTO calculation_tags (calculation_id, tag_id, created_at)"
+                f" SELECT id, ?, ? FROM calculations WHERE user_id = ? AND id IN ({_placeholders(calc_ids)})",
+                (tag_id, now, user_id, *calc_ids),
+            )
+        return cur.rowcount
+
+    def create_folder(
+        self, user_id: str, name: str, parent_id: Optional[str] = None, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        folder = {"id": str(uuid.uuid4()), "name": name, "parent_id": parent_id, "description": description}
+        now = utc_now()
+        with self._transaction() as conn:
+            if parent_id is not None:
+                self._require_owned(conn, "folders", user_id, [parent_id])
+            conn.execute(
+                "INSERT INTO folders (id, user_id, name, description, parent_id, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (folder["id"], user_id, name, description, parent_id, now, now),
+            )
+        return folder
+
+    def list_folders(self, user_id: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT id, name, description, parent_id FROM folders WHERE user_id = ? ORDER BY name", (user_id,)
+        )
+        return [dict(row) for row in rows]
+
+
+def _rollup_item(row) -> Dict[str, Any]:
+    # Mismos nombres que get_calculations_by_period, más el promedio de intereses
+    return {
+        "period": row["period"],
+        "calculation_count": row["calculation_count"],
+        "total_capital": row["total_capital"],
+        "total_interest": row["total_interest"],
+        "avg_capital": row["total_capital"] / row["capital_count"] if row["capital_count"] else 0.0,
+        "avg_interest": row["total_interest"] / row["interest_count"] if row["interest_count"] else 0.0,
+    }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE / COMMIT explícitos (la conexión está en modo autocommit)."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from .metrics import EXPORT_JOBS
+
+JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+PENDING = ("queued", "running")
+
+
+class JobQueueFull(Exception):
+    """El pool y la cola de este worker están llenos."""
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    # Escritura atómica: quien lea ve el estado anterior o el nuevo, nunca uno a medias
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _run_export(directory: str, job_id: str, payload: Dict[str, Any], writer: str, engine: str) -> int:
+    """Cuerpo del trabajo (corre en el pool): calcula, genera el XLSX y lo deja en disco."""
+    from .domain import generate_tramos
+    from .routes import excel_builder
+
+    meta_path = os.path.join(directory, f"{job_id}.json")
+    meta = _read_json(meta_path) or {}
+    meta.update(status="running", started_at=time.time())
+    _write_json(meta_path, meta)
+
+    result = generate_tramos(
+        payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"], engine=engine
+    )
+    stream = excel_builder(writer)(result)
+    path = os.path.join(directory, f"{job_id}.xlsx")
+    try:
+        with open(f"{path}.part", "wb") as fh:
+            shutil.copyfileobj(stream, fh, 1024 * 1024)
+    finally:
+        stream.close()
+    os.replace(f"{path}.part", path)
+    return os.path.getsize(path)
+
+
+class ExportJobs:
+    """Pool de exportaciones de este proceso más el almacén de artefactos compartido en disco."""
+
+    def __init__(
+        self,
+        directory: str,
+        workers: int = 2,
+        max_queue: int = 16,
+        ttl: float = 3600.0,
+        timeout: float = 600.0,
+        executor: str = "process",
+    ):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Ejecutor de exportaciones desconocido: {executor}")
+        self.directory = directory
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.timeout = timeout
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._pid: Optional[int] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _pool(self) -> Executor:
+        # Un pool por proceso: se crea en el worker (después del fork de gunicorn), nunca en el maestro
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            if self._pid != pid:
+                # Tras un fork los pendientes del padre no son de este proceso
+                self._pending = 0
+            os.makedirs(self.directory, exist_ok=True)
+            if self.executor_kind == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export-job")
+            else:
+                # forkserver: los hijos no heredan hilos ni sockets del worker web. Un script propio
+                # que cree la app debe encolar bajo if __name__ == "__main__" (o usar el ejecutor "thread")
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+            self._pid = pid
+        return self._executor
+
+    def map_ordered(self, fn: Callable[..., Any], items: Iterable[tuple]) -> "OrderedMap":
+        """Aplica ``fn(*args)`` en el pool y cede los futures, ya terminados, en el orden de entrada."""
+        # Reserva hasta 2 lugares por proceso del mismo cupo que submit (workers + max_queue) hasta que se cierra
+        with self._lock:
+            self._pool()
+            free = self.workers + self.max_queue - self._pending
+            if free <= 0:
+                EXPORT_JOBS.inc("rejected")
+                raise JobQueueFull()
+            slots = min(self.workers * 2, free)
+            self._pending += slots
+        return OrderedMap(self, fn, items, slots)
+
+    def _release(self, slots: int) -> None:
+        with self._lock:
+            self._pending = max(self._pending - slots, 0)
+
+    # El estado es un JSON junto al artefacto: cualquier worker de gunicorn puede responder la consulta
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def artifact_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.xlsx")
+
+    def submit(self, user_id: str, payload: Dict[str, Any], filename: str, writer: str, engine: str) -> Dict[str, Any]:
+        """Encola un trabajo; lanza ``JobQueueFull`` si ya hay ``workers + max_queue`` pendientes."""
+        self.cleanup()
+        with self._lock:
+            pool = self._pool()
+            if self._pending >= self.workers + self.max_queue:
+                EXPORT_JOBS.inc("rejected")
+                raise JobQueueFull()
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        meta = {
+            "id": job_id,
+            "user_id": user_id,
+            "status": "queued",
+            "filename": filename,
+            "owner_pid": os.getpid(),
+            "created_at": time.time(),
+        }
+        _write_json(self._meta_path(job_id), meta)
+        try:
+            future = pool.submit(_run_export, self.directory, job_id, payload, writer, engine)
+        except Exception:
+            # Pool roto (p. ej. un hijo murió): se recrea en el siguiente envío
+            self._reset_pool(pool)
+            self._finish(job_id, error="No se pudo encolar la exportación")
+            raise
+        future.add_done_callback(lambda f: self._on_done(job_id, f, pool))
+        EXPORT_JOBS.inc("submitted")
+        return meta
+
+    def _reset_pool(self, broken: Executor) -> None:
+        # Solo si ``broken`` sigue siendo el pool actual: un aviso tardío del pool
+        # anterior no debe cerrar (ni cancelar los trabajos de) uno ya recreado
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _on_done(self, job_id: str, future: Future, pool: Executor) -> None:
+        try:
+            size = future.result()
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            self._finish(job_id, error="El proceso de exportación terminó inesperadamente")
+        except BaseException as exc:
+            self._finish(job_id, error=f"Error al generar el archivo ({type(exc).__name__})")
+        else:
+            self._finish(job_id, size=size)
+
+    def _finish(self, job_id: str, size: Optional[int] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._pending = max(self._pending - 1, 0)
+        meta = _read_json(self._meta_path(job_id))
+        if meta is None:
+            return
+        meta.update(finished_at=time.time())
+        if error is None:
+            meta.update(status="done", size=size)
+        else:
+            meta.update(status="failed", error=error)
+        _write_json(self._meta_path(job_id), meta)
+        EXPORT_JOBS.inc(meta["status"])
+
+    def get(self, user_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado del trabajo (None si no existe o es de otro usuario)."""
+        if not JOB_ID.match(job_id):
+            return None
+        meta = _read_json(self._meta_path(job_id))
+        if meta is None or meta["user_id"] != user_id:
+            return None
+        # Pendiente con el worker dueño muerto, o más allá de timeout: se reporta fallido en vez de quedar colgado
+        if meta["status"] in PENDING:
+            error = None
+            if not _pid_alive(meta["owner_pid"]):
+                error = "El worker que ejecutaba la exportación terminó"
+            elif time.time() - meta["created_at"] > self.timeout:
+                error = "Tiempo agotado"
+            if error is not None:
+                meta.update(status="failed", error=error, finished_at=time.time())
+                _write_json(self._meta_path(job_id), meta)
+                EXPORT_JOBS.inc("failed")
+        if meta["status"] == "done" and not os.path.exists(self.artifact_path(job_id)):
+            return None
+        return meta
+
+    def cleanup(self, force: bool = False) -> int:
+        """Borra artefactos y estados vencidos; como mucho una pasada por minuto salvo ``force``."""
+        now = time.time()
+        if not force and now - self._last_sweep < min(60.0, self.ttl):
+            return 0
+        self._last_sweep = now
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            job_id, _, ext = name.partition(".")
+            if ext == "json":
+                meta = _read_json(path)
+                if meta is None or meta["status"] in PENDING:
+                    continue
+                expired = now - meta.get("finished_at", meta["created_at"]) > self.ttl
+            else:
+                # Artefactos sin estado (o .part de un proceso caído): por antigüedad del archivo
+                try:
+                    expired = now - os.path.getmtime(path) > self.ttl and not os.path.exists(self._meta_path(job_id))
+                except FileNotFoundError:
+                    continue
+            if not expired:
+                continue
+            for stale in (path, self.artifact_path(job_id)) if ext == "json" else (path,):
+                try:
+                    os.remove(stale)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def shutdown(self) -> None:
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class OrderedMap:
+    """Resultados de ``ExportJobs.map_ordered``: a lo sumo ``slots`` tareas en vuelo."""
+
+    def __init__(self, jobs: ExportJobs, fn: Callable[..., Any], items: Iterable[tuple], slots: int):
+        self._jobs = jobs
+        self._fn = fn
+        self._items = items
+        self._slots = slots
+        self._pending: Deque[Tuple[Executor, Future]] = deque()
+        self._closed = False
+
+    def _done(self) -> Future:
+        # El error de un elemento queda en su future; si el pool se rompió, los siguientes van a uno nuevo
+        pool, future = self._pending.popleft()
+        if isinstance(future.exception(), BrokenProcessPool):
+            self._jobs._reset_pool(pool)
+        return future
+
+    def __iter__(self) -> Iterator[Future]:
+        try:
+            for args in self._items:
+                with self._jobs._lock:
+                    pool = self._jobs._pool()
+                try:
+                    future = pool.submit(self._fn, *args)
+                except BrokenProcessPool as exc:
+                    # Roto antes de enviar: falla este elemento y el pool se recrea al sacarlo
+                    future = Future()
+                    future.set_exception(exc)
+                self._pending.append((pool, future))
+                if len(self._pending) >= self._slots:
+                    yield self._done()
+            while self._pending:
+                yield self._done()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        # También al agotarse: cancela lo pendiente y devuelve los lugares reservados
+        if self._closed:
+            return
+        self._closed = True
+        for _, future in self._pending:
+            future.cancel()
+        self._jobs._release(self._slots)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import date
+
+
+# Tablas precalculadas al importar: no se toca locale.setlocale en tiempo de petición
+DATE_FMT = "%d/%m/%Y"
+
+MONTHS_ES = (
+    "Enero",
+    "Febrero",
+    "Marzo",
+    "Abril",
+    "Mayo",
+    "Junio",
+    "Julio",
+    "Agosto",
+    "Septiembre",
+    "Octubre",
+    "Noviembre",
+    "Diciembre",
+)
+
+_TWO_DIGITS = tuple(f"{n:02d}" for n in range(32))
+
+
+def month_name_es(d: date) -> str:
+    return MONTHS_ES[d.month - 1]
+
+
+def format_date(d: date) -> str:
+    # Equivalente a d.strftime(DATE_FMT)
+    return f"{_TWO_DIGITS[d.day]}/{_TWO_DIGITS[d.month]}/{d.year}"
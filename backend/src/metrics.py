@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, has_request_context, request
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+BYTES_BUCKETS = (1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels_text(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: conteos por bucket (no acumulados), suma y total
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = tuple(str(v) for v in label_values)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for key, (counts, total, count) in items:
+            acc = 0
+            for bound, c in zip(self.buckets, counts):
+                acc += c
+                le = _labels_text(self.labels, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {acc}")
+            le = _labels_text(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labels, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels_text(self.labels, key)} {count}")
+        return lines
+
+
+# Métricas del proceso (cada worker de gunicorn expone las suyas)
+REQUEST_SECONDS = Histogram(
+    "liquidation_http_request_duration_seconds", "Latencia de peticiones HTTP por endpoint", ("endpoint", "method", "status")
+)
+PHASE_SECONDS = Histogram(
+    "liquidation_phase_duration_seconds", "Duración de cada fase de una petición", ("endpoint", "phase")
+)
+ROBLE_SECONDS = Histogram("liquidation_roble_request_duration_seconds", "Latencia de llamadas salientes a Roble", ("path",))
+ROBLE_RESPONSES = Counter("liquidation_roble_responses_total", "Respuestas de Roble por código de estado", ("path", "status"))
+ROWS_GENERATED = Counter("liquidation_rows_generated_total", "Filas mensuales calculadas")
+XLSX_BYTES = Histogram("liquidation_xlsx_bytes", "Tamaño de los XLSX generados", buckets=BYTES_BUCKETS)
+EXPORT_JOBS = Counter("liquidation_export_jobs_total", "Trabajos de exportación por resultado", ("status",))
+
+# Instante de llegada fijado por el servidor (modo ASGI) antes de despachar a Flask
+STARTED_ENVIRON_KEY = "liquidation.request_started"
+
+REGISTRY = [REQUEST_SECONDS, PHASE_SECONDS, ROBLE_SECONDS, ROBLE_RESPONSES, ROWS_GENERATED, XLSX_BYTES, EXPORT_JOBS]
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _endpoint_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mide una fase de la petición en curso (Server-Timing y histograma por fase)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - t0)
+
+
+def record_phase(name: str, elapsed: float) -> None:
+    """Registra una fase medida por fuera de ``phase`` (p. ej. en el event loop del modo ASGI)."""
+    if has_request_context():
+        timings = g.setdefault("timings", {})
+        timings[name] = timings.get(name, 0.0) + elapsed
+        PHASE_SECONDS.observe(elapsed, _endpoint_label(), name)
+
+
+def observe_roble(path: str, status: str, elapsed: float) -> None:
+    ROBLE_SECONDS.observe(elapsed, path)
+    ROBLE_RESPONSES.inc(path, status)
+
+
+class SamplingProfiler:
+    """Muestreador de pila de un hilo; genera stacks plegados (formato flamegraph)."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: _Tally = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def init_app(app: Flask, profile_slow_ms: float = 0.0, profile_dir: Optional[str] = None, profile_interval_ms: float = 5.0) -> None:
+    """Registra los hooks de medición. El perfilado por muestreo solo se activa si ``profile_slow_ms`` > 0."""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = request.environ.get(STARTED_ENVIRON_KEY) or time.perf_counter()
+        if profile_slow_ms > 0:
+            g.profiler = SamplingProfiler(threading.get_ident(), profile_interval_ms / 1000.0).start()
+
+    @app.after_request
+    def _finish_timer(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = _endpoint_label()
+        REQUEST_SECONDS.observe(elapsed, endpoint, request.method, str(response.status_code))
+
+        timings = g.get("timings", {})
+        entries = [f"{name};dur={secs * 1000:.1f}" for name, secs in timings.items()]
+        entries.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+
+        profiler: Optional[SamplingProfiler] = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            if elapsed * 1000 >= profile_slow_ms and profiler.samples:
+                _dump_profile(profiler, profile_dir, endpoint, elapsed)
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        profiler: Optional[SamplingProfiler] = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+
+
+def _dump_profile(profiler: SamplingProfiler, profile_dir: Optional[str], endpoint: str, elapsed: float) -> None:
+    directory = profile_dir or os.path.join(os.getcwd(), "profiles")
+    os.makedirs(directory, exist_ok=True)
+    slug = endpoint.strip("/").replace("/", "_") or "root"
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{slug}_{elapsed * 1000:.0f}ms.folded")
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(profiler.folded())
@@ -0,0 +1,282 @@
+"""Liquidación offline de carteras (CSV/XLSX) en varios procesos.
+
+Uso (desde backend/):
+
+    python -m src.portfolio cartera.csv --output resultados.jsonl --workers 8 --chunk-size 500
+
+Cada fila del archivo es un caso con las mismas columnas que /api/calculate:
+fechaInicial, fechaCorte, capitalBase, tasaMensual y opcionalmente
+fechaVencimiento, tasas (JSON) e id. No requiere Flask ni Roble.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from werkzeug.exceptions import HTTPException
+
+from .domain import ENGINES, generate_tramos
+from .localization import format_date
+from .validation import validate_payload
+
+
+SUMMARY_FIELDS = [
+    "index",
+    "id",
+    "fechaInicial",
+    "fechaCorte",
+    "capitalBase",
+    "tasaMensual",
+    "fechaVencimiento",
+    "meses",
+    "subtotalTramo1",
+    "subtotalTramo2",
+    "total",
+    "error",
+]
+DETAIL_FIELDS = ["id", "tramo", "mes", "del", "hasta", "dias", "base", "tasa", "interes"]
+
+
+def _cell_text(value: Any) -> Any:
+    # Las celdas de Excel con fecha llegan como datetime; la validación espera dd/mm/aaaa
+    if isinstance(value, datetime):
+        return format_date(value.date())
+    if isinstance(value, date):
+        return format_date(value)
+    return value
+
+
+def read_cases(path: Path) -> Iterator[Dict[str, Any]]:
+    """Lee la cartera como flujo, sin cargar el archivo completo."""
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+            for values in rows:
+                if values is None or all(v is None for v in values):
+                    continue
+                yield {k: _cell_text(v) for k, v in zip(header, values) if k and v is not None}
+        finally:
+            wb.close()
+        return
+
+    with path.open(newline="", encoding="utf-8-sig") as fh:
+        for row in csv.DictReader(fh):
+            yield {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+
+
+def liquidate_case(index: int, case: Dict[str, Any], engine: str, include_rows: bool) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"index": index, "id": case.get("id")}
+    if isinstance(case.get("tasas"), str):
+        try:
+            case = {**case, "tasas": json.loads(case["tasas"])}
+        except ValueError:
+            record["error"] = "tasas debe ser JSON"
+            return record
+    try:
+        payload = validate_payload(case)
+    except HTTPException as err:
+        record["error"] = err.description
+        return record
+    try:
+        result = generate_tramos(
+            payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"], engine=engine
+        )
+    except (ArithmeticError, ValueError) as err:
+        # Un caso que falla en el cálculo no corta la cartera: queda en su fila
+        record["error"] = f"Error al calcular ({type(err).__name__}: {err})"
+        return record
+    tramos = result["tramos"]
+    record.update(
+        {
+            "fechaInicial": format_date(payload["start"]),
+            "fechaCorte": format_date(payload["end"]),
+            "capitalBase": payload["base"],
+            "tasaMensual": case.get("tasaMensual"),
+            "fechaVencimiento": format_date(payload["vencimiento"]) if payload["vencimiento"] else None,
+            "meses": sum(len(t["rows"]) for t in tramos),
+            "subtotalTramo1": tramos[0]["subtotal"],
+            "subtotalTramo2": tramos[1]["subtotal"] if len(tramos) > 1 else None,
+            "total": result["total"],
+        }
+    )
+    if include_rows:
+        record["tramos"] = [
+            {"titulo": t["titulo"], "subtotal": t["subtotal"], "rows": [r.to_dict() for r in t["rows"]]} for t in tramos
+        ]
+    return record
+
+
+def liquidate_chunk(chunk: List[Tuple[int, Dict[str, Any]]], engine: str, include_rows: bool) -> List[Dict[str, Any]]:
+    return [liquidate_case(index, case, engine, include_rows) for index, case in chunk]
+
+
+class _CsvWriter:
+    def __init__(self, path: Path, include_rows: bool):
+        self._fh = path.open("w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        self._writer.writeheader()
+        self._detail = None
+        if include_rows:
+            detail_path = path.with_name(f"{path.stem}_detalle{path.suffix}")
+            self._detail_fh = detail_path.open("w", newline="", encoding="utf-8")
+            self._detail = csv.DictWriter(self._detail_fh, fieldnames=DETAIL_FIELDS, extrasaction="ignore")
+            self._detail.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._writer.writerow(record)
+        if self._detail is not None:
+            for n, tramo in enumerate(record.get("tramos", []), start=1):
+                for row in tramo["rows"]:
+                    self._detail.writerow({"id": record.get("id", record["index"]), "tramo": n, **row})
+
+    def close(self) -> None:
+        self._fh.close()
+        if self._detail is not None:
+            self._detail_fh.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path: Path, include_rows: bool):
+        self._fh = path.open("w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _XlsxWriter:
+    """Un solo libro: hoja Resumen (un caso por fila) y, con --rows, hoja Detalle."""
+
+    def __init__(self, path: Path, include_rows: bool):
+        from openpyxl import Workbook
+
+        self._path = path
+        self._wb = Workbook(write_only=True)
+        self._summary = self._wb.create_sheet("Resumen")
+        self._summary.append(SUMMARY_FIELDS)
+        self._detail = None
+        if include_rows:
+            self._detail = self._wb.create_sheet("Detalle")
+            self._detail.append(DETAIL_FIELDS)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._summary.append([record.get(f) for f in SUMMARY_FIELDS])
+        if self._detail is not None:
+            for n, tramo in enumerate(record.get("tramos", []), start=1):
+                for row in tramo["rows"]:
+                    values = {"id": record.get("id", record["index"]), "tramo": n, **row}
+                    self._detail.append([values.get(f) for f in DETAIL_FIELDS])
+
+    def close(self) -> None:
+        self._wb.save(self._path)
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "xlsx": _XlsxWriter}
+
+
+def _chunks(cases: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    it = enumerate(cases)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(
+    input_path: Path,
+    output_path: Path,
+    fmt: str,
+    workers: int,
+    chunk_size: int,
+    engine: str = "python",
+    include_rows: bool = False,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    writer = WRITERS[fmt](output_path, include_rows)
+    started = time.perf_counter()
+    done = errors = 0
+
+    def emit(records: List[Dict[str, Any]]) -> None:
+        nonlocal done, errors
+        for record in records:
+            writer.write(record)
+            done += 1
+            errors += "error" in record
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(f"\r{done} casos, {done / elapsed:,.0f} casos/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        chunks = _chunks(read_cases(input_path), chunk_size)
+        if workers <= 0:
+            for chunk in chunks:
+                emit(liquidate_chunk(chunk, engine, include_rows))
+        else:
+            # A lo sumo 2 bloques por proceso en vuelo; se escriben en el orden de entrada
+            pending: Deque[Future] = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for chunk in chunks:
+                    pending.append(pool.submit(liquidate_chunk, chunk, engine, include_rows))
+                    if len(pending) >= workers * 2:
+                        emit(pending.popleft().result())
+                while pending:
+                    emit(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    if progress:
+        print(file=sys.stderr)
+    return {
+        "cases": done,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "cases_per_second": round(done / elapsed, 1) if elapsed > 0 else None,
+        "workers": workers,
+        "chunk_size": chunk_size,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="cartera en CSV o XLSX")
+    parser.add_argument("--output", "-o", type=Path, help="archivo de salida (por defecto junto a la entrada)")
+    parser.add_argument("--format", "-f", choices=sorted(WRITERS), help="formato de salida (se deduce de --output)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="procesos (0 = sin pool)")
+    parser.add_argument("--chunk-size", "-c", type=int, default=200, help="casos por bloque enviado a cada proceso")
+    parser.add_argument("--engine", choices=ENGINES, default="python", help="motor de cálculo")
+    parser.add_argument("--rows", action="store_true", help="incluir el detalle mensual de cada caso")
+    parser.add_argument("--quiet", "-q", action="store_true", help="sin progreso en stderr")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or (args.output.suffix.lstrip(".").lower() if args.output else "jsonl")
+    if fmt not in WRITERS:
+        parser.error(f"formato no soportado: {fmt}")
+    output = args.output or args.input.with_name(f"{args.input.stem}_liquidacion.{fmt}")
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size debe ser > 0")
+
+    stats = run(args.input, output, fmt, args.workers, args.chunk_size, args.engine, args.rows, progress=not args.quiet)
+    print(json.dumps({"output": str(output), **stats}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import functools
+from bisect import bisect_right
+from datetime import date
+from typing import Iterable, List, Tuple
+
+
+class RateSchedule:
+    """Tasas mensuales por intervalos de fechas, indexadas con sumas acumuladas.
+
+    Cada intervalo rige desde su fecha hasta el día anterior al siguiente; el
+    último queda abierto. ``cum[i]`` acumula tasa × días (en %·día) de todos los
+    intervalos anteriores al i-ésimo, así el interés entre dos fechas cualesquiera
+    se obtiene con dos búsquedas binarias y una resta.
+    """
+
+    __slots__ = ("starts", "rates", "cum")
+
+    def __init__(self, intervals: Iterable[Tuple[date, float]]):
+        ordered = sorted(intervals, key=lambda item: item[0])
+        if not ordered:
+            raise ValueError("El calendario de tasas está vacío")
+        self.starts: List[int] = []
+        self.rates: List[float] = []
+        self.cum: List[float] = []
+        acc = 0.0
+        for desde, tasa in ordered:
+            ordinal = desde.toordinal()
+            if self.starts:
+                if ordinal == self.starts[-1]:
+                    raise ValueError(f"Tasa duplicada para la fecha {desde.isoformat()}")
+                acc += self.rates[-1] * (ordinal - self.starts[-1])
+            if tasa < 0:
+                raise ValueError("Las tasas deben ser >= 0")
+            self.starts.append(ordinal)
+            self.rates.append(float(tasa))
+            self.cum.append(acc)
+
+    @property
+    def first_date(self) -> date:
+        return date.fromordinal(self.starts[0])
+
+    def intervals(self) -> List[Tuple[date, float]]:
+        return [(date.fromordinal(o), r) for o, r in zip(self.starts, self.rates)]
+
+    def index(self, d: date) -> int:
+        i = bisect_right(self.starts, d.toordinal()) - 1
+        if i < 0:
+            raise ValueError(f"No hay tasa vigente el {d.isoformat()}")
+        return i
+
+    def rate_at(self, d: date) -> float:
+        return self.rates[self.index(d)]
+
+    def _pct_days_before(self, i: int, ordinal: int) -> float:
+        return self.cum[i] + self.rates[i] * (ordinal - self.starts[i])
+
+    def pct_days(self, start: date, end: date) -> float:
+        """Suma de la tasa diaria (en %·día) entre ``start`` y ``end`` inclusive."""
+        ia, ib = self.index(start), self.index(end)
+        if ia == ib:
+            return self.rates[ia] * ((end - start).days + 1)
+        return self._pct_days_before(ib, end.toordinal() + 1) - self._pct_days_before(ia, start.toordinal())
+
+    def segment(self, start: date, end: date, base: float) -> Tuple[float, float]:
+        """Tasa efectiva e interés sin redondear de un tramo mensual.
+
+        Si el tramo cae dentro de un solo intervalo se usa exactamente la fórmula
+        de tasa constante, de modo que el desglose no cambia cuando la tasa es fija.
+        """
+        days = (end - start).days + 1
+        ia, ib = self.index(start), self.index(end)
+        if ia == ib:
+            rate = self.rates[ia]
+            return rate, base * (rate / 100.0) * (days / 30.0)
+        pct_days = self._pct_days_before(ib, end.toordinal() + 1) - self._pct_days_before(ia, start.toordinal())
+        return pct_days / days, base * (pct_days / 100.0) / 30.0
+
+    def interest_between(self, start: date, end: date, base: float) -> float:
+        """Interés sin redondear entre dos fechas (inclusive) en O(log n)."""
+        return base * (self.pct_days(start, end) / 100.0) / 30.0
+
+    def key(self) -> List[Tuple[str, float]]:
+        return [(d.isoformat(), r) for d, r in self.intervals()]
+
+
+@functools.lru_cache(maxsize=128)
+def load_schedule(intervals: Tuple[Tuple[date, float], ...]) -> RateSchedule:
+    # Los calendarios se repiten entre peticiones (certificaciones de usura): se indexan una vez
+    return RateSchedule(intervals)
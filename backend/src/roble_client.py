@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from .metrics import observe_roble
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+    from urllib3.util.retry import Retry
+
+
+class RobleClient:
+    """Cliente HTTP con pool keep-alive para la API de Roble.
+
+    Cada proceso (worker de gunicorn) crea su propia ``requests.Session`` la
+    primera vez que la usa, así los sockets nunca se comparten a través de un
+    fork; ``requests`` se importa recién ahí (o en ``preload``). Solo los métodos
+    idempotentes se reintentan ante 502/503/504; los errores de conexión se
+    reintentan siempre porque la petición no llegó a salir.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        db_name: str,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        slow_read_timeout: float = 20.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.2,
+        backoff_jitter: float = 0.2,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.db_name = db_name
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.slow_read_timeout = slow_read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self._retry: Optional[Retry] = None
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def preload(self) -> None:
+        """Importa requests y arma la política de reintentos sin abrir sockets (seguro antes de fork)."""
+        from urllib3.util.retry import Retry
+
+        importlib.import_module("requests.adapters")
+
+        if self._retry is None:
+            self._retry = Retry(
+                total=self.max_retries,
+                connect=self.max_retries,
+                read=self.max_retries,
+                status=self.max_retries,
+                status_forcelist=(502, 503, 504),
+                backoff_factor=self.backoff_factor,
+                backoff_jitter=self.backoff_jitter,
+                raise_on_status=False,
+            )
+
+    def _build_session(self) -> requests.Session:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.preload()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=self._retry, pool_block=False)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+        return self._session
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{self.db_name}/{path}"
+
+    def request(self, method: str, path: str, slow: bool = False, **kwargs: Any) -> requests.Response:
+        read_timeout = self.slow_read_timeout if slow else self.read_timeout
+        kwargs.setdefault("timeout", (self.connect_timeout, read_timeout))
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            res = self.session.request(method, self.url(path), **kwargs)
+            status = str(res.status_code)
+            return res
+        finally:
+            observe_roble(path, status, time.perf_counter() - t0)
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+# Métodos que se reintentan ante 502/503/504 (mismo criterio que urllib3.Retry)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"})
+RETRY_STATUS = frozenset({502, 503, 504})
+
+
+class AsyncRobleClient:
+    """Versión asíncrona de ``RobleClient`` (httpx) para el modo ASGI.
+
+    Mismos timeouts y política de reintentos; la espera de la respuesta no
+    ocupa un hilo, así la concurrencia hacia Roble queda limitada por el pool
+    de conexiones (``pool_size``) y no por los hilos del servidor. El cliente
+    httpx se crea en el event loop que lo usa por primera vez.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        db_name: str,
+        pool_size: int = 100,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        slow_read_timeout: float = 20.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.2,
+        backoff_jitter: float = 0.2,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.db_name = db_name
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.slow_read_timeout = slow_read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(limits=limits)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{self.db_name}/{path}"
+
+    def _backoff(self, attempt: int) -> float:
+        # Igual que urllib3: sin espera en el primer reintento, luego exponencial con jitter
+        if attempt <= 1:
+            return 0.0
+        return self.backoff_factor * (2 ** (attempt - 1)) + random.random() * self.backoff_jitter
+
+    async def request(self, method: str, path: str, slow: bool = False, **kwargs: Any) -> httpx.Response:
+        import httpx
+
+        read_timeout = self.slow_read_timeout if slow else self.read_timeout
+        kwargs.setdefault("timeout", httpx.Timeout(read_timeout, connect=self.connect_timeout))
+        t0 = time.perf_counter()
+        status = "error"
+        attempt = 0
+        try:
+            while True:
+                try:
+                    res = await self.client.request(method, self.url(path), **kwargs)
+                except (httpx.ConnectError, httpx.ConnectTimeout):
+                    # La petición no llegó a salir: se reintenta con cualquier método
+                    if attempt >= self.max_retries:
+                        raise
+                except (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+                    if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                        raise
+                else:
+                    retryable = method in IDEMPOTENT_METHODS and res.status_code in RETRY_STATUS
+                    if not retryable or attempt >= self.max_retries:
+                        status = str(res.status_code)
+                        return res
+                    await res.aclose()
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+        finally:
+            observe_roble(path, status, time.perf_counter() - t0)
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
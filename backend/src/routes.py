@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict
-
-from flask import Blueprint, abort, current_app, jsonify, request, send_file
+import hashlib
+import io
+import json
+import sqlite3
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Blueprint, abort, current_app, jsonify, request, send_file, stream_with_context, url_for
+from werkzeug.exceptions import HTTPException, ServiceUnavailable
+from werkzeug.http import unquote_etag
 
 from .auth import (
+    current_user_id,
     require_auth,
     roble_login,
     roble_signup,
@@ -15,55 +23,152 @@ from .auth import (
     roble_reset_password,
     roble_logout,
 )
-from .domain import parse_date, generate_tramos
-from .excel import build_excel
+from .bulk_export import (
+    ERRORS_FILE,
+    ERRORS_SHEET,
+    error_report,
+    file_names,
+    render_item,
+    sheet_names,
+    stream_workbook,
+    stream_zip,
+)
+from .domain import (
+    generate_tramos,
+    iter_rows,
+    matches_tramos,
+    month_count,
+    parse_date,
+    roll_forward,
+    summarize_tramos,
+    tramo_bounds,
+)
+from .history import ROLLUP_PERIODS
+from .jobs import JobQueueFull
+from .localization import format_date
+from .metrics import ROWS_GENERATED, XLSX_BYTES, phase
+from .rates import RateSchedule
+from .serialization import COLUMNAR_MIMETYPE, COLUMNAR_NDJSON_MIMETYPE, encode_rows_cursor, to_columnar
+from .validation import (
+    validate_bulk_export,
+    validate_history_entry,
+    validate_history_query,
+    validate_ids,
+    validate_payload,
+    validate_rows_query,
+    validate_scenarios,
+)
 
 
 api_bp = Blueprint("api", __name__)
 
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-def _validate_payload(data: Dict[str, Any]) -> Dict[str, Any]:
-    required = ["fechaInicial", "fechaCorte", "capitalBase", "tasaMensual"]
-    for key in required:
-        if key not in data:
-            abort(400, description=f"Falta campo: {key}")
 
-    try:
-        start = parse_date(str(data["fechaInicial"]))
-        end = parse_date(str(data["fechaCorte"]))
-    except Exception:
-        abort(400, description="Formato de fecha inválido. Use dd/mm/aaaa")
+def _count_rows(result: Dict[str, Any]) -> None:
+    ROWS_GENERATED.inc(amount=sum(len(t["rows"]) for t in result["tramos"]))
 
-    if start > end:
-        abort(400, description="fechaInicial no puede ser mayor que fechaCorte")
 
-    try:
-        base = float(data["capitalBase"])
-        tasa = float(data["tasaMensual"])
-    except Exception:
-        abort(400, description="capitalBase y tasaMensual deben ser numéricos")
-
-    if base <= 0:
-        abort(400, description="capitalBase debe ser > 0")
-    if tasa < 0:
-        abort(400, description="tasaMensual debe ser >= 0")
-
-    vencimiento = None
-    if data.get("fechaVencimiento"):
-        try:
-            vencimiento = parse_date(str(data["fechaVencimiento"]))
-        except Exception:
-            abort(400, description="fechaVencimiento inválida")
-        if not (start < vencimiento <= end):
-            abort(400, description="fechaVencimiento debe estar entre fechaInicial (exclusivo) y fechaCorte (inclusive)")
-
-    return {
-        "start": start,
-        "end": end,
-        "base": base,
-        "tasa": tasa,
-        "vencimiento": vencimiento,
-    }
+def _calculate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    engine = current_app.config["SETTINGS"].calc_engine
+    with phase("calculate"):
+        result = generate_tramos(
+            payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"], engine=engine
+        )
+    _count_rows(result)
+    return result
+
+
+class _CachedResult:
+    __slots__ = ("payload", "result", "xlsx")
+
+    def __init__(self, payload: Dict[str, Any], result: Dict[str, Any]):
+        self.payload = payload
+        self.result = result
+        self.xlsx: Optional[bytes] = None
+
+
+def _payload_key(payload: Dict[str, Any]) -> str:
+    vencimiento = payload["vencimiento"]
+    tasa = payload["tasa"]
+    canonical = json.dumps(
+        {
+            "start": payload["start"].isoformat(),
+            "end": payload["end"].isoformat(),
+            "base": payload["base"],
+            "tasa": tasa.key() if isinstance(tasa, RateSchedule) else tasa,
+            "vencimiento": vencimiento.isoformat() if vencimiento else None,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cached_result(payload: Dict[str, Any]) -> Tuple[str, _CachedResult]:
+    key = _payload_key(payload)
+    cache = current_app.config.get("RESULT_CACHE")
+    entry = cache.get(key) if cache is not None else None
+    if entry is None:
+        entry = _CachedResult(payload, _calculate(payload))
+        if cache is not None:
+            cache.set(key, entry)
+    return key, entry
+
+
+def _with_etag(response, etag: str):
+    # El resultado depende solo del payload validado, así que la etiqueta se deriva de su hash
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _not_modified(etag: str):
+    # Comparación débil (RFC 9110): la respuesta comprimida lleva la misma etiqueta marcada como W/
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _with_etag(current_app.response_class(status=304), etag)
+
+
+def _wants_columnar(columnar_mimetype: str, default_mimetype: str) -> bool:
+    return request.accept_mimetypes.best_match([default_mimetype, columnar_mimetype]) == columnar_mimetype
+
+
+def _result_etag(key: str) -> str:
+    return f"{key}-columnar" if _wants_columnar(COLUMNAR_MIMETYPE, "application/json") else key
+
+
+def _result_response(result: Dict[str, Any], etag: str):
+    # Filas (predeterminado) o columnas si el cliente lo pide en Accept
+    if etag.endswith("-columnar"):
+        response = current_app.response_class(
+            current_app.json.dumps(to_columnar(result)) + "\n", mimetype=COLUMNAR_MIMETYPE
+        )
+    else:
+        response = jsonify(result)
+    response.vary.add("Accept")
+    return _with_etag(response, etag)
+
+
+def excel_builder(writer: str):
+    # Import diferido: openpyxl solo se carga en el primer export (o en warm_up)
+    if writer == "direct":
+        from .xlsx_writer import build_xlsx_direct
+
+        return build_xlsx_direct
+    from .excel import build_excel, build_excel_stream
+
+    return build_excel if writer == "classic" else build_excel_stream
+
+
+def _build_excel(result: Dict[str, Any]):
+    builder = excel_builder(current_app.config["SETTINGS"].excel_writer)
+    with phase("xlsx"):
+        stream = builder(result)
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+    XLSX_BYTES.observe(size)
+    return stream
 
 
 @api_bp.post("/auth/login")
@@ -142,28 +247,527 @@ def auth_logout():
     return jsonify(res)
 
 
+# Vistas de /api/calculate: "full" (todas las filas) o "summary" (subtotales por tramo y por año)
+CALCULATE_VIEWS = ("full", "summary")
+
+
+def _summary_response(payload: Dict[str, Any]):
+    # El resumen no crea filas: se calcula en cada petición en vez de pasar por la caché de resultados
+    etag = f"{_payload_key(payload)}-summary"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    with phase("calculate"):
+        summary = summarize_tramos(
+            payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"]
+        )
+    return _with_etag(jsonify(summary), etag)
+
+
 @api_bp.post("/calculate")
 @require_auth
 def api_calculate():
+    view = request.args.get("view", "full")
+    if view not in CALCULATE_VIEWS:
+        abort(400, description=f"view debe ser uno de: {', '.join(CALCULATE_VIEWS)}")
     data = request.get_json(force=True) or {}
-    payload = _validate_payload(data)
-    result = generate_tramos(payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"])
-    return jsonify(result)
+    with phase("validate"):
+        payload = validate_payload(data)
+    if view == "summary":
+        return _summary_response(payload)
+    etag = _result_etag(_payload_key(payload))
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    _, entry = _cached_result(payload)
+    return _result_response(entry.result, etag)
 
 
 @api_bp.post("/export")
 @require_auth
 def api_export():
     data = request.get_json(force=True) or {}
-    payload = _validate_payload(data)
-    result = generate_tramos(payload["start"], payload["end"], payload["base"], payload["tasa"], payload["vencimiento"])
-    stream = build_excel(result)
-    filename = f"liquidacion_{payload['start'].strftime('%Y%m%d')}_{payload['end'].strftime('%Y%m%d')}.xlsx"
+    with phase("validate"):
+        payload = validate_payload(data)
+    etag = f"{_payload_key(payload)}-xlsx"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    _, entry = _cached_result(payload)
+    if entry.xlsx is not None:
+        stream = io.BytesIO(entry.xlsx)
+    else:
+        stream = _build_excel(entry.result)
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(0)
+        if size <= current_app.config["SETTINGS"].result_cache_max_xlsx_bytes:
+            entry.xlsx = stream.read()
+            stream.close()
+            stream = io.BytesIO(entry.xlsx)
+    response = send_file(stream, as_attachment=True, download_name=_export_filename(payload), mimetype=XLSX_MIMETYPE)
+    return _with_etag(response, etag)
+
+
+def _export_filename(payload: Dict[str, Any]) -> str:
+    return f"liquidacion_{payload['start'].strftime('%Y%m%d')}_{payload['end'].strftime('%Y%m%d')}.xlsx"
+
+
+def _job_status(meta: Dict[str, Any]) -> Dict[str, Any]:
+    def iso(ts):
+        return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+    jobs = current_app.config["EXPORT_JOBS"]
+    status = {
+        "jobId": meta["id"],
+        "status": meta["status"],
+        "filename": meta["filename"],
+        "createdAt": iso(meta["created_at"]),
+        "startedAt": iso(meta.get("started_at")),
+        "finishedAt": iso(meta.get("finished_at")),
+        "statusUrl": url_for("api.api_export_job", job_id=meta["id"]),
+    }
+    if meta["status"] == "done":
+        status["size"] = meta["size"]
+        status["downloadUrl"] = url_for("api.api_export_job_download", job_id=meta["id"])
+        status["expiresAt"] = iso(meta["finished_at"] + jobs.ttl)
+    elif meta["status"] == "failed":
+        status["error"] = meta.get("error")
+    return status
+
+
+@api_bp.post("/export/jobs")
+@require_auth
+def api_export_job_submit():
+    data = request.get_json(force=True) or {}
+    with phase("validate"):
+        payload = validate_payload(data)
+    settings = current_app.config["SETTINGS"]
+    try:
+        meta = current_app.config["EXPORT_JOBS"].submit(
+            current_user_id(), payload, _export_filename(payload), settings.excel_writer, settings.calc_engine
+        )
+    except JobQueueFull:
+        raise ServiceUnavailable("Cola de exportaciones llena; intente de nuevo en unos segundos", retry_after=5)
+    status = _job_status(meta)
+    return jsonify(status), 202, {"Location": status["statusUrl"], "Cache-Control": "no-store"}
+
+
+@api_bp.get("/export/jobs/<job_id>")
+@require_auth
+def api_export_job(job_id: str):
+    meta = current_app.config["EXPORT_JOBS"].get(current_user_id(), job_id)
+    if meta is None:
+        abort(404, description="Trabajo no encontrado o vencido")
+    return jsonify(_job_status(meta)), 200, {"Cache-Control": "no-store"}
+
+
+@api_bp.get("/export/jobs/<job_id>/download")
+@require_auth
+def api_export_job_download(job_id: str):
+    jobs = current_app.config["EXPORT_JOBS"]
+    meta = jobs.get(current_user_id(), job_id)
+    if meta is None:
+        abort(404, description="Trabajo no encontrado o vencido")
+    if meta["status"] != "done":
+        abort(409, description=f"La exportación está en estado {meta['status']}")
+    # Ruta en disco: el servidor WSGI puede enviarla con sendfile (wsgi.file_wrapper) sin copiarla a Python
     return send_file(
-        stream,
+        jobs.artifact_path(job_id),
         as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        download_name=meta["filename"],
+        mimetype=XLSX_MIMETYPE,
+        conditional=True,
+        max_age=0,
+    )
+
+
+@api_bp.post("/export/bulk")
+@require_auth
+def api_export_bulk():
+    settings = current_app.config["SETTINGS"]
+    with phase("validate"):
+        bulk = validate_bulk_export(request.get_json(force=True) or {}, settings.bulk_export_max)
+    fmt, payloads = bulk["format"], bulk["payloads"]
+    # Un token verificado para todo el lote; los cálculos van al pool de exportaciones en orden
+    try:
+        results = current_app.config["EXPORT_JOBS"].map_ordered(
+            render_item, ((payload, fmt, settings.calc_engine) for payload in payloads)
+        )
+    except JobQueueFull:
+        raise ServiceUnavailable("Cola de exportaciones llena; intente de nuevo en unos segundos", retry_after=5)
+    logger = current_app.logger
+
+    def rendered(names, errors_name):
+        # Los encabezados ya se enviaron: un cálculo que falla (o cuyo proceso del pool muere) no corta la descarga,
+        # se omite y se lista al final en ERRORES.txt o en la hoja "Errores"
+        failures = []
+        for index, (name, future) in enumerate(zip(names, results)):
+            try:
+                data, rows = future.result()
+            except Exception as exc:
+                logger.error("Error al exportar calculos[%s]", index, exc_info=exc)
+                failures.append((index, name, exc))
+                continue
+            ROWS_GENERATED.inc(amount=rows)
+            if fmt == "zip":
+                XLSX_BYTES.observe(len(data))
+            yield name, data
+        if failures:
+            report = error_report(failures)
+            yield errors_name, report.encode("utf-8") if fmt == "zip" else report
+
+    stamp = date.today().strftime("%Y%m%d")
+    if fmt == "zip":
+        names = [name or _export_filename(payload) for name, payload in zip(bulk["names"], payloads)]
+        body = stream_zip(rendered(file_names(names), ERRORS_FILE))
+        mimetype, download_name = "application/zip", f"liquidaciones_{stamp}.zip"
+    else:
+        *names, errors_sheet = sheet_names(bulk["names"] + [ERRORS_SHEET])
+        body = stream_workbook(rendered(names, errors_sheet))
+        mimetype, download_name = XLSX_MIMETYPE, f"liquidaciones_{stamp}.xlsx"
+    response = current_app.response_class(
+        body,
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{download_name}"',
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-store",
+        },
+    )
+    # Devuelve los lugares reservados en el pool aunque la descarga se corte o no empiece
+    response.call_on_close(results.close)
+    return response
+
+
+@api_bp.post("/calculate/rows")
+@require_auth
+def api_calculate_rows():
+    data = request.get_json(force=True) or {}
+    with phase("validate"):
+        payload = validate_payload(data)
+        page = validate_rows_query(data, current_app.config["SETTINGS"].rows_page_max)
+    bounds = tramo_bounds(payload["start"], payload["end"], payload["vencimiento"])
+    tramo, offset, limit = page["tramo"], page["offset"], page["limit"]
+    if tramo >= len(bounds):
+        abort(400, description="tramo fuera de rango")
+    etag = f"{_payload_key(payload)}-rows-{tramo}-{offset}-{limit}"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    titulo, tramo_start, tramo_end = bounds[tramo]
+    # Solo se generan los meses de la página, empezando directo en ``offset``
+    with phase("calculate"):
+        rows = list(islice(iter_rows(tramo_start, tramo_end, payload["base"], payload["tasa"], offset), limit))
+    ROWS_GENERATED.inc(amount=len(rows))
+    row_count = month_count(tramo_start, tramo_end)
+    next_cursor = None
+    if offset + len(rows) < row_count:
+        next_cursor = encode_rows_cursor(tramo, offset + len(rows))
+    elif tramo + 1 < len(bounds):
+        next_cursor = encode_rows_cursor(tramo + 1, 0)
+    response = jsonify(
+        {
+            "tramo": tramo,
+            "titulo": titulo,
+            "offset": offset,
+            "rowCount": row_count,
+            "rows": rows,
+            "nextCursor": next_cursor,
+        }
+    )
+    return _with_etag(response, etag)
+
+
+@api_bp.post("/calculate/roll-forward")
+@require_auth
+def api_roll_forward():
+    data = request.get_json(force=True) or {}
+    if not data.get("nuevaFechaCorte"):
+        abort(400, description="Falta campo: nuevaFechaCorte")
+    try:
+        new_end = parse_date(str(data["nuevaFechaCorte"]))
+    except Exception:
+        abort(400, description="nuevaFechaCorte inválida. Use dd/mm/aaaa")
+
+    cache = current_app.config.get("RESULT_CACHE")
+    # Solo se guarda en la caché compartida lo que sale de un cálculo del servidor, nunca de "resultado"
+    trusted = True
+    if data.get("cacheKey"):
+        # Acepta la clave tal como llega en el ETag de /calculate (débil o columnar incluidos)
+        key, _ = unquote_etag(str(data["cacheKey"]).strip())
+        key = key.removesuffix("-columnar")
+        entry = cache.get(key) if cache is not None else None
+        if entry is None:
+            abort(400, description="cacheKey desconocida o expirada")
+        payload, previous = entry.payload, entry.result
+    else:
+        with phase("validate"):
+            payload = validate_payload(data)
+        entry = cache.get(_payload_key(payload)) if cache is not None else None
+        if entry is not None:
+            previous = entry.result
+        else:
+            previous = data.get("resultado")
+            trusted = not previous
+            if previous:
+                try:
+                    valid = matches_tramos(previous, payload["start"], payload["end"], payload["vencimiento"])
+                except (KeyError, TypeError, ValueError, IndexError):
+                    valid = False
+                if not valid:
+                    abort(400, description="resultado no corresponde a fechaInicial, fechaCorte y fechaVencimiento")
+
+    if new_end < payload["end"]:
+        abort(400, description="nuevaFechaCorte no puede ser menor que fechaCorte")
+
+    new_payload = {**payload, "end": new_end}
+    new_key = _payload_key(new_payload)
+    entry = cache.get(new_key) if cache is not None else None
+    if entry is None:
+        if previous:
+            engine = current_app.config["SETTINGS"].calc_engine
+            try:
+                with phase("calculate"):
+                    result = roll_forward(
+                        previous,
+                        payload["start"],
+                        new_end,
+                        payload["base"],
+                        payload["tasa"],
+                        payload["vencimiento"],
+                        engine=engine,
+                    )
+            except (KeyError, TypeError, ValueError):
+                abort(400, description="resultado inválido")
+        else:
+            result = _calculate(new_payload)
+        entry = _CachedResult(new_payload, result)
+        if cache is not None and trusted:
+            cache.set(new_key, entry)
+    return _result_response(entry.result, _result_etag(new_key))
+
+
+_NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _iter_ndjson(stream, max_line_bytes: int):
+    # Lee el cuerpo línea a línea; una línea demasiado larga se descarta y se reporta como None
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            yield None
+            continue
+        if line.strip():
+            yield line
+
+
+def _batch_case(index: int, raw: Any, columnar: bool = False) -> Dict[str, Any]:
+    case = raw
+    try:
+        if raw is None:
+            abort(400, description="Caso demasiado grande")
+        if isinstance(raw, (bytes, str)):
+            try:
+                case = json.loads(raw)
+            except ValueError:
+                abort(400, description="JSON inválido")
+        if not isinstance(case, dict):
+            abort(400, description="Cada caso debe ser un objeto JSON")
+        payload = validate_payload(case)
+        result = _calculate(payload)
+    except HTTPException as err:
+        line = {"index": index, "error": err.name, "detail": err.description}
+    except Exception:
+        # Un caso que falla en el cálculo no corta el lote: se registra y se reporta en su línea
+        current_app.logger.exception("Error al calcular el caso %s del lote", index)
+        line = {"index": index, "error": "Internal Server Error"}
+    else:
+        line = {"index": index, "resultado": to_columnar(result) if columnar else result}
+    if isinstance(case, dict) and "id" in case:
+        line["id"] = case["id"]
+    return line
+
+
+@api_bp.post("/calculate/batch")
+@require_auth
+def api_calculate_batch():
+    settings = current_app.config["SETTINGS"]
+    if request.mimetype in _NDJSON_MIMETYPES:
+        cases = _iter_ndjson(request.stream, settings.batch_max_line_bytes)
+    else:
+        data = request.get_json(force=True)
+        if not isinstance(data, list):
+            abort(400, description="Se esperaba una lista de casos")
+        if len(data) > settings.batch_max_cases:
+            abort(400, description=f"Máximo {settings.batch_max_cases} casos por lote; use NDJSON para lotes mayores")
+        cases = iter(data)
+
+    dumps = current_app.json.dumps
+    columnar = _wants_columnar(COLUMNAR_NDJSON_MIMETYPE, "application/x-ndjson")
+
+    def generate():
+        # Un caso a la vez: la memoria no depende del tamaño del lote
+        for index, raw in enumerate(cases):
+            yield dumps(_batch_case(index, raw, columnar)) + "\n"
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=COLUMNAR_NDJSON_MIMETYPE if columnar else "application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-store", "Vary": "Accept"},
     )
 
 
+@api_bp.post("/calculate/scenarios")
+@require_auth
+def api_calculate_scenarios():
+    from .vectorized import scenario_grid
+
+    data = request.get_json(force=True) or {}
+    with phase("validate"):
+        grid = validate_scenarios(data)
+    with phase("calculate"):
+        totals, subtotals = scenario_grid(grid["start"], grid["base"], grid["rates"], grid["cutoffs"], grid["vencimiento"])
+    response = {
+        "tasasMensuales": grid["rates"],
+        "fechasCorte": [format_date(c) for c in grid["cutoffs"]],
+        "totales": totals.tolist(),
+    }
+    if data.get("incluirSubtotales"):
+        # Por escenario: [tramo general o previo al vencimiento, tramo posterior al vencimiento]
+        response["subtotales"] = subtotals.tolist()
+    return jsonify(response)
+
+
+# Historial de cálculos guardados
+def _history():
+    return current_app.config["HISTORY_STORE"]
+
+
+@api_bp.get("/history")
+@require_auth
+def api_history_list():
+    query = validate_history_query(request.args, current_app.config["SETTINGS"].history_page_max)
+    with phase("history"):
+        page = _history().list(current_user_id(), **query)
+    return jsonify(page)
+
+
+@api_bp.post("/history")
+@require_auth
+def api_history_save():
+    entry = validate_history_entry(request.get_json(force=True) or {})
+    try:
+        with phase("history"):
+            saved = _history().save(current_user_id(), **entry)
+    except LookupError:
+        abort(400, description="folderId o tagIds no existen")
+    return jsonify(saved), 201
+
+
+@api_bp.get("/history/stats")
+@require_auth
+def api_history_stats():
+    granularity = request.args.get("period", "month")
+    if granularity not in ROLLUP_PERIODS:
+        abort(400, description=f"period debe ser uno de: {', '.join(ROLLUP_PERIODS)}")
+    try:
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        abort(400, description="limit debe ser entero")
+    with phase("history"):
+        stats = _history().stats(current_user_id(), granularity, limit)
+    return jsonify(stats)
+
+
+@api_bp.get("/history/<calc_id>")
+@require_auth
+def api_history_get(calc_id: str):
+    item = _history().get(current_user_id(), calc_id)
+    if item is None:
+        abort(404, description="Cálculo no encontrado")
+    return jsonify(item)
+
+
+@api_bp.delete("/history/<calc_id>")
+@require_auth
+def api_history_delete(calc_id: str):
+    if not _history().delete_many(current_user_id(), [calc_id]):
+        abort(404, description="Cálculo no encontrado")
+    return jsonify({"deleted": 1})
+
+
+@api_bp.post("/history/batch-delete")
+@require_auth
+def api_history_batch_delete():
+    ids = validate_ids(request.get_json(force=True) or {})
+    return jsonify({"deleted": _history().delete_many(current_user_id(), ids)})
+
+
+@api_bp.post("/history/move")
+@require_auth
+def api_history_move():
+    data = request.get_json(force=True) or {}
+    ids = validate_ids(data)
+    try:
+        moved = _history().move_many(current_user_id(), ids, data.get("folderId") or None)
+    except LookupError:
+        abort(400, description="folderId no existe")
+    return jsonify({"moved": moved})
+
+
+@api_bp.get("/history/tags")
+@require_auth
+def api_history_tags():
+    return jsonify(_history().list_tags(current_user_id()))
+
+
+@api_bp.post("/history/tags")
+@require_auth
+def api_history_create_tag():
+    data = request.get_json(force=True) or {}
+    name = str(data.get("name", "")).strip()
+    if not name:
+        abort(400, description="name es requerido")
+    try:
+        tag = _history().create_tag(current_user_id(), name, data.get("color"), data.get("description"))
+    except sqlite3.IntegrityError:
+        abort(400, description="Ya existe una etiqueta con ese nombre")
+    return jsonify(tag), 201
+
+
+@api_bp.post("/history/tags/<tag_id>/calculations")
+@require_auth
+def api_history_tag_calculations(tag_id: str):
+    ids = validate_ids(request.get_json(force=True) or {})
+    try:
+        tagged = _history().tag_many(current_user_id(), tag_id, ids)
+    except LookupError:
+        abort(404, description="Etiqueta no encontrada")
+    return jsonify({"tagged": tagged})
+
+
+@api_bp.get("/history/folders")
+@require_auth
+def api_history_folders():
+    return jsonify(_history().list_folders(current_user_id()))
+
+
+@api_bp.post("/history/folders")
+@require_auth
+def api_history_create_folder():
+    data = request.get_json(force=True) or {}
+    name = str(data.get("name", "")).strip()
+    if not name:
+        abort(400, description="name es requerido")
+    try:
+        folder = _history().create_folder(current_user_id(), name, data.get("parentId") or None, data.get("description"))
+    except LookupError:
+        abort(400, description="parentId no existe")
+    except sqlite3.IntegrityError:
+        abort(400, description="Ya existe una carpeta con ese nombre")
+    return jsonify(folder), 201
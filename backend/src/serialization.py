@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, List, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+from .domain import Row
+from .localization import format_date, month_name_es
+
+
+# Representación columnar de un resultado (se negocia con Accept; la de filas sigue siendo la predeterminada)
+COLUMNAR_MIMETYPE = "application/vnd.liquidation.columnar+json"
+COLUMNAR_NDJSON_MIMETYPE = "application/vnd.liquidation.columnar+x-ndjson"
+
+# Serializadores JSON disponibles; "auto" usa orjson si está instalado
+JSON_SERIALIZERS = ("auto", "orjson", "stdlib")
+
+_ROW_COLUMNS = ("mes", "del", "hasta", "dias", "interes")
+_HOISTED = ("base", "tasa")
+
+
+def _row_columns(rows: List[Any]) -> Dict[str, List[Any]]:
+    if all(isinstance(r, Row) for r in rows):
+        # Lectura directa de los slots, sin pasar por Row.__getitem__
+        return {
+            "mes": [month_name_es(r.start) for r in rows],
+            "del": [format_date(r.start) for r in rows],
+            "hasta": [format_date(r.end) for r in rows],
+            "dias": [r.days for r in rows],
+            "base": [r.base for r in rows],
+            "tasa": [r.rate for r in rows],
+            "interes": [r.interest for r in rows],
+        }
+    return {key: [r[key] for r in rows] for key in Row.KEYS}
+
+
+def to_columnar(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Un arreglo por campo en cada tramo; ``base`` y ``tasa`` suben al tramo cuando son constantes.
+
+    Para reconstruir la fila ``i``: ``tramo["columns"][k][i]`` o, si ``k`` no
+    está en ``columns``, ``tramo[k]``.
+    """
+    tramos = []
+    for tramo in result["tramos"]:
+        columns = _row_columns(tramo["rows"])
+        encoded: Dict[str, Any] = {"titulo": tramo["titulo"], "subtotal": tramo["subtotal"], "rowCount": len(tramo["rows"])}
+        for key in _HOISTED:
+            values = columns[key]
+            if values and all(v == values[0] for v in values):
+                encoded[key] = values[0]
+                del columns[key]
+        encoded["columns"] = columns
+        tramos.append(encoded)
+    return {"format": "columnar", "tramos": tramos, "total": result["total"]}
+
+
+def encode_rows_cursor(tramo: int, offset: int) -> str:
+    raw = json.dumps([tramo, offset], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_rows_cursor(cursor: str) -> Tuple[int, int]:
+    """Tramo y mes de inicio de la página; lanza ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        tramo, offset = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+    if type(tramo) is not int or type(offset) is not int or tramo < 0 or offset < 0:
+        raise ValueError("cursor inválido")
+    return tramo, offset
+
+
+def _load_orjson(serializer: str):
+    if serializer not in JSON_SERIALIZERS:
+        raise ValueError(f"Serializador JSON desconocido: {serializer}")
+    if serializer == "stdlib":
+        return None
+    try:
+        import orjson
+    except ImportError:
+        if serializer == "orjson":
+            raise
+        return None
+    return orjson
+
+
+class LiquidationJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que sabe serializar filas compactas (``Row``).
+
+    Con ``serializer`` "orjson" (o "auto" y orjson instalado) las respuestas
+    compactas se generan con orjson; la salida es JSON equivalente (UTF-8 sin
+    escapar) y las fechas siguen pasando por ``default``. El modo con sangría
+    (debug) y lo que orjson no admite (enteros de más de 64 bits) usan la
+    biblioteca estándar.
+    """
+
+    def __init__(self, app, serializer: str = "stdlib"):
+        super().__init__(app)
+        self._orjson = _load_orjson(serializer)
+        if self._orjson is not None:
+            self._orjson_options = (
+                self._orjson.OPT_SORT_KEYS
+                | self._orjson.OPT_NON_STR_KEYS
+                | self._orjson.OPT_PASSTHROUGH_DATETIME
+                | self._orjson.OPT_PASSTHROUGH_DATACLASS
+            )
+
+    @property
+    def serializer(self) -> str:
+        return "orjson" if self._orjson is not None else "stdlib"
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        if isinstance(o, Row):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self._orjson is not None and not kwargs.get("indent"):
+            try:
+                return self._orjson.dumps(obj, default=self.default, option=self._orjson_options).decode("utf-8")
+            except self._orjson.JSONEncodeError:
+                # orjson no admite enteros de más de 64 bits; la biblioteca estándar sí
+                pass
+        return super().dumps(obj, **kwargs)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+
+# Disposición de la hoja de liquidación, compartida por los generadores de XLSX.
+# Vive aparte de excel.py para que xlsx_writer no arrastre openpyxl al importarse.
+HEADERS = [
+    "Mes causado",
+    "Del",
+    "Hasta",
+    "Días",
+    "Base",
+    "Tasa de interés moratorio",
+    "Interés causado",
+]
+COLUMN_WIDTHS = [18, 12, 12, 8, 14, 26, 16]
+FIRST_ROW = 10
+FIRST_COL = 2
+
+# Por encima de este tamaño el XLSX en construcción pasa de memoria a disco
+SPOOL_MAX_BYTES = 1024 * 1024
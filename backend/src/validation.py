@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List
+
+from flask import abort
+from werkzeug.exceptions import HTTPException
+
+from .bulk_export import BULK_FORMATS
+from .domain import DATE_FMT, parse_date
+from .history import decode_cursor
+from .rates import RateSchedule, load_schedule
+from .serialization import decode_rows_cursor
+
+
+def parse_rate_schedule(raw: Any, start) -> RateSchedule:
+    if not isinstance(raw, list):
+        abort(400, description="tasas debe ser una lista de {desde, tasa}")
+    intervals = []
+    for item in raw:
+        try:
+            intervals.append((parse_date(str(item["desde"])), float(item["tasa"])))
+            if not math.isfinite(intervals[-1][1]):
+                raise ValueError(item["tasa"])
+        except Exception:
+            abort(400, description="Cada tasa requiere desde (dd/mm/aaaa) y tasa numérica")
+    try:
+        schedule = load_schedule(tuple(sorted(intervals)))
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    if schedule.first_date > start:
+        abort(400, description="tasas debe cubrir desde fechaInicial")
+    return schedule
+
+
+def validate_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    # "tasas" (calendario de tasas por fechas) reemplaza a tasaMensual
+    schedule = data.get("tasas")
+    required = ["fechaInicial", "fechaCorte", "capitalBase"] + ([] if schedule else ["tasaMensual"])
+    for key in required:
+        if key not in data:
+            abort(400, description=f"Falta campo: {key}")
+
+    try:
+        start = parse_date(str(data["fechaInicial"]))
+        end = parse_date(str(data["fechaCorte"]))
+    except Exception:
+        abort(400, description="Formato de fecha inválido. Use dd/mm/aaaa")
+
+    if start > end:
+        abort(400, description="fechaInicial no puede ser mayor que fechaCorte")
+
+    try:
+        base = float(data["capitalBase"])
+        tasa = None if schedule else float(data["tasaMensual"])
+    except Exception:
+        abort(400, description="capitalBase y tasaMensual deben ser numéricos")
+
+    if not math.isfinite(base) or (tasa is not None and not math.isfinite(tasa)):
+        abort(400, description="capitalBase y tasaMensual deben ser números finitos")
+    if base <= 0:
+        abort(400, description="capitalBase debe ser > 0")
+    if schedule:
+        tasa = parse_rate_schedule(schedule, start)
+    elif tasa < 0:
+        abort(400, description="tasaMensual debe ser >= 0")
+
+    vencimiento = None
+    if data.get("fechaVencimiento"):
+        try:
+            vencimiento = parse_date(str(data["fechaVencimiento"]))
+        except Exception:
+            abort(400, description="fechaVencimiento inválida")
+        if not (start < vencimiento <= end):
+            abort(400, description="fechaVencimiento debe estar entre fechaInicial (exclusivo) y fechaCorte (inclusive)")
+
+    return {
+        "start": start,
+        "end": end,
+        "base": base,
+        "tasa": tasa,
+        "vencimiento": vencimiento,
+    }
+
+
+MAX_SCENARIO_CELLS = 10_000
+
+
+def validate_scenarios(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Un crédito con varias tasas y varias fechas de corte
+    rates_raw = data.get("tasasMensuales")
+    cutoffs_raw = data.get("fechasCorte")
+    if not isinstance(rates_raw, list) or not rates_raw:
+        abort(400, description="tasasMensuales debe ser una lista no vacía")
+    if not isinstance(cutoffs_raw, list) or not cutoffs_raw:
+        abort(400, description="fechasCorte debe ser una lista no vacía")
+    if len(rates_raw) * len(cutoffs_raw) > MAX_SCENARIO_CELLS:
+        abort(400, description=f"Máximo {MAX_SCENARIO_CELLS} escenarios por consulta")
+
+    try:
+        rates = [float(r) for r in rates_raw]
+    except Exception:
+        abort(400, description="tasasMensuales deben ser numéricas")
+    if not all(math.isfinite(r) for r in rates):
+        abort(400, description="tasasMensuales deben ser números finitos")
+    if any(r < 0 for r in rates):
+        abort(400, description="tasasMensuales deben ser >= 0")
+    try:
+        cutoffs = [parse_date(str(c)) for c in cutoffs_raw]
+    except Exception:
+        abort(400, description="fechasCorte inválidas. Use dd/mm/aaaa")
+
+    # El resto de campos se valida como un cálculo normal hasta el corte más lejano
+    probe = {k: v for k, v in data.items() if k not in ("tasas", "tasasMensuales", "fechasCorte")}
+    probe["fechaCorte"] = max(cutoffs).strftime(DATE_FMT)
+    probe["tasaMensual"] = rates[0]
+    payload = validate_payload(probe)
+    if min(cutoffs) < payload["start"]:
+        abort(400, description="fechasCorte no pueden ser menores que fechaInicial")
+
+    return {
+        "start": payload["start"],
+        "base": payload["base"],
+        "vencimiento": payload["vencimiento"],
+        "rates": rates,
+        "cutoffs": cutoffs,
+    }
+
+
+def validate_bulk_export(data: Dict[str, Any], max_items: int) -> Dict[str, Any]:
+    # Todos los cálculos se validan antes de empezar a enviar el archivo
+    fmt = str(data.get("formato", "zip")).lower()
+    if fmt not in BULK_FORMATS:
+        abort(400, description="formato debe ser zip o xlsx")
+    items = data.get("calculos")
+    if not isinstance(items, list) or not items:
+        abort(400, description="calculos debe ser una lista no vacía")
+    if len(items) > max_items:
+        abort(400, description=f"Máximo {max_items} cálculos por exportación")
+    names, payloads = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            abort(400, description=f"calculos[{index}] debe ser un objeto")
+        try:
+            payloads.append(validate_payload(item))
+        except HTTPException as err:
+            abort(400, description=f"calculos[{index}]: {err.description}")
+        names.append(str(item.get("nombre") or "").strip())
+    return {"format": fmt, "names": names, "payloads": payloads}
+
+
+def _non_negative_int(data: Dict[str, Any], key: str, default: int) -> int:
+    value = data.get(key, default)
+    if type(value) is not int or value < 0:
+        abort(400, description=f"{key} debe ser un entero >= 0")
+    return value
+
+
+def validate_rows_query(data: Dict[str, Any], page_max: int) -> Dict[str, int]:
+    # Página de /api/calculate/rows: cursor de la respuesta anterior, o tramo y mes inicial explícitos
+    limit = _non_negative_int(data, "limit", min(120, page_max))
+    if not 1 <= limit <= page_max:
+        abort(400, description=f"limit debe estar entre 1 y {page_max}")
+    if data.get("cursor"):
+        try:
+            tramo, offset = decode_rows_cursor(str(data["cursor"]))
+        except ValueError:
+            abort(400, description="cursor inválido")
+    else:
+        tramo = _non_negative_int(data, "tramo", 0)
+        offset = _non_negative_int(data, "offset", 0)
+    return {"tramo": tramo, "offset": offset, "limit": limit}
+
+
+def _optional_float(args, key: str):
+    raw = args.get(key)
+    if raw in (None, ""):
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        abort(400, description=f"{key} debe ser numérico")
+
+
+def _optional_day(args, key: str):
+    raw = args.get(key)
+    if not raw:
+        return None
+    try:
+        return parse_date(str(raw))
+    except Exception:
+        abort(400, description=f"{key} inválida. Use dd/mm/aaaa")
+
+
+def validate_history_query(args, page_max: int) -> Dict[str, Any]:
+    # Parámetros de GET /api/history (mismos filtros que searchCalculationsAdvanced en el frontend)
+    try:
+        limit = int(args.get("limit", 50))
+    except ValueError:
+        abort(400, description="limit debe ser entero")
+    if not 1 <= limit <= page_max:
+        abort(400, description=f"limit debe estar entre 1 y {page_max}")
+
+    cursor = args.get("cursor") or None
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            abort(400, description="cursor inválido")
+
+    direction = args.get("order", "desc").lower()
+    if direction not in ("asc", "desc"):
+        abort(400, description="order debe ser asc o desc")
+
+    date_from = _optional_day(args, "dateFrom")
+    date_to = _optional_day(args, "dateTo")
+    if date_from and date_to and date_from > date_to:
+        abort(400, description="dateFrom no puede ser mayor que dateTo")
+
+    folder = args.get("folderId") or None
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "descending": direction == "desc",
+        "query": (args.get("q") or "").strip() or None,
+        "folder_id": None if folder == "none" else folder,
+        "no_folder": folder == "none",
+        # created_at se guarda en UTC con formato ISO fijo; los días se comparan completos
+        "date_from": f"{date_from.isoformat()}T00:00:00.000000Z" if date_from else None,
+        "date_to": f"{date_to.isoformat()}T23:59:59.999999Z" if date_to else None,
+        "capital_min": _optional_float(args, "capitalMin"),
+        "capital_max": _optional_float(args, "capitalMax"),
+        "rate_min": _optional_float(args, "rateMin"),
+        "rate_max": _optional_float(args, "rateMax"),
+        "tag_ids": [t for t in (args.get("tagIds") or "").split(",") if t],
+    }
+
+
+def validate_history_entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    name = str(data.get("name", "")).strip()
+    if not name:
+        abort(400, description="name es requerido")
+    form_data = data.get("formData")
+    if not isinstance(form_data, dict):
+        abort(400, description="formData debe ser un objeto")
+    result_data = data.get("resultData")
+    if result_data is not None and not isinstance(result_data, dict):
+        abort(400, description="resultData debe ser un objeto")
+    tag_ids = data.get("tagIds") or []
+    if not isinstance(tag_ids, list) or not all(isinstance(t, str) for t in tag_ids):
+        abort(400, description="tagIds debe ser una lista de identificadores")
+    return {
+        "name": name,
+        "description": (str(data["description"]).strip() or None) if data.get("description") else None,
+        "form_data": form_data,
+        "result_data": result_data,
+        "folder_id": data.get("folderId") or None,
+        "tag_ids": tag_ids,
+    }
+
+
+MAX_HISTORY_IDS = 500
+
+
+def validate_ids(data: Dict[str, Any]) -> List[str]:
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        abort(400, description="ids debe ser una lista no vacía de identificadores")
+    if len(ids) > MAX_HISTORY_IDS:
+        abort(400, description=f"Máximo {MAX_HISTORY_IDS} identificadores por operación")
+    return list(dict.fromkeys(ids))
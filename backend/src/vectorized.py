@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+
+from .rates import RateSchedule
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Suma de intereses por encima de la cual int64 podría desbordar: se calcula con el motor en Python
+_INT64_SAFE = float(2**62)
+
+
+def _fits_int64(base: float, max_rate_pct: float, days: int) -> bool:
+    return base * (max_rate_pct / 100.0) * ((days + 31) / 30.0) < _INT64_SAFE
+
+
+def month_segments(start: date, end: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Inicio, fin y días de cada tramo mensual, igual que ``domain.daterange_monthly``."""
+    s = np.datetime64(start, "D")
+    e = np.datetime64(end, "D")
+    if s > e:
+        empty = np.array([], dtype="datetime64[D]")
+        return empty, empty, np.array([], dtype=np.int64)
+    months = np.arange(s.astype("datetime64[M]"), e.astype("datetime64[M]") + 1)
+    seg_start = np.maximum(months.astype("datetime64[D]"), s)
+    seg_end = np.minimum((months + 1).astype("datetime64[D]") - 1, e)
+    days = (seg_end - seg_start).astype(np.int64) + 1
+    return seg_start, seg_end, days
+
+
+def rounded_interest(days: np.ndarray, base: float, monthly_rate_pct: float) -> np.ndarray:
+    # Mismo orden de operaciones que el motor en Python; rint redondea al par como round()
+    return np.rint(base * (monthly_rate_pct / 100.0) * (days / 30.0)).astype(np.int64)
+
+
+def schedule_interest(
+    seg_start: np.ndarray, seg_end: np.ndarray, days: np.ndarray, base: float, schedule: RateSchedule
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Tasa efectiva e interés redondeado por tramo con un calendario de tasas.
+
+    Replica ``RateSchedule.segment`` operación por operación para que ambos
+    motores produzcan los mismos valores.
+    """
+    starts = np.asarray(schedule.starts, dtype=np.int64)
+    rates = np.asarray(schedule.rates, dtype=np.float64)
+    cum = np.asarray(schedule.cum, dtype=np.float64)
+    a = seg_start.astype(np.int64) + _EPOCH_ORDINAL
+    b = seg_end.astype(np.int64) + _EPOCH_ORDINAL
+    ia = np.searchsorted(starts, a, side="right") - 1
+    ib = np.searchsorted(starts, b, side="right") - 1
+    if len(ia) and ia[0] < 0:
+        raise ValueError(f"No hay tasa vigente el {seg_start[0].item().isoformat()}")
+    same = ia == ib
+    rate_a = rates[ia]
+    pct_days = (cum[ib] + rates[ib] * (b + 1 - starts[ib])) - (cum[ia] + rates[ia] * (a - starts[ia]))
+    interest = np.where(same, base * (rate_a / 100.0) * (days / 30.0), base * (pct_days / 100.0) / 30.0)
+    effective = np.where(same, rate_a, pct_days / days)
+    return effective, np.rint(interest).astype(np.int64)
+
+
+def calculate_rows_numpy(start: date, end: date, base: float, monthly_rate_pct: float | RateSchedule):
+    from .domain import Row, calculate_rows
+
+    max_rate = max(monthly_rate_pct.rates) if isinstance(monthly_rate_pct, RateSchedule) else monthly_rate_pct
+    if not _fits_int64(base, max_rate, (end - start).days + 1):
+        return calculate_rows(start, end, base, monthly_rate_pct)
+    seg_start, seg_end, days = month_segments(start, end)
+    if isinstance(monthly_rate_pct, RateSchedule):
+        effective, interest = schedule_interest(seg_start, seg_end, days, base, monthly_rate_pct)
+        rates = effective.tolist()
+    else:
+        interest = rounded_interest(days, base, monthly_rate_pct)
+        rates = [monthly_rate_pct] * len(days)
+    rows = [
+        Row(dt_start, dt_end, dias, base, tasa, interes)
+        for dt_start, dt_end, dias, tasa, interes in zip(
+            seg_start.tolist(), seg_end.tolist(), days.tolist(), rates, interest.tolist()
+        )
+    ]
+    return rows, int(interest.sum())
+
+
+def _truncated_totals(
+    first: date, cutoffs: np.ndarray, last: date, base: float, rates: np.ndarray
+) -> np.ndarray:
+    """Suma de intereses redondeados desde ``first`` hasta cada fecha de corte, para cada tasa.
+
+    Los meses completos se toman de una suma acumulada de la matriz tasas × meses;
+    solo el último mes (parcial) de cada corte se calcula aparte.
+    """
+    seg_start, _, days = month_segments(first, last)
+    factor = (base * (rates / 100.0))[:, None]
+    full = np.rint(factor * (days / 30.0)[None, :]).astype(np.int64)
+    cum = np.zeros((len(rates), len(days) + 1), dtype=np.int64)
+    np.cumsum(full, axis=1, out=cum[:, 1:])
+    k = np.searchsorted(seg_start, cutoffs, side="right") - 1
+    partial_days = (cutoffs - seg_start[k]).astype(np.int64) + 1
+    partial = np.rint(factor * (partial_days / 30.0)[None, :]).astype(np.int64)
+    return cum[:, k] + partial
+
+
+def _python_grid(
+    start: date, base: float, rates: List[float], cutoffs: List[date], vencimiento: date | None
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Celda por celda con enteros de Python (sin límite de tamaño)
+    from .domain import generate_tramos
+
+    subtotals = np.zeros((len(rates), len(cutoffs), 2), dtype=object)
+    for i, rate in enumerate(rates):
+        for j, cutoff in enumerate(cutoffs):
+            for k, tramo in enumerate(generate_tramos(start, cutoff, base, rate, vencimiento)["tramos"]):
+                subtotals[i, j, k] = tramo["subtotal"]
+    return subtotals.sum(axis=2), subtotals
+
+
+def scenario_grid(
+    start: date,
+    base: float,
+    rates: List[float],
+    cutoffs: List[date],
+    vencimiento: date | None = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Totales y subtotales de ``generate_tramos`` para cada par (tasa, fecha de corte).
+
+    Retorna ``(totales, subtotales)`` con formas (tasas, cortes) y (tasas, cortes, 2);
+    el segundo subtotal es 0 cuando el corte no supera el vencimiento (un solo tramo).
+    """
+    rates_arr = np.asarray(rates, dtype=np.float64)
+    cut = np.asarray(cutoffs, dtype="datetime64[D]")
+    subtotals = np.zeros((len(rates_arr), len(cut), 2), dtype=np.int64)
+    if len(cut) == 0 or len(rates_arr) == 0:
+        return subtotals.sum(axis=2), subtotals
+
+    if not _fits_int64(base, float(rates_arr.max()), (max(cutoffs) - start).days + 1):
+        return _python_grid(start, base, rates, cutoffs, vencimiento)
+
+    split = np.zeros(len(cut), dtype=bool)
+    if vencimiento is not None:
+        split = cut >= np.datetime64(vencimiento, "D")
+    last = cut.max().item()
+
+    single = ~split
+    if single.any():
+        subtotals[:, single, 0] = _truncated_totals(start, cut[single], last, base, rates_arr)
+    if split.any():
+        tramo1_end = np.datetime64(vencimiento, "D") - 1
+        tramo1 = _truncated_totals(start, np.array([tramo1_end]), tramo1_end.item(), base, rates_arr)
+        subtotals[:, split, 0] = tramo1
+        subtotals[:, split, 1] = _truncated_totals(vencimiento, cut[split], last, base, rates_arr)
+    return subtotals.sum(axis=2), subtotals
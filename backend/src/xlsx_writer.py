@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterable, Iterator, List, Tuple, Union
+from xml.sax.saxutils import escape
+
+from .metrics import phase
+from .sheet_layout import COLUMN_WIDTHS, FIRST_COL, FIRST_ROW, HEADERS, SPOOL_MAX_BYTES
+
+
+# Partes fijas del paquete SpreadsheetML; las hojas, el libro y las cadenas compartidas dependen de los datos
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+
+
+def _content_types(sheet_count: int) -> str:
+    sheets = "".join(_SHEET_CONTENT_TYPE.format(n=n) for n in range(1, sheet_count + 1))
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        f"{sheets}"
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+        '<Override PartName="/docProps/app.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+        "</Types>"
+    )
+
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties" Target="docProps/app.xml"/>'
+    "</Relationships>"
+)
+
+APP_PROPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties"/>'
+)
+
+CORE_PROPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{now}</dcterms:modified>'
+    "</cp:coreProperties>"
+)
+
+
+def _workbook(names: List[str]) -> str:
+    quoted = [escape(name, {'"': "&quot;"}) for name in names]
+    sheets = "".join(f'<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>' for n, name in enumerate(quoted, start=1))
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<bookViews><workbookView activeTab="0"/></bookViews>'
+        f"<sheets>{sheets}</sheets>"
+        "</workbook>"
+    )
+
+
+def _workbook_rels(sheet_count: int) -> str:
+    # Hojas rId1..rIdN; estilos y cadenas compartidas a continuación
+    sheets = "".join(
+        f'<Relationship Id="rId{n}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>'
+        for n in range(1, sheet_count + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f"{sheets}"
+        f'<Relationship Id="rId{sheet_count + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        f'<Relationship Id="rId{sheet_count + 2}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+        "</Relationships>"
+    )
+
+
+# Índices de cellXfs en STYLES
+S_TITLE = 1  # negrita 12, centrado
+S_HEADER = 2  # negrita, relleno D9D9D9, bordes, centrado
+S_TEXT = 3  # bordes
+S_CURRENCY = 4  # estilo con nombre currency_cop: "$"#,##0 con bordes
+S_RATE = 5  # bordes, centrado
+S_LABEL = 6  # negrita, bordes
+S_TOTAL = 7  # negrita 12, bordes
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="&quot;$&quot;#,##0"/></numFmts>'
+    '<fonts count="4">'
+    '<font><name val="Calibri"/><family val="2"/><color theme="1"/><sz val="11"/><scheme val="minor"/></font>'
+    "<font/>"
+    '<font><b val="1"/><sz val="12"/></font>'
+    '<font><b val="1"/></font>'
+    "</fonts>"
+    '<fills count="3">'
+    '<fill><patternFill/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="00D9D9D9"/><bgColor rgb="00D9D9D9"/></patternFill></fill>'
+    "</fills>"
+    '<borders count="2">'
+    "<border><left/><right/><top/><bottom/><diagonal/></border>"
+    '<border><left style="thin"><color rgb="00000000"/></left><right style="thin"><color rgb="00000000"/></right>'
+    '<top style="thin"><color rgb="00000000"/></top><bottom style="thin"><color rgb="00000000"/></bottom>'
+    "<diagonal/></border>"
+    "</borders>"
+    '<cellStyleXfs count="2">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+    '<xf numFmtId="164" fontId="1" fillId="0" borderId="1" applyNumberFormat="1" applyBorder="1"/>'
+    "</cellStyleXfs>"
+    '<cellXfs count="8">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="center"/></xf>'
+    '<xf numFmtId="0" fontId="3" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" '
+    'applyAlignment="1"><alignment horizontal="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>'
+    '<xf numFmtId="164" fontId="1" fillId="0" borderId="1" xfId="1" applyNumberFormat="1" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center"/></xf>'
+    '<xf numFmtId="0" fontId="3" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    "</cellXfs>"
+    '<cellStyles count="2">'
+    '<cellStyle name="Normal" xfId="0" builtinId="0"/>'
+    '<cellStyle name="currency_cop" xfId="1"/>'
+    "</cellStyles>"
+    "</styleSheet>"
+)
+
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheetPr><outlinePr summaryBelow="1" summaryRight="1"/><pageSetUpPr/></sheetPr>'
+    '<sheetViews><sheetView workbookViewId="0"><selection activeCell="A1" sqref="A1"/></sheetView></sheetViews>'
+    '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+)
+
+COLS = [chr(64 + FIRST_COL + i) for i in range(len(HEADERS))]
+
+# Filas que se acumulan antes de escribir al zip
+_FLUSH_ROWS = 128
+
+
+class _SharedStrings:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.count = 0
+
+    def __call__(self, value: str) -> int:
+        self.count += 1
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.index)
+        return idx
+
+    def xml(self) -> str:
+        items = "".join(f"<si><t>{escape(s)}</t></si>" for s in self.index)
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'count="{self.count}" uniqueCount="{len(self.index)}">{items}</sst>'
+        )
+
+
+def _num(value: float) -> str:
+    v = float(value)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def _write_sheet(zf: zipfile.ZipFile, part: str, payload: dict, sst: _SharedStrings) -> None:
+    """Escribe la hoja de liquidación (misma disposición que ``build_excel``) fila a fila en ``part``."""
+    merges: List[str] = []
+
+    def s_cell(col: str, row: int, style: int, value: str) -> str:
+        return f'<c r="{col}{row}" s="{style}" t="s"><v>{sst(value)}</v></c>'
+
+    def n_cell(col: str, row: int, style: int, value: float) -> str:
+        return f'<c r="{col}{row}" s="{style}"><v>{_num(value)}</v></c>'
+
+    with zf.open(part, "w", force_zip64=True) as sheet:
+        buf: List[str] = [SHEET_HEAD, "<cols>"]
+        for i, w in enumerate(COLUMN_WIDTHS):
+            buf.append(f'<col min="{FIRST_COL + i}" max="{FIRST_COL + i}" width="{w}" customWidth="1"/>')
+        buf.append("</cols><sheetData>")
+
+        def flush() -> None:
+            sheet.write("".join(buf).encode("utf-8"))
+            buf.clear()
+
+        row_idx = FIRST_ROW
+        first, last = COLS[0], COLS[-1]
+        for tramo in payload["tramos"]:
+            buf.append(f'<row r="{row_idx}">{s_cell(first, row_idx, S_TITLE, tramo["titulo"])}</row>')
+            merges.append(f"{first}{row_idx}:{last}{row_idx}")
+            row_idx += 1
+
+            cells = "".join(s_cell(col, row_idx, S_HEADER, h) for col, h in zip(COLS, HEADERS))
+            buf.append(f'<row r="{row_idx}">{cells}</row>')
+            row_idx += 1
+
+            for r in tramo["rows"]:
+                tasa = f"{r['tasa']:.2f}%"
+                buf.append(
+                    f'<row r="{row_idx}">'
+                    f"{s_cell(COLS[0], row_idx, S_TEXT, r['mes'])}"
+                    f"{s_cell(COLS[1], row_idx, S_TEXT, r['del'])}"
+                    f"{s_cell(COLS[2], row_idx, S_TEXT, r['hasta'])}"
+                    f"{n_cell(COLS[3], row_idx, S_TEXT, r['dias'])}"
+                    f"{n_cell(COLS[4], row_idx, S_CURRENCY, r['base'])}"
+                    f"{s_cell(COLS[5], row_idx, S_RATE, tasa)}"
+                    f"{n_cell(COLS[6], row_idx, S_CURRENCY, r['interes'])}"
+                    "</row>"
+                )
+                row_idx += 1
+                if len(buf) >= _FLUSH_ROWS:
+                    flush()
+
+            buf.append(
+                f'<row r="{row_idx}">{s_cell(first, row_idx, S_LABEL, "Subtotal tramo")}'
+                f'{n_cell(last, row_idx, S_CURRENCY, tramo["subtotal"])}</row>'
+            )
+            merges.append(f"{first}{row_idx}:{COLS[-2]}{row_idx}")
+            row_idx += 2
+
+        buf.append(
+            f'<row r="{row_idx}">{s_cell(first, row_idx, S_TOTAL, "Total intereses causados a esta fecha")}'
+            f'{n_cell(last, row_idx, S_CURRENCY, payload["total"])}</row>'
+        )
+        merges.append(f"{first}{row_idx}:{COLS[-2]}{row_idx}")
+        buf.append("</sheetData>")
+        buf.append(f'<mergeCells count="{len(merges)}">')
+        buf.extend(f'<mergeCell ref="{ref}"/>' for ref in merges)
+        buf.append(
+            '</mergeCells><pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+            "</worksheet>"
+        )
+        flush()
+
+
+def _write_text_sheet(zf: zipfile.ZipFile, part: str, text: str, sst: _SharedStrings) -> None:
+    """Hoja de texto plano: una línea por fila en la columna A."""
+    rows = "".join(
+        f'<row r="{r}"><c r="A{r}" t="s"><v>{sst(line)}</v></c></row>' for r, line in enumerate(text.splitlines(), 1)
+    )
+    cols = '<cols><col min="1" max="1" width="100" customWidth="1"/></cols>'
+    zf.writestr(part, f"{SHEET_HEAD}{cols}<sheetData>{rows}</sheetData></worksheet>")
+
+
+def iter_workbook(fileobj: IO[bytes], sheets: Iterable[Tuple[str, Union[dict, str]]]) -> Iterator[int]:
+    """Escribe un libro con una hoja por resultado y cede el número de cada hoja terminada.
+
+    ``sheets`` puede ser perezoso: cada hoja se escribe en cuanto llega, y el
+    libro, sus relaciones y los tipos de contenido (que dependen de los nombres)
+    van al final del paquete. ``fileobj`` puede no ser seekable; así quien
+    consume el generador puede enviar lo escrito entre una hoja y la siguiente.
+    Un resultado ``str`` se escribe como hoja de texto (una línea por fila).
+    """
+    sst = _SharedStrings()
+    names: List[str] = []
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("docProps/app.xml", APP_PROPS)
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        zf.writestr("docProps/core.xml", CORE_PROPS.format(now=now))
+        zf.writestr("xl/styles.xml", STYLES)
+
+        for name, payload in sheets:
+            names.append(name)
+            part = f"xl/worksheets/sheet{len(names)}.xml"
+            if isinstance(payload, str):
+                _write_text_sheet(zf, part, payload, sst)
+            else:
+                _write_sheet(zf, part, payload, sst)
+            yield len(names)
+
+        zf.writestr("xl/sharedStrings.xml", sst.xml())
+        zf.writestr("xl/workbook.xml", _workbook(names))
+        zf.writestr("xl/_rels/workbook.xml.rels", _workbook_rels(len(names)))
+        zf.writestr("[Content_Types].xml", _content_types(len(names)))
+
+
+def build_xlsx_direct(payload: dict) -> IO[bytes]:
+    """Genera la misma hoja que ``build_excel`` escribiendo el SpreadsheetML directamente.
+
+    Estilos y relaciones son plantillas fijas; la hoja se genera fila a fila
+    dentro del zip y las cadenas compartidas se escriben al final.
+    """
+    stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with phase("xlsx_save"):
+        for _ in iter_workbook(stream, [("Liquidación", payload)]):
+            pass
+    stream.seek(0)
+    return stream
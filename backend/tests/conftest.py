@@ -0,0 +1,31 @@
+import dataclasses
+
+import pytest
+
+from src import auth, create_app
+from src.config import Settings
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Roble simulado: el token es el id del usuario
+    monkeypatch.setattr(auth, "roble_verify", lambda token: {"user": {"id": token}})
+    settings = dataclasses.replace(
+        Settings.from_env(),
+        debug=False,
+        history_db_path=str(tmp_path / "history.db"),
+        export_jobs_dir=str(tmp_path / "export_jobs"),
+        export_jobs_executor="thread",
+    )
+    app = create_app(settings)
+    yield app
+    app.config["EXPORT_JOBS"].shutdown()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def bearer(user: str = "u1") -> dict:
+    return {"Authorization": f"Bearer {user}"}
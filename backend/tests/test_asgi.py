@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from src import asgi
+from src.asgi import AsgiApp
+
+from .test_batch import CASE
+
+
+def _call(app, path, chunks, headers=()):
+    """Ejecuta una petición POST; registra el orden de lo recibido y lo enviado."""
+    events = []
+    pending = list(chunks)
+
+    async def receive():
+        if not pending:
+            await asyncio.sleep(3600)
+        chunk = pending.pop(0)
+        events.append(("received", chunk))
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def send(message):
+        events.append(("sent", message))
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"authorization", b"Bearer u1"), *headers],
+    }
+
+    async def run():
+        server = AsgiApp(app, workers=2)
+        try:
+            await server(scope, receive, send)
+        finally:
+            server.executor.shutdown()
+
+    asyncio.run(run())
+    return events, pending
+
+
+def _verified(monkeypatch):
+    async def verify(token):
+        return {"user": {"id": token}}
+
+    monkeypatch.setattr(asgi, "verify_token_async", verify)
+
+
+def test_ndjson_body_is_read_while_responding(app, monkeypatch):
+    _verified(monkeypatch)
+    chunks = [json.dumps(CASE).encode() + b"\n" for _ in range(3)]
+    events, _ = _call(app, "/api/calculate/batch", chunks, [(b"content-type", b"application/x-ndjson")])
+    lines = [e[1]["body"] for e in events if e[0] == "sent" and e[1].get("body")]
+    assert [json.loads(line)["index"] for line in lines] == [0, 1, 2]
+    # El primer caso se responde antes de recibir el último
+    first_line = next(i for i, e in enumerate(events) if e[0] == "sent" and e[1].get("body"))
+    last_chunk = max(i for i, e in enumerate(events) if e[0] == "received")
+    assert first_line < last_chunk
+
+
+def test_body_over_limit_is_rejected_without_buffering(app, monkeypatch):
+    _verified(monkeypatch)
+    app.config["MAX_CONTENT_LENGTH"] = 100
+    for path in ("/api/auth/login", "/api/calculate"):
+        events, pending = _call(app, path, [b"x" * 60] * 10, [(b"content-type", b"application/json")])
+        start = next(e[1] for e in events if e[0] == "sent" and e[1]["type"] == "http.response.start")
+        assert start["status"] == 413
+        assert pending
+
+
+def test_full_pool_answers_503(app, monkeypatch):
+    _verified(monkeypatch)
+    body = json.dumps(CASE).encode()
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/calculate",
+        "query_string": b"",
+        "headers": [(b"authorization", b"Bearer u1"), (b"content-type", b"application/json")],
+    }
+
+    async def request(server, gate=None):
+        sent = []
+
+        async def receive():
+            if gate is not None:
+                await gate.wait()
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await server(scope, receive, send)
+        return sent[0]
+
+    async def run():
+        server = AsgiApp(app, workers=1, max_queue=1)
+        gate = asyncio.Event()
+        try:
+            # Dos peticiones ocupan el hilo y la cola; la tercera se rechaza sin esperar
+            slow = [asyncio.create_task(request(server, gate)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            rejected = await request(server)
+            gate.set()
+            done = await asyncio.gather(*slow)
+            again = await request(server)
+        finally:
+            server.executor.shutdown()
+        return rejected, done, again
+
+    rejected, done, again = asyncio.run(run())
+    assert rejected["status"] == 503 and (b"retry-after", b"2") in rejected["headers"]
+    assert [d["status"] for d in done] == [200, 200]
+    assert again["status"] == 200
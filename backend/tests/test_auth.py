@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+from werkzeug.exceptions import HTTPException
+
+from src.auth import roble_login_async, roble_signup_async, roble_verify, roble_verify_async
+
+
+class _Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = "{}"
+
+    def json(self):
+        return {"user": {"id": "u1"}}
+
+
+class _Roble:
+    """Roble simulado: responde los estados de ``replies`` en orden (una excepción se lanza)."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def _reply(self):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return _Response(reply)
+
+    def get(self, path, **kwargs):
+        return self._reply()
+
+    def post(self, path, **kwargs):
+        return self._reply()
+
+
+class _AsyncRoble(_Roble):
+    async def get(self, path, **kwargs):
+        return self._reply()
+
+    async def post(self, path, **kwargs):
+        return self._reply()
+
+
+def _verify(app, roble, token="tok"):
+    app.config["ROBLE_CLIENT"] = roble
+    cache = app.config["TOKEN_CACHE"]
+    with app.test_request_context():
+        try:
+            return cache.verify(token, roble_verify)
+        except HTTPException as err:
+            return err.code
+
+
+def _verify_async(app, roble, token="tok"):
+    app.config["ROBLE_ASYNC_CLIENT"] = roble
+    cache = app.config["TOKEN_CACHE"]
+
+    async def run():
+        with app.test_request_context():
+            try:
+                return await cache.verify_async(token, roble_verify_async)
+            except HTTPException as err:
+                return err.code
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "verify, roble_class, failure",
+    [
+        (_verify, _Roble, requests.ConnectTimeout()),
+        (_verify_async, _AsyncRoble, httpx.ReadTimeout("timeout")),
+    ],
+)
+def test_roble_outage_is_not_cached_as_rejection(app, verify, roble_class, failure):
+    roble = roble_class(503, failure, 200)
+    assert verify(app, roble) == 502
+    assert verify(app, roble) == 503
+    # El token sigue siendo válido en cuanto Roble vuelve
+    assert verify(app, roble) == {"user": {"id": "u1"}}
+    assert roble.calls == 3
+
+
+@pytest.mark.parametrize("verify, roble_class", [(_verify, _Roble), (_verify_async, _AsyncRoble)])
+def test_rejection_is_negative_cached(app, verify, roble_class):
+    roble = roble_class(403)
+    assert verify(app, roble) == 401
+    assert verify(app, roble) == 401
+    assert roble.calls == 1
+
+
+def test_logout_during_inflight_verification_is_not_recached():
+    from src.auth import TokenCache
+
+    cache = TokenCache(ttl=60, maxsize=10, negative_ttl=5)
+    calls = []
+
+    def fetch(token):
+        calls.append(token)
+        if len(calls) == 1:
+            # El logout llega mientras Roble responde la verificación
+            cache.evict(token)
+        return {"user": {"id": "u1"}}
+
+    cache.verify("tok", fetch)
+    cache.verify("tok", fetch)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/api/auth/login", {"email": "a@b.co", "password": "x"}),
+        ("/api/auth/signup", {"email": "a@b.co", "password": "x", "name": "Ana"}),
+        ("/api/auth/forgot-password", {"email": "a@b.co"}),
+    ],
+)
+def test_roble_outage_in_auth_routes_is_503(app, client, path, body):
+    app.config["ROBLE_CLIENT"] = _Roble(requests.ConnectionError())
+    res = client.post(path, json=body)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "5"
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda: roble_login_async("a@b.co", "x"),
+        lambda: roble_signup_async("a@b.co", "x", "Ana"),
+    ],
+)
+def test_roble_outage_in_async_helpers_is_503(app, call):
+    app.config["ROBLE_ASYNC_CLIENT"] = _AsyncRoble(httpx.ConnectTimeout("timeout"))
+
+    async def run():
+        with app.test_request_context():
+            await call()
+
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(run())
+    assert err.value.code == 503
+    assert dict(err.value.get_headers())["Retry-After"] == "5"
@@ -0,0 +1,16 @@
+import json
+
+from .conftest import bearer
+
+CASE = {"fechaInicial": "15/01/2020", "fechaCorte": "10/06/2023", "capitalBase": 1_000_000, "tasaMensual": 2.1}
+
+
+def test_domain_error_is_reported_inline(client):
+    # Pasa la validación pero desborda el calendario en daterange_monthly
+    overflow = {**CASE, "fechaInicial": "01/12/9999", "fechaCorte": "31/12/9999", "id": "y9999"}
+    body = "\n".join(json.dumps(c) for c in (CASE, overflow, CASE)) + "\n"
+    res = client.post("/api/calculate/batch", data=body, content_type="application/x-ndjson", headers=bearer())
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[1] == {"index": 1, "error": "Internal Server Error", "id": "y9999"}
+    assert lines[0]["resultado"] == lines[2]["resultado"]
@@ -0,0 +1,39 @@
+import io
+import zipfile
+
+from openpyxl import load_workbook
+
+from .conftest import bearer
+from .test_batch import CASE
+
+# Pasa la validación pero desborda el calendario al calcular
+OVERFLOW = {**CASE, "fechaInicial": "01/12/9999", "fechaCorte": "31/12/9999", "nombre": "y9999"}
+
+
+def _export(client, formato):
+    body = {"formato": formato, "calculos": [{**CASE, "nombre": "a"}, OVERFLOW, {**CASE, "nombre": "b"}]}
+    res = client.post("/api/export/bulk", json=body, headers=bearer())
+    assert res.status_code == 200
+    return res.get_data()
+
+
+def test_zip_lists_failed_items(client):
+    with zipfile.ZipFile(io.BytesIO(_export(client, "zip"))) as zf:
+        assert zf.namelist() == ["a.xlsx", "b.xlsx", "ERRORES.txt"]
+        report = zf.read("ERRORES.txt").decode("utf-8")
+        assert "calculos[1] y9999.xlsx: error al generar el archivo (OverflowError)" in report
+        load_workbook(io.BytesIO(zf.read("b.xlsx")))
+
+
+def test_workbook_adds_errors_sheet(client):
+    wb = load_workbook(io.BytesIO(_export(client, "xlsx")))
+    assert wb.sheetnames == ["a", "b", "Errores"]
+    assert wb["Errores"]["A2"].value == "calculos[1] y9999: error al generar el archivo (OverflowError)"
+
+
+def test_control_characters_in_names_are_replaced(client):
+    body = {"formato": "xlsx", "calculos": [{**CASE, "nombre": "a\x01b"}, {**CASE, "nombre": "c\td"}]}
+    res = client.post("/api/export/bulk", json=body, headers=bearer())
+    assert load_workbook(io.BytesIO(res.get_data())).sheetnames == ["a_b", "c_d"]
+    res = client.post("/api/export/bulk", json={**body, "formato": "zip"}, headers=bearer())
+    assert zipfile.ZipFile(io.BytesIO(res.get_data())).namelist() == ["a_b.xlsx", "c_d.xlsx"]
@@ -0,0 +1,43 @@
+import asyncio
+
+from src.cache import AsyncSingleFlight
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    async def run():
+        flight = AsyncSingleFlight()
+        started = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return "claims"
+
+        leader = asyncio.create_task(flight.do("tok", fetch))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("tok", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == ("claims", True)
+        assert leader.cancelled()
+        assert calls == [1]
+        # Terminada la llamada, la clave queda libre para una nueva
+        assert await flight.do("tok", fetch) == ("claims", False)
+
+    asyncio.run(run())
+
+
+def test_errors_are_shared():
+    async def run():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("roble")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(run())
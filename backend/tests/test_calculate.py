@@ -0,0 +1,62 @@
+from .conftest import bearer
+from .test_batch import CASE
+
+PAYLOAD = {**CASE, "fechaVencimiento": "15/01/2021"}
+
+
+def _pages(client, **query):
+    body, pages = {**PAYLOAD, **query}, []
+    while True:
+        page = client.post("/api/calculate/rows", json=body, headers=bearer()).get_json()
+        pages.append(page)
+        if page["nextCursor"] is None:
+            return pages
+        body = {**PAYLOAD, "limit": query.get("limit", 120), "cursor": page["nextCursor"]}
+
+
+def test_rows_cursor_pages_match_full_result(client):
+    full = client.post("/api/calculate", json=PAYLOAD, headers=bearer()).get_json()
+    pages = _pages(client, limit=7)
+    for i, tramo in enumerate(full["tramos"]):
+        tramo_pages = [p for p in pages if p["tramo"] == i]
+        assert all(p["titulo"] == tramo["titulo"] and p["rowCount"] == len(tramo["rows"]) for p in tramo_pages)
+        assert [p["offset"] for p in tramo_pages] == list(range(0, len(tramo["rows"]), 7))
+        assert [r for p in tramo_pages for r in p["rows"]] == tramo["rows"]
+    assert [p["tramo"] for p in pages] == sorted(p["tramo"] for p in pages)
+
+
+def test_rows_explicit_offset_and_bad_requests(client):
+    full = client.post("/api/calculate", json=PAYLOAD, headers=bearer()).get_json()
+    res = client.post("/api/calculate/rows", json={**PAYLOAD, "tramo": 1, "offset": 5, "limit": 3}, headers=bearer())
+    assert res.get_json()["rows"] == full["tramos"][1]["rows"][5:8]
+
+    for query in ({"tramo": 2}, {"cursor": "no-es-un-cursor"}, {"limit": 0}, {"offset": -1}):
+        res = client.post("/api/calculate/rows", json={**PAYLOAD, **query}, headers=bearer())
+        assert res.status_code == 400
+
+
+def test_rows_page_past_the_end_is_empty(client):
+    res = client.post("/api/calculate/rows", json={**PAYLOAD, "tramo": 1, "offset": 10_000}, headers=bearer())
+    page = res.get_json()
+    assert page["rows"] == [] and page["nextCursor"] is None
+
+
+def test_summary_view_matches_full_result(client):
+    full = client.post("/api/calculate", json=PAYLOAD, headers=bearer()).get_json()
+    res = client.post("/api/calculate?view=summary", json=PAYLOAD, headers=bearer())
+    summary = res.get_json()
+    assert summary["format"] == "summary" and summary["total"] == full["total"]
+    for tramo, ref in zip(summary["tramos"], full["tramos"], strict=True):
+        assert tramo["titulo"] == ref["titulo"] and tramo["rowCount"] == len(ref["rows"])
+        assert (tramo["del"], tramo["hasta"]) == (ref["rows"][0]["del"], ref["rows"][-1]["hasta"])
+        assert tramo["subtotal"] == ref["subtotal"] == sum(y["interes"] for y in tramo["anios"])
+        assert tramo["dias"] == sum(r["dias"] for r in ref["rows"])
+
+    again = client.post(
+        "/api/calculate?view=summary", json=PAYLOAD, headers={**bearer(), "If-None-Match": res.headers["ETag"]}
+    )
+    assert again.status_code == 304
+
+
+def test_unknown_view_is_rejected(client):
+    assert client.post("/api/calculate?view=rows", json=PAYLOAD, headers=bearer()).status_code == 400
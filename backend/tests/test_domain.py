@@ -0,0 +1,105 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from src.domain import Row, generate_tramos, roll_forward, summarize_tramos
+from src.localization import format_date, month_name_es
+
+
+# Algoritmo original (mes a mes, un dict por fila): referencia para los motores optimizados
+def _reference_rows(start, end, base, rate):
+    rows, current = [], start
+    while current <= end:
+        month_end = (current.replace(day=1) + relativedelta(months=+1)) - timedelta(days=1)
+        current_end = min(month_end, end)
+        days = (current_end - current).days + 1
+        rows.append(
+            {
+                "mes": month_name_es(current),
+                "del": format_date(current),
+                "hasta": format_date(current_end),
+                "dias": days,
+                "base": base,
+                "tasa": rate,
+                "interes": int(round(base * (rate / 100.0) * (days / 30.0))),
+            }
+        )
+        current = current_end + timedelta(days=1)
+    return rows
+
+
+def _reference(start, end, base, rate, vencimiento):
+    if vencimiento is None or not (start < vencimiento <= end):
+        bounds = [("TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO", start, end)]
+    else:
+        rd = relativedelta(vencimiento, start)
+        meses = rd.years * 12 + rd.months + (1 if rd.days > 0 else 0)
+        titulo = "TABLA DE LIQUIDACIÓN GENERAL DEL CRÉDITO DE HIPOTECA"
+        bounds = [
+            (f"{titulo} {meses} MESES", start, vencimiento - timedelta(days=1)),
+            (f"{titulo} DESDE QUE SE VENCE EL PLAZO PACTADO", vencimiento, end),
+        ]
+    tramos = []
+    for titulo, tramo_start, tramo_end in bounds:
+        rows = _reference_rows(tramo_start, tramo_end, base, rate)
+        tramos.append({"titulo": titulo, "rows": rows, "subtotal": sum(r["interes"] for r in rows)})
+    return {"tramos": tramos, "total": sum(t["subtotal"] for t in tramos)}
+
+
+def _plain(result):
+    return {
+        "tramos": [
+            {**t, "rows": [r.to_dict() if isinstance(r, Row) else r for r in t["rows"]]} for t in result["tramos"]
+        ],
+        "total": result["total"],
+    }
+
+
+def _random_cases(seed, count=150):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        start = date(1995, 1, 1) + timedelta(days=rnd.randrange(16_000))
+        end = start + timedelta(days=rnd.randrange(4_000))
+        base = rnd.choice([rnd.randrange(1, 10**9), round(rnd.uniform(1, 10**8), 2)])
+        rate = rnd.choice([0.0, round(rnd.uniform(0, 5), 2), round(rnd.uniform(0, 5), 4)])
+        vencimiento = rnd.choice([None, start, end, start + timedelta(days=rnd.randrange(-60, 4_100))])
+        yield start, end, base, rate, vencimiento
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_generate_tramos_matches_reference(engine):
+    for start, end, base, rate, vencimiento in _random_cases(seed=1):
+        result = generate_tramos(start, end, base, rate, vencimiento, engine=engine)
+        assert _plain(result) == _reference(start, end, base, rate, vencimiento)
+
+
+def test_summarize_tramos_matches_reference():
+    for start, end, base, rate, vencimiento in _random_cases(seed=2):
+        summary = summarize_tramos(start, end, base, rate, vencimiento)
+        expected = _reference(start, end, base, rate, vencimiento)
+        assert summary["total"] == expected["total"]
+        for tramo, ref in zip(summary["tramos"], expected["tramos"], strict=True):
+            rows = ref["rows"]
+            assert (tramo["titulo"], tramo["del"], tramo["hasta"]) == (ref["titulo"], rows[0]["del"], rows[-1]["hasta"])
+            assert tramo["rowCount"] == len(rows)
+            assert tramo["dias"] == sum(r["dias"] for r in rows)
+            assert tramo["subtotal"] == ref["subtotal"]
+            by_year = {}
+            for r in rows:
+                year = by_year.setdefault(int(r["del"][-4:]), [0, 0, 0])
+                year[0] += 1
+                year[1] += r["dias"]
+                year[2] += r["interes"]
+            assert {y["anio"]: [y["meses"], y["dias"], y["interes"]] for y in tramo["anios"]} == by_year
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_roll_forward_matches_reference(engine):
+    rnd = random.Random(3)
+    for start, end, base, rate, vencimiento in _random_cases(seed=3):
+        new_end = end + timedelta(days=rnd.randrange(800))
+        previous = generate_tramos(start, end, base, rate, vencimiento, engine=engine)
+        rolled = roll_forward(previous, start, new_end, base, rate, vencimiento, engine=engine)
+        assert _plain(rolled) == _reference(start, new_end, base, rate, vencimiento)
@@ -0,0 +1,164 @@
+import pytest
+
+from src.history import HistoryStore
+
+from .conftest import bearer
+
+FORM = {"fechaInicial": "15/01/2020", "fechaCorte": "10/06/2023", "capitalBase": "1.000.000", "tasaMensual": "2.1"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"), count_cap=3)
+
+
+def _save(store, name, user="u1", **kwargs):
+    return store.save(user, name, FORM, **kwargs)
+
+
+def test_save_and_get(store):
+    result = {"total": 1234, "tramos": [{"rows": [{"dias": 30}, {"dias": "31"}]}, {"rows": [{"dias": 10}]}]}
+    saved = _save(store, "Cliente", result_data=result, description="nota")
+    assert saved["capital_amount"] == 1_000_000
+    assert saved["interest_rate"] == 2.1
+    assert saved["total_interest"] == 1234
+    assert saved["days_calculated"] == 71
+    assert store.get("u1", saved["id"])["result_data"] == result
+    # Los cálculos son del usuario que los guardó
+    assert store.get("u2", saved["id"]) is None
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_keyset_pagination_visits_every_entry_once(store, descending):
+    ids = [_save(store, f"c{i}")["id"] for i in range(7)]
+    _save(store, "ajeno", user="u2")
+    seen, cursor = [], None
+    while True:
+        page = store.list("u1", limit=3, cursor=cursor, descending=descending)
+        assert page["estimatedCount"] == 7 and page["countIsExact"]
+        seen += [item["id"] for item in page["data"]]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == (ids[::-1] if descending else ids)
+
+
+def test_search_uses_trigrams_and_like_for_short_queries(store):
+    _save(store, "Banco Andino", description="crédito de consumo")
+    _save(store, "Cliente Pérez")
+    _save(store, "Andino", user="u2")
+    assert [i["name"] for i in store.list("u1", query="ndin")["data"]] == ["Banco Andino"]
+    assert [i["name"] for i in store.list("u1", query="consumo")["data"]] == ["Banco Andino"]
+    assert [i["name"] for i in store.list("u1", query="Pé")["data"]] == ["Cliente Pérez"]
+    assert store.list("u1", query="100%")["data"] == []
+
+
+def test_filtered_count_is_capped(store):
+    for i in range(5):
+        _save(store, f"Banco {i}")
+    page = store.list("u1", query="Banco", limit=2)
+    assert page["estimatedCount"] == 3 and not page["countIsExact"]
+
+
+def test_delete_and_move_only_touch_own_entries(store):
+    mine = [_save(store, f"c{i}")["id"] for i in range(3)]
+    theirs = _save(store, "ajeno", user="u2")["id"]
+    folder = store.create_folder("u1", "Clientes")["id"]
+    foreign_folder = store.create_folder("u2", "Otros")["id"]
+
+    assert store.move_many("u1", mine[:2] + [theirs], folder) == 2
+    assert [i["id"] for i in store.list("u1", folder_id=folder, descending=False)["data"]] == mine[:2]
+    assert [i["id"] for i in store.list("u1", no_folder=True)["data"]] == [mine[2]]
+    assert store.get("u1", mine[0])["folder"] == {"id": folder, "name": "Clientes"}
+    with pytest.raises(LookupError):
+        store.move_many("u1", mine, foreign_folder)
+
+    assert store.delete_many("u1", [mine[0], theirs]) == 1
+    assert store.get("u2", theirs) is not None
+    assert store.list("u1")["estimatedCount"] == 2
+
+
+def test_tags_and_folders_must_belong_to_the_user(store):
+    tag = store.create_tag("u1", "urgente")["id"]
+    foreign_tag = store.create_tag("u2", "otro")["id"]
+    foreign_folder = store.create_folder("u2", "Otros")["id"]
+    with pytest.raises(LookupError):
+        _save(store, "c", tag_ids=[foreign_tag])
+    with pytest.raises(LookupError):
+        _save(store, "c", folder_id=foreign_folder)
+    assert store.list("u1")["estimatedCount"] == 0
+
+    tagged = _save(store, "c", tag_ids=[tag])["id"]
+    other = _save(store, "d")["id"]
+    assert store.tag_many("u1", tag, [other]) == 1
+    with pytest.raises(LookupError):
+        store.tag_many("u1", foreign_tag, [other])
+    assert {i["id"] for i in store.list("u1", tag_ids=[tag])["data"]} == {tagged, other}
+    assert [t["name"] for t in store.list_tags("u1")] == ["urgente"]
+
+
+@pytest.mark.parametrize(
+    "result",
+    [{"tramos": ["x"]}, {"tramos": [{"rows": [{"dias": "abc"}, "y", {"dias": None}]}]}, {"tramos": [{"rows": 3}]}],
+)
+def test_malformed_result_data_is_saved_without_days(client, result):
+    res = client.post("/api/history", json={"name": "c", "formData": FORM, "resultData": result}, headers=bearer())
+    assert res.status_code == 201
+    assert res.get_json()["days_calculated"] is None
+
+
+def _expected_periods(store, user, granularity):
+    from src.history import ROLLUP_PERIODS
+
+    period = ROLLUP_PERIODS[granularity].format(row="c")
+    rows = store.conn.execute(
+        f"SELECT {period} AS period, COUNT(*), COALESCE(SUM(capital_amount), 0), COALESCE(SUM(total_interest), 0)"
+        f" FROM calculations c WHERE user_id = ? AND substr(name, 1, 5) <> 'temp_' GROUP BY 1 ORDER BY 1 DESC",
+        (user,),
+    ).fetchall()
+    return [((r[0] or None) if granularity == "folder" else r[0], r[1], r[2], r[3]) for r in rows]
+
+
+def test_rollups_match_the_base_table(store):
+    folders = [store.create_folder("u1", name)["id"] for name in ("A", "B")]
+    dates = [
+        "2023-12-31T23:59:59.000000Z",
+        "2024-01-01T00:00:00.000000Z",
+        "2024-01-07T10:00:00.000000Z",
+        "2024-02-29T12:00:00.000000Z",
+        "2025-03-03T08:00:00.000000Z",
+    ]
+    ids = []
+    for i in range(12):
+        form = {**FORM, "capitalBase": None} if i % 4 == 3 else {**FORM, "capitalBase": 1000 * (i + 1)}
+        result = {"total": 10 * i} if i % 3 else None
+        saved = store.save("u1", f"temp_{i}" if i == 5 else f"c{i}", form, result, folder_id=folders[i % 2])
+        ids.append(saved["id"])
+        with store._transaction() as conn:
+            conn.execute("UPDATE calculations SET created_at = ? WHERE id = ?", (dates[i % len(dates)], saved["id"]))
+    store.save("u2", "ajeno", FORM)
+
+    store.move_many("u1", ids[:4], folders[1])
+    store.move_many("u1", ids[4:6], None)
+    store.delete_many("u1", [ids[6], ids[11]])
+    with store._transaction() as conn:
+        conn.execute("UPDATE calculations SET name = 'temp_x' WHERE id = ?", (ids[7],))
+        conn.execute("UPDATE calculations SET name = 'visible' WHERE id = ?", (ids[5],))
+
+    for granularity in ("day", "week", "month", "year", "folder"):
+        stats = store.stats("u1", granularity)
+        got = [(p["period"], p["calculation_count"], p["total_capital"], p["total_interest"]) for p in stats["periods"]]
+        assert sorted(got, key=repr) == sorted(_expected_periods(store, "u1", granularity), key=repr), granularity
+
+    totals = store.stats("u1")["totals"]
+    expected = store.conn.execute(
+        "SELECT COUNT(*), SUM(capital_amount), SUM(total_interest), COUNT(DISTINCT substr(created_at, 1, 7)),"
+        " MAX(created_at) FROM calculations WHERE user_id = 'u1' AND substr(name, 1, 5) <> 'temp_'"
+    ).fetchone()
+    assert (totals["calculation_count"], totals["total_capital"], totals["total_interest"]) == tuple(expected[:3])
+    assert (totals["active_months"], totals["last_calculation_date"]) == tuple(expected[3:])
+
+    # Reconstruir desde cero da lo mismo que lo mantenido por los triggers
+    before = {g: store.stats("u1", g) for g in ("day", "week", "folder")}
+    store.rebuild_rollups()
+    assert {g: store.stats("u1", g) for g in ("day", "week", "folder")} == before
@@ -0,0 +1,54 @@
+import operator
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.jobs import ExportJobs, JobQueueFull
+
+from .conftest import bearer
+from .test_batch import CASE
+
+
+def test_broken_pool_fails_only_items_in_flight(tmp_path):
+    jobs = ExportJobs(str(tmp_path), workers=1, executor="process")
+    try:
+        broken = jobs._pool()
+        items = [(os._exit, 1), (pow, 2, 3), (pow, 3, 2)]
+        futures = list(jobs.map_ordered(operator.call, items))
+        assert isinstance(futures[0].exception(), BrokenProcessPool)
+        assert futures[2].result() == 9
+        fresh = jobs._pool()
+        assert fresh is not broken
+        # Aviso tardío de otro trabajo del pool roto
+        jobs._reset_pool(broken)
+        assert jobs._pool() is fresh
+        assert [f.result() for f in jobs.map_ordered(pow, [(2, 3), (3, 2)])] == [8, 9]
+    finally:
+        jobs.shutdown()
+
+
+def test_bulk_map_shares_the_job_queue_budget(tmp_path):
+    jobs = ExportJobs(str(tmp_path), workers=1, max_queue=1, executor="thread")
+    try:
+        results = jobs.map_ordered(pow, [(2, 3)])
+        with pytest.raises(JobQueueFull):
+            jobs.submit("u1", {}, "a.xlsx", "stream", "python")
+        with pytest.raises(JobQueueFull):
+            jobs.map_ordered(pow, [(2, 3)])
+        assert [f.result() for f in results] == [8]
+        # Agotado (o cerrado sin empezar) devuelve sus lugares
+        jobs.map_ordered(pow, [(2, 3)]).close()
+        assert jobs._pending == 0
+    finally:
+        jobs.shutdown()
+
+
+def test_bulk_export_releases_its_slots(app, client):
+    body = {"calculos": [{**CASE, "nombre": "a"}]}
+    assert client.post("/api/export/bulk", json=body, headers=bearer()).status_code == 200
+    jobs = app.config["EXPORT_JOBS"]
+    assert jobs._pending == 0
+    jobs._pending = jobs.workers + jobs.max_queue
+    res = client.post("/api/export/bulk", json=body, headers=bearer())
+    assert res.status_code == 503 and res.headers["Retry-After"] == "5"
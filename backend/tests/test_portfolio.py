@@ -0,0 +1,22 @@
+import csv
+
+import pytest
+
+from src import portfolio
+
+HEADER = "fechaInicial,fechaCorte,capitalBase,tasaMensual,id\n"
+GOOD = "15/01/2020,10/06/2023,1000000,2.1,{id}\n"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.parametrize("bad", ["15/01/2020,31/12/9999,1000000,2.1,malo\n", "15/01/2020,10/06/2023,nan,2.1,malo\n"])
+def test_failing_row_does_not_stop_the_run(tmp_path, workers, bad):
+    source = tmp_path / "cartera.csv"
+    source.write_text(HEADER + GOOD.format(id="a") + bad + GOOD.format(id="b"), encoding="utf-8")
+    output = tmp_path / "salida.csv"
+    assert portfolio.main([str(source), "-o", str(output), "-w", str(workers), "-c", "1", "-q"]) == 0
+    with output.open(newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [r["id"] for r in rows] == ["a", "malo", "b"]
+    assert rows[1]["error"] and not rows[1]["total"]
+    assert rows[0]["total"] == rows[2]["total"] and not rows[0]["error"]
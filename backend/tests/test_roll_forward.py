@@ -0,0 +1,75 @@
+import copy
+
+from src.domain import generate_tramos, roll_forward
+from src.validation import validate_payload
+
+from .conftest import bearer
+
+PAYLOAD = {
+    "fechaInicial": "15/01/2020",
+    "fechaCorte": "10/06/2023",
+    "capitalBase": 1_000_000,
+    "tasaMensual": 2.1,
+    "fechaVencimiento": "15/01/2021",
+}
+
+
+def _full(end: str) -> dict:
+    p = validate_payload({**PAYLOAD, "fechaCorte": end})
+    return generate_tramos(p["start"], p["end"], p["base"], p["tasa"], p["vencimiento"])
+
+
+def test_roll_forward_matches_full_recompute():
+    p = validate_payload(PAYLOAD)
+    for new_end in ("10/06/2023", "30/06/2023", "01/07/2023", "31/12/2030"):
+        new = validate_payload({**PAYLOAD, "fechaCorte": new_end})["end"]
+        rolled = roll_forward(_full("10/06/2023"), p["start"], new, p["base"], p["tasa"], p["vencimiento"])
+        assert rolled == _full(new_end)
+
+
+def test_client_result_is_rolled_forward(client):
+    previous = client.post("/api/calculate", json=PAYLOAD, headers=bearer()).get_json()
+    client.application.config["RESULT_CACHE"].clear()
+    res = client.post(
+        "/api/calculate/roll-forward",
+        json={**PAYLOAD, "resultado": previous, "nuevaFechaCorte": "20/11/2024"},
+        headers=bearer(),
+    )
+    assert res.status_code == 200
+    assert res.get_json() == client.post(
+        "/api/calculate", json={**PAYLOAD, "fechaCorte": "20/11/2024"}, headers=bearer()
+    ).get_json()
+
+
+def test_forged_result_is_rejected_and_never_cached(client):
+    previous = client.post("/api/calculate", json=PAYLOAD, headers=bearer()).get_json()
+    client.application.config["RESULT_CACHE"].clear()
+
+    forged = copy.deepcopy(previous)
+    forged["tramos"][-1]["titulo"] = "X"
+    forged["tramos"][-1]["subtotal"] = 999_999_999
+    inflated = copy.deepcopy(previous)
+    inflated["tramos"][-1]["subtotal"] += 1
+    inflated["total"] += 1
+    short = copy.deepcopy(previous)
+    short["tramos"][-1]["rows"].pop()
+    for bad in (forged, inflated, short, {"tramos": "x"}):
+        res = client.post(
+            "/api/calculate/roll-forward",
+            json={**PAYLOAD, "resultado": bad, "nuevaFechaCorte": "20/11/2024"},
+            headers=bearer("attacker"),
+        )
+        assert res.status_code == 400
+
+    # Aunque el resultado sea coherente, lo que se extiende a partir de él no entra en la caché compartida
+    client.post(
+        "/api/calculate/roll-forward",
+        json={**PAYLOAD, "resultado": previous, "nuevaFechaCorte": "20/11/2024"},
+        headers=bearer("attacker"),
+    )
+    assert len(client.application.config["RESULT_CACHE"]) == 0
+
+    expected = _full("20/11/2024")
+    res = client.post("/api/calculate", json={**PAYLOAD, "fechaCorte": "20/11/2024"}, headers=bearer("u2")).get_json()
+    assert res["total"] == expected["total"]
+    assert [t["titulo"] for t in res["tramos"]] == [t["titulo"] for t in expected["tramos"]]
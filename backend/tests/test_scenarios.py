@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.domain import generate_tramos
+from src.vectorized import scenario_grid
+
+from .conftest import bearer
+
+
+@pytest.mark.parametrize("vencimiento", [None, date(2019, 7, 20), date(2021, 3, 1)])
+def test_scenario_grid_matches_generate_tramos(vencimiento):
+    start, base = date(2018, 11, 17), 12_345_678.9
+    rates = [0.0, 1.1, 2.13, 3.5]
+    cutoffs = [start, date(2018, 11, 30), date(2019, 7, 19), date(2019, 7, 20), date(2021, 2, 28)]
+    cutoffs += [start + timedelta(days=d) for d in (45, 400, 1000, 1500)]
+    totals, subtotals = scenario_grid(start, base, rates, cutoffs, vencimiento)
+    for i, rate in enumerate(rates):
+        for j, cutoff in enumerate(cutoffs):
+            result = generate_tramos(start, cutoff, base, rate, vencimiento)
+            assert totals[i, j] == result["total"]
+            expected = [t["subtotal"] for t in result["tramos"]] + [0]
+            assert subtotals[i, j].tolist() == expected[:2]
+
+
+@pytest.mark.parametrize("bad", ["nan", "inf", "-inf"])
+def test_non_finite_rates_are_rejected(client, bad):
+    res = client.post(
+        "/api/calculate/scenarios",
+        json={
+            "fechaInicial": "15/01/2020",
+            "capitalBase": 1_000_000,
+            "tasasMensuales": [1, bad],
+            "fechasCorte": ["10/06/2023"],
+        },
+        headers=bearer(),
+    )
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize("field", ["capitalBase", "tasaMensual"])
+@pytest.mark.parametrize("bad", ["nan", "inf"])
+def test_non_finite_base_and_rate_are_rejected(client, field, bad):
+    case = {"fechaInicial": "15/01/2020", "fechaCorte": "10/06/2023", "capitalBase": 1_000_000, "tasaMensual": 2.1}
+    for path in ("/api/calculate", "/api/export"):
+        res = client.post(path, json={**case, field: bad}, headers=bearer())
+        assert res.status_code == 400
+
+
+@pytest.mark.parametrize("bad", ["nan", "inf"])
+def test_non_finite_base_is_rejected_in_scenarios(client, bad):
+    res = client.post(
+        "/api/calculate/scenarios",
+        json={"fechaInicial": "15/01/2020", "capitalBase": bad, "tasasMensuales": [1], "fechasCorte": ["10/06/2023"]},
+        headers=bearer(),
+    )
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_huge_base_does_not_wrap_int64(client, engine):
+    start, cutoff, base = date(2020, 1, 15), date(2023, 6, 10), 1e20
+    expected = generate_tramos(start, cutoff, base, 2.1, None)["total"]
+    assert expected > 2**63
+    assert generate_tramos(start, cutoff, base, 2.1, None, engine=engine)["total"] == expected
+    res = client.post(
+        "/api/calculate/scenarios",
+        json={"fechaInicial": "15/01/2020", "capitalBase": "1e20", "tasasMensuales": [2.1], "fechasCorte": ["10/06/2023"]},
+        headers=bearer(),
+    )
+    assert res.status_code == 200
+    assert res.get_json()["totales"] == [[expected]]
@@ -0,0 +1,18 @@
+import json
+
+import pytest
+
+from src.serialization import LiquidationJSONProvider
+
+from .conftest import bearer
+
+
+@pytest.mark.parametrize("serializer", ["stdlib", "orjson"])
+def test_totals_beyond_64_bits(app, client, serializer):
+    app.json = LiquidationJSONProvider(app, serializer=serializer)
+    case = {"fechaInicial": "15/01/2020", "fechaCorte": "10/06/2023", "capitalBase": "1e20", "tasaMensual": 2.1}
+    res = client.post("/api/calculate", json=case, headers=bearer())
+    assert res.status_code == 200
+    total = json.loads(res.get_data())["total"]
+    assert total > 2**64
+    assert total == sum(t["subtotal"] for t in res.get_json()["tramos"])
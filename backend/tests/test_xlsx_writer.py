@@ -0,0 +1,48 @@
+import io
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+
+from src.domain import generate_tramos
+from src.excel import build_excel
+from src.rates import RateSchedule
+from src.xlsx_writer import build_xlsx_direct
+
+SCHEDULE = RateSchedule([(date(2020, 1, 1), 2.0), (date(2020, 7, 1), 1.8)])
+
+
+def _cells(ws):
+    out = {}
+    for row in ws.iter_rows():
+        for c in row:
+            if c.value is None and not c.has_style:
+                continue
+            out[c.coordinate] = (
+                c.value,
+                c.number_format,
+                (c.font.b, c.font.sz),
+                (c.fill.fill_type, c.fill.fgColor.rgb if c.fill.fill_type else None),
+                tuple(getattr(c.border, side).style for side in ("left", "right", "top", "bottom")),
+                (c.alignment.horizontal, c.alignment.vertical),
+            )
+    return out
+
+
+def _sheet(stream):
+    ws = load_workbook(io.BytesIO(stream.read())).active
+    widths = {k: d.width for k, d in ws.column_dimensions.items() if d.customWidth}
+    return ws.title, _cells(ws), sorted(map(str, ws.merged_cells.ranges)), widths
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (date(2000, 1, 15), date(2030, 1, 14), 1e8, 2.1, None),
+        (date(2010, 3, 5), date(2012, 7, 9), 12345.67, 1.5, date(2011, 2, 1)),
+        (date(2020, 2, 29), date(2021, 3, 1), 1e6, SCHEDULE, None),
+    ],
+)
+def test_direct_writer_matches_openpyxl_workbook(args):
+    result = generate_tramos(*args)
+    assert _sheet(build_xlsx_direct(result)) == _sheet(build_excel(result))